@@ -1 +1,6 @@
-from .main import app, db, create_db, close_db
\ No newline at end of file
+# the api is only imported on first access, so the modules and the command line interface can be used without starting it
+def __getattr__(name):
+    if name in ("app", "db", "create_db", "close_db"):
+        from . import main
+        return getattr(main, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
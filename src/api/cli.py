@@ -0,0 +1,149 @@
+"""Command line interface for the pokebase cache and the users of the database, run from the directory that contains the api package:
+
+    python -m api.cli warmup --workers 8 --retries 3 --allow-partial
+    python -m api.cli bundle api/static/cache_bundle.tar.gz
+    python -m api.cli load api/static/cache_bundle.tar.gz
+    python -m api.cli store
+    python -m api.cli export-users users.csv
+    python -m api.cli import-users users.csv --on-conflict update
+    python -m api.cli seed-users --count 1000000 --prefix locust --password Asdf1234
+
+The user commands connect with the DB_* environment variables.
+"""
+import argparse
+import sys
+
+from .modules import Database
+from .modules.module_bundle import WARMUP_GENERATIONS, warm_cache, create_cache_bundle, load_cache_bundle
+from .modules.module_pokeapi import STORE_FILE_NAME, build_pokemon_store
+from .modules.module_postgresql import COPY_FORMATS, TABLE_COL_NAMES, check_passwd_input, check_user_input
+from .modules.module_password import password_hasher
+
+def warmup(args) -> int:
+    stats = warm_cache(args.generations, args.workers, args.retries, args.backoff)
+    print(f"fetched: {stats['fetched']}, already cached: {stats['cached']}, failed: {stats['failed']}")
+    if stats["failed"] > 0 and args.allow_partial:
+        # the api fetches what is missing on first use, so a partial cache is still worth bundling
+        print(f"{stats['failed']} downloads failed, continuing with a partial cache", file=sys.stderr)
+        return 0
+    return 1 if stats["failed"] > 0 else 0
+
+def bundle(args) -> int:
+    manifest = create_cache_bundle(args.bundle, args.version)
+    if manifest == {}:
+        print(f"Could not create bundle {args.bundle}", file=sys.stderr)
+        return 1
+    print(f"bundle {args.bundle} version {manifest['version']}: {manifest['entries']} entries, {manifest['sprites']} sprites")
+    return 0
+
+def load(args) -> int:
+    result = load_cache_bundle(args.bundle)
+    messages = {0: "loaded", 1: "already loaded", 2: "does not exist", 3: "is invalid"}
+    print(f"bundle {args.bundle} {messages[result]}", file=sys.stdout if result < 2 else sys.stderr)
+    return 0 if result < 2 else 1
+
+def store(args) -> int:
+    count = build_pokemon_store(args.store)
+    if count == -1:
+        print(f"Could not build store {args.store}", file=sys.stderr)
+        return 1
+    print(f"store {args.store}: {count} pokemon")
+    return 0
+
+def _print_progress(transferred: int):
+    print(f"\r{transferred / (1024 * 1024):.1f} MiB", end="", file=sys.stderr, flush=True)
+
+def _run_users_command(func) -> int:
+    try:
+        db = Database()
+    except Exception as e:
+        print(f"Could not connect to the database: {e}", file=sys.stderr)
+        return 1
+    try:
+        db.create_table()
+        result = func(db)
+    except Exception as e:
+        print(f"\n{e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    print("", file=sys.stderr)
+    print(", ".join(f"{key}: {value}" for key, value in result.items()))
+    return 0
+
+def export_users(args) -> int:
+    def export(db):
+        mode = "wb" if args.format == "binary" else "w"
+        with open(args.file, mode) as file:
+            return db.export_users(file, args.format, _print_progress)
+    return _run_users_command(export)
+
+def import_users(args) -> int:
+    def import_(db):
+        with open(args.file, "rb") as file:
+            return db.import_users(file, args.format, args.on_conflict, _print_progress)
+    return _run_users_command(import_)
+
+def seed_rows(count: int, prefix: str, password_hash: str, start: int = 1):
+    """Yields the csv lines of `count` test users named `<prefix><number>` that share one password hash
+    """
+    yield ",".join(TABLE_COL_NAMES) + "\n"
+    for number in range(start, start + count):
+        yield f"{prefix}{number},{password_hash},[],0\n"
+
+def seed_users(args) -> int:
+    if check_user_input(args.prefix) != 0 or "," in args.prefix or check_passwd_input(args.password) != 0:
+        print("The prefix must start with a letter and the password needs 8 characters, a digit and an upper character", file=sys.stderr)
+        return 1
+    # hashing once keeps seeding fast, all test users share the password
+    password_hash = password_hasher.hash(args.password)
+    return _run_users_command(lambda db: db.import_users(seed_rows(args.count, args.prefix, password_hash, args.start), "csv", "skip", _print_progress))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m api.cli", description="Manage the pokebase cache and the users of the api")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    warmup_parser = commands.add_parser("warmup", help="prefetch all species, pokemon and sprites of the supported generations")
+    warmup_parser.add_argument("--generations", type=int, nargs="+", default=list(WARMUP_GENERATIONS), help="generations to fetch")
+    warmup_parser.add_argument("--workers", type=int, default=8, help="number of parallel downloads")
+    warmup_parser.add_argument("--retries", type=int, default=3, help="retries of a failed download")
+    warmup_parser.add_argument("--backoff", type=float, default=0.5, help="seconds before the first retry, doubled with every retry")
+    warmup_parser.add_argument("--allow-partial", action="store_true", help="exit with 0 even if downloads failed, e.g. for image builds")
+    warmup_parser.set_defaults(func=warmup)
+
+    bundle_parser = commands.add_parser("bundle", help="pack the cache into a checksummed bundle")
+    bundle_parser.add_argument("bundle", help="path of the bundle")
+    bundle_parser.add_argument("--version", default=None, help="version of the bundle, defaults to the creation time")
+    bundle_parser.set_defaults(func=bundle)
+
+    load_parser = commands.add_parser("load", help="load a bundle into the cache")
+    load_parser.add_argument("bundle", help="path of the bundle")
+    load_parser.set_defaults(func=load)
+
+    store_parser = commands.add_parser("store", help="build the pokemon store from the cache")
+    store_parser.add_argument("store", nargs="?", default=STORE_FILE_NAME, help="path of the store")
+    store_parser.set_defaults(func=store)
+
+    export_parser = commands.add_parser("export-users", help="export all users with their password hashes")
+    export_parser.add_argument("file", help="path of the export")
+    export_parser.add_argument("--format", choices=COPY_FORMATS, default="csv", help="format of the export")
+    export_parser.set_defaults(func=export_users)
+
+    import_parser = commands.add_parser("import-users", help="import users of an export")
+    import_parser.add_argument("file", help="path of the export")
+    import_parser.add_argument("--format", choices=COPY_FORMATS, default="csv", help="format of the export")
+    import_parser.add_argument("--on-conflict", choices=("skip", "update"), default="skip", help="keep or overwrite existing users")
+    import_parser.set_defaults(func=import_users)
+
+    seed_parser = commands.add_parser("seed-users", help="create test users that share one password, e.g. for locust")
+    seed_parser.add_argument("--count", type=int, default=1000, help="number of users")
+    seed_parser.add_argument("--prefix", default="locust", help="user names are the prefix followed by a number")
+    seed_parser.add_argument("--start", type=int, default=1, help="number of the first user")
+    seed_parser.add_argument("--password", required=True, help="password of all users")
+    seed_parser.set_defaults(func=seed_users)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
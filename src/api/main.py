@@ -1,37 +1,104 @@
 from typing import Union
 
-from fastapi import FastAPI, Request, Depends, HTTPException, status
+from fastapi import FastAPI, Request, Depends, HTTPException, Query, status
 
-from fastapi.responses import HTMLResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, StreamingResponse, Response, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 
 from datetime import datetime, timedelta
+from email.utils import formatdate, parsedate_to_datetime
 
 from pydantic import BaseModel
 
 from jose import jwt, JWTError
+import psycopg2
+import json
 import os
 
 # imports all necessary custom modules
-from .modules import PokemonObj, GenerationObj, Database
+from .modules import PokemonObj, GenerationObj, PokemonCatalog, AsyncDatabase
+from .modules.module_cache import TokenCache, ResponseCache
+from .modules.module_search import PokemonSearchIndex
+from .modules.module_singleflight import SingleFlight
+from .modules.module_bundle import load_cache_bundle
+from .modules.module_pokeapi import build_pokemon_store, is_store_stale
+from .modules.module_password import LoginLimiter
+from .modules.module_postgresql import PoolTimeoutError, DatabaseConnectionError
 
 # authentication settings
 SECRET_KEY = "verysecretkey"
 ALGORITHM = "HS256"
 ACESS_TOKEN_EXPIRE_MINUTES = 15
+# verified tokens are cached until they expire, but at most TOKEN_CACHE_TTL seconds
+# so changes made by other worker processes are picked up
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "60"))
+
+# user names that may call the admin endpoints, comma separated
+ADMIN_USERS = {name.strip() for name in os.getenv("ADMIN_USERS", "").split(",") if name.strip()}
+# users fetched per database round trip and sent per chunk by the user export
+USER_EXPORT_ITERSIZE = int(os.getenv("USER_EXPORT_ITERSIZE", "1000"))
+USER_EXPORT_ITERSIZE_MAX = 10000
+
+# seconds clients should wait before retrying while the database is unavailable
+DB_RETRY_AFTER = int(os.getenv("DB_RETRY_AFTER", "1"))
+
+# maximum number of pokemon per batch request
+POKEMON_BATCH_MAX = 500
+
+# default and maximum number of cards in a pack
+PACK_SIZE = 5
+PACK_SIZE_MAX = 10
+
+# serialized pokemon by id, repeated lookups answer with the stored bytes and their etag
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+# seconds browsers and proxies may reuse a pokemon response, pokemon only change with a new catalog
+RESPONSE_MAX_AGE = int(os.getenv("RESPONSE_MAX_AGE", "604800"))
+
+# prefetched pokebase cache shipped with the image, see api/cli.py
+CACHE_BUNDLE = os.getenv("CACHE_BUNDLE", "api/static/cache_bundle.tar.gz")
 
 db = None
 
 NS = 'Not Set'
 
+# in-memory table of all supported pokemon, only preloaded outside of unit tests
+catalog = PokemonCatalog()
+
+# authenticated users by token, invalidated whenever the database changes a user
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+# logins that hash passwords at the same time per user name and per client address
+login_limiter = LoginLimiter()
+if os.environ.get("TEST", NS) == "2":
+    # every simulated user of the stress test logs in as testuser from the same host
+    STRESS_TEST_LOGIN_LIMIT = int(os.getenv("STRESS_TEST_LOGIN_LIMIT", "1000"))
+    login_limiter = LoginLimiter(max_per_user=STRESS_TEST_LOGIN_LIMIT, max_per_ip=STRESS_TEST_LOGIN_LIMIT)
+
+# pokemon responses by id, also found by the names they were requested with
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+# pokemon that are not part of the catalog are built once for all concurrent requests, off the event loop
+POKEMON_LOAD_TIMEOUT = float(os.getenv("POKEMON_LOAD_TIMEOUT", "60"))
+pokemon_flight = SingleFlight()
+
 if os.environ.get("TEST", NS) != "1":
-    db = Database()
+    db = AsyncDatabase()
+    db.add_user_listener(token_cache.invalidate_user)
     db.create_table()
+    # fill the pokebase cache and the pokemon store before anything is loaded, so a fresh container does not start cold
+    load_cache_bundle(CACHE_BUNDLE)
+    # loading a new bundle changes the cache, so the store is rebuilt then as well
+    if is_store_stale():
+        build_pokemon_store()
+    catalog.load()
     templates = Jinja2Templates(directory="api/templates")
     if os.environ.get("TEST", NS) == "2":
-        db.add_user("testuser", "Asdf1234", [])
+        db.get_database().add_user("testuser", "Asdf1234", [])
 else:
     templates = Jinja2Templates(directory=os.path.abspath("src/api/templates"))
 
@@ -39,6 +106,60 @@ gen_1 = GenerationObj(1)
 gen_2 = GenerationObj(2)
 gen_3 = GenerationObj(3)
 
+# precompute the rarity weighted samplers, pokemon missing in the catalog count as normal
+for generation in (gen_1, gen_2, gen_3):
+    generation.set_rarity_weights(catalog)
+
+# name search for the typeahead, built from the species lists of the generations
+search_index = PokemonSearchIndex()
+search_index.build(gen_1.get_pokemon_list() + gen_2.get_pokemon_list() + gen_3.get_pokemon_list())
+
+def get_pokemon_from_catalog(pokemon_id: int):
+    """Returns a pokemon from the preloaded catalog and only builds it if it is not part of the catalog
+
+    :param pokemon_id: id of the pokemon
+    :type pokemon_id: int
+    :return: the pokemon with this id
+    :rtype: PokemonObj
+    """
+    pokemon = catalog.get_by_id(pokemon_id)
+    if pokemon is None:
+        pokemon = PokemonObj(pokemon_id)
+    return pokemon
+
+async def load_pokemon_from_catalog(pokemon_id: int):
+    """Same as :func:`get_pokemon_from_catalog` for endpoints. Pokemon missing in the catalog are built on a worker thread 
+    and concurrent requests for the same pokemon share one build
+
+    :param pokemon_id: id of the pokemon
+    :type pokemon_id: int
+    :raises HTTPException: raises if building the pokemon took longer than POKEMON_LOAD_TIMEOUT seconds
+    :return: the pokemon with this id
+    :rtype: PokemonObj
+    """
+    pokemon = catalog.get_by_id(pokemon_id)
+    if pokemon is not None:
+        return pokemon
+    try:
+        return await pokemon_flight.do_async(("pokemon", pokemon_id), get_pokemon_from_catalog, pokemon_id, timeout=POKEMON_LOAD_TIMEOUT)
+    except TimeoutError:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=f"Loading pokemon {pokemon_id} timed out")
+
+async def load_pokemon_by_name(pokemon_name: str):
+    """Same as :meth:`PokemonObj.from_pokemon_name` for endpoints. The pokemon is built on a worker thread, 
+    so a lookup that has to ask the pokeapi does not block the event loop, and concurrent requests for the same name share one build
+
+    :param pokemon_name: name of the pokemon
+    :type pokemon_name: str
+    :raises HTTPException: raises if building the pokemon took longer than POKEMON_LOAD_TIMEOUT seconds
+    :return: the pokemon or a dictionary with details if it was not found
+    :rtype: PokemonObj | dict
+    """
+    try:
+        return await pokemon_flight.do_async(("pokemon_name", pokemon_name.lower()), PokemonObj.from_pokemon_name, pokemon_name, timeout=POKEMON_LOAD_TIMEOUT)
+    except TimeoutError:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=f"Loading pokemon {pokemon_name} timed out")
+
 def create_db(db_settings):
     """Test function that creates a db object for testing with the given settings. only works if TEST env var is set
 
@@ -49,7 +170,8 @@ def create_db(db_settings):
     if os.environ.get("TEST", NS) != "1":
         raise ImportError("This function is only for testing purposes")
     global db
-    db = Database(db_settings)
+    db = AsyncDatabase(db_settings)
+    db.add_user_listener(token_cache.invalidate_user)
     db.create_table()
     db.clean_table()
 
@@ -89,6 +211,130 @@ class AddPointsModel(BaseModel):
     username: str
     points_elem: int
 
+class PokemonBatchModel(BaseModel):
+    pokemon: list[int | str]
+
+def check_pokemon_batch(request: PokemonBatchModel):
+    """Checks the size of a batch request
+
+    :param request: the batch request
+    :type request: PokemonBatchModel
+    :raises HTTPException: raises if the batch contains more than POKEMON_BATCH_MAX pokemon
+    """
+    if len(request.pokemon) > POKEMON_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"A batch can contain at most {POKEMON_BATCH_MAX} pokemon"
+        )
+
+def stream_pokemon_batch(pokemon_keys: list):
+    """Resolves a batch of pokemon and yields the json response piece by piece: {"pokemon": [{...}, {...}]}
+
+    :param pokemon_keys: list of pokemon ids and/or names
+    :type pokemon_keys: list[int | str]
+    :return: generator of json strings
+    :rtype: Generator[str]
+    """
+    yield '{"pokemon": ['
+    for index, pokemon in enumerate(PokemonObj.iter_batch(pokemon_keys, catalog)):
+        pokemon = json.dumps(pokemon) if isinstance(pokemon, dict) else pokemon.to_json().decode("utf-8")
+        yield ("," if index > 0 else "") + pokemon
+    yield ']}'
+
+async def stream_users_ndjson(itersize: int):
+    """Streams all users as newline delimited json, one chunk of up to `itersize` lines per database round trip
+
+    :param itersize: users per round trip and chunk
+    :type itersize: int
+    :return: async generator of ndjson chunks
+    :rtype: AsyncGenerator[str]
+    """
+    lines = []
+    async for user in db.iter_users(itersize):
+        lines.append(json.dumps(user, separators=(",", ":")))
+        if len(lines) >= itersize:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+def pokemon_response(pokemon: PokemonObj) -> Response:
+    """Returns the serialized pokemon as response, the json is built once per pokemon (see :meth:`PokemonObj.to_json`)
+
+    :param pokemon: the pokemon
+    :type pokemon: PokemonObj
+    :return: json response of the pokemon
+    :rtype: Response
+    """
+    return Response(content=pokemon.to_json(), media_type="application/json")
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Checks an If-None-Match header against an etag (weak comparison, as required for If-None-Match)
+
+    :param if_none_match: value of the If-None-Match header
+    :type if_none_match: str | None
+    :param etag: the current etag
+    :type etag: str
+    :return: `True` if the client already has this version
+    :rtype: bool
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def cache_pokemon_response(pokemon: PokemonObj, names = ()):
+    """Stores the serialized pokemon in the response cache, pokemon that could not be loaded completely are not stored
+
+    :param pokemon: the pokemon
+    :type pokemon: PokemonObj
+    :param names: additional names the response is found by, defaults to ()
+    :type names: iterable, optional
+    :return: the cached response, `None` if the pokemon was not stored
+    :rtype: CachedResponse | None
+    """
+    if pokemon.get_name() == "" or pokemon.get_sprite_path() == "":
+        return None
+    return response_cache.put(pokemon.get_id(), pokemon.to_json(), {pokemon.get_name(), *names})
+
+def not_modified_since(if_modified_since: str | None, last_modified: float | None) -> bool:
+    """Checks an If-Modified-Since header against the modification time of the catalog
+
+    :param if_modified_since: value of the If-Modified-Since header
+    :type if_modified_since: str | None
+    :param last_modified: unix timestamp of the catalog
+    :type last_modified: float | None
+    :return: `True` if the client already has this version
+    :rtype: bool
+    """
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+def cached_response(request: Request, entry) -> Response:
+    """Returns a cached pokemon response with its validators, or 304 if the client already has it.
+    Last-Modified is the modification time of the catalog, If-Modified-Since is only used without If-None-Match
+
+    :param request: the request
+    :type request: Request
+    :param entry: the cached response
+    :type entry: CachedResponse
+    :return: the response
+    :rtype: Response
+    """
+    headers = {"ETag": entry.etag, "Cache-Control": f"public, max-age={RESPONSE_MAX_AGE}"}
+    last_modified = catalog.get_last_modified()
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    if_none_match = request.headers.get("if-none-match")
+    if etag_matches(if_none_match, entry.etag) or (if_none_match is None and not_modified_since(request.headers.get("if-modified-since"), last_modified)):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
 oauth_2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -111,7 +357,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 async def get_current_user(token: str = Depends(oauth_2_scheme)):
-    """fetches the user from the given token and authorizes him
+    """fetches the user from the given token and authorizes him. Verified tokens are cached with their user until the token expires
 
     :param token: the jwt token str, defaults to Depends(oauth_2_scheme)
     :type token: str, optional
@@ -123,6 +369,11 @@ async def get_current_user(token: str = Depends(oauth_2_scheme)):
     :return: User object containg user information: user_id, user_name, deck_ids list and points
     :rtype: User
     """
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+    generation = token_cache.get_generation()
+    
     credential_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials", headers={"WWW_Authenticate": "Bearer"})
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -134,7 +385,7 @@ async def get_current_user(token: str = Depends(oauth_2_scheme)):
     except JWTError:
         raise credential_exception
     
-    user = db.get_user(token_data.username)
+    user = await db.get_user(token_data.username)
     if user["user_id"] == -1:
         raise credential_exception
     
@@ -143,11 +394,47 @@ async def get_current_user(token: str = Depends(oauth_2_scheme)):
     if datetime.now().timestamp() > token_data.expires:
         raise credential_exception
     
-    return User(user_id=user["user_id"], user_name=user["user_name"], deck_ids=user["deck_ids"], points=user["points"])
+    current_user = User(user_id=user["user_id"], user_name=user["user_name"], deck_ids=user["deck_ids"], points=user["points"])
+    token_cache.set_user(token, current_user.user_name, current_user, token_data.expires, generation)
+    return current_user
+
+async def get_admin_user(current_user: User = Depends(get_current_user)):
+    """authorizes the user of the token as admin, admins are listed in the ADMIN_USERS env var
+
+    :param current_user: will be retrieved from the token inside of authentication header, defaults to Depends(get_current_user)
+    :type current_user: User, optional
+    :raises HTTPException: raises if the user is no admin
+    :return: the admin
+    :rtype: User
+    """
+    if current_user.user_name not in ADMIN_USERS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin rights required")
+    return current_user
 
 app = FastAPI()
 app.mount("/static", StaticFiles(directory="api/static"), name="static")
 
+@app.exception_handler(PoolTimeoutError)
+@app.exception_handler(DatabaseConnectionError)
+@app.exception_handler(psycopg2.OperationalError)
+@app.exception_handler(psycopg2.InterfaceError)
+async def database_unavailable_handler(request: Request, exc: Exception):
+    """Answers with 503 if no database connection is free in time or the database can not be reached, so clients retry instead of getting a 500.
+    Other connection errors, e.g. of the PokeAPI, are not database failures and not handled here
+
+    :param request: the request that failed
+    :type request: Request
+    :param exc: the PoolTimeoutError, DatabaseConnectionError or lost connection of psycopg2
+    :type exc: Exception
+    :return: json response with status 503 and a Retry-After header
+    :rtype: JSONResponse
+    """
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database unavailable, try again later"},
+        headers={"Retry-After": str(DB_RETRY_AFTER)}
+    )
+
 
 @app.get("/")
 async def read_root(request: Request):
@@ -208,7 +495,7 @@ async def register_new_user(request: RegistrationModel):
         return err_dict_user
     if not isinstance(request.password, str) or not request.password.isascii():
         return {"details": "Input error! Password must be ascii chars only"}
-    result = db.add_user(request.username, request.password, [])
+    result = await db.add_user(request.username, request.password, [])
     if result == 0:
         # check inside registration if user already exists in db!!!
         return {"details": f"User {request.username} successfully registered"}
@@ -237,7 +524,56 @@ async def get_users():
     :return: list with all users inside of dict: {"users": [{...}, {...}]}
     :rtype: dict
     """
-    return db.get_users()
+    return await db.get_users()
+
+@app.get("/admin/export_users")
+async def export_users(itersize: int = Query(USER_EXPORT_ITERSIZE, ge=1, le=USER_EXPORT_ITERSIZE_MAX),
+                       admin: User = Depends(get_admin_user)):
+    """Api call: streams all users as newline delimited json for admin exports and analytics. 
+    Users are read in pages ordered by id, so memory stays flat no matter how many users exist and a slow client holds no database connection
+
+    :param itersize: users per page and per chunk (1-10000), defaults to USER_EXPORT_ITERSIZE
+    :type itersize: int, optional
+    :param admin: will be retrieved from the token inside of authentication header, defaults to Depends(get_admin_user)
+    :type admin: User, optional
+    :return: streamed ndjson, one user per line: {"user_id": int, "user_name": str, "deck_ids": list, "points": int}
+    :rtype: StreamingResponse
+    """
+    return StreamingResponse(stream_users_ndjson(itersize), media_type="application/x-ndjson")
+
+@app.post("/get_leaderboard")
+async def get_leaderboard(limit: int = Query(10, ge=1, le=100), offset: int = Query(0, ge=0),
+                          after_points: int | None = None, after_id: int | None = None):
+    """Api call: returns the users with the most points ordered by points
+
+    :param limit: maximum number of users to return (1-100), defaults to 10
+    :type limit: int, optional
+    :param offset: number of users to skip, defaults to 0
+    :type offset: int, optional
+    :param after_points: points of the last user of the previous page, defaults to None
+    :type after_points: int | None, optional
+    :param after_id: id of the last user of the previous page, defaults to None
+    :type after_id: int | None, optional
+    :return: list with the users inside of dict: {"users": [{"user_id": int, "user_name": str, "points": int}, ...]}
+    :rtype: dict
+    """
+    if (after_points is None) != (after_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="after_points and after_id must be set together"
+        )
+    return await db.get_leaderboard(limit, offset, after_points, after_id)
+
+@app.post("/get_rank")
+async def get_rank(current_user: User = Depends(get_current_user)):
+    """Api call: returns the leaderboard rank of the user of the token
+
+    :param current_user: will be retrieved from the token inside of authentication header, defaults to Depends(get_current_user)
+    :type current_user: User, optional
+    :return: dict with the name, points and rank of the user
+    :rtype: dict
+    """
+    return {"user_name": current_user.user_name, "points": current_user.points, "rank": await db.get_user_rank(current_user.user_name)}
 
 @app.get("/leaderboard")
 async def leaderboard_page(request: Request):
@@ -299,10 +635,12 @@ if os.environ.get("TEST", 'Not Set') == "2":
 
     test_pokemon = {'pokemon_id': 132, 'pokemon_name': 'ditto', 'pokemon_generation': 'generation-i', 'pokemon_rarity': 'normal', 'pokemon_points': 48, 'pokemon_stats': [{'stat_name': 'hp', 'stat_value': 48}, {'stat_name': 'attack', 'stat_value': 48}, {'stat_name': 'defense', 'stat_value': 48}, {'stat_name': 'special-attack', 'stat_value': 48}, {'stat_name': 'special-defense', 'stat_value': 48}, {'stat_name': 'speed', 'stat_value': 48}], 'pokemon_sprite_path': ''}
 
+    @app.get("/Pokemon_Id/{pokemon_id}")
     @app.post("/Pokemon_Id/{pokemon_id}")
     async def read_pokemon(pokemon_id: int, request: Request):
         return test_pokemon
 
+    @app.get("/Pokemon_Name/{pokemon_name}")
     @app.post("/Pokemon_Name/{pokemon_name}")
     async def get_pokemon_by_name(pokemon_name:str, request: Request):
         return test_pokemon
@@ -313,37 +651,64 @@ if os.environ.get("TEST", 'Not Set') == "2":
             return test_pokemon
         else:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Only generation 1 to 3 are supported")
+
+    @app.post("/Pokemon_Batch")
+    async def get_pokemon_batch(request: PokemonBatchModel):
+        check_pokemon_batch(request)
+        return {"pokemon": [test_pokemon] * len(set(request.pokemon))}
+
+    def draw_pack_pokemon(gen_id: int, size: int, weighted: bool) -> list:
+        if gen_id == 1 or gen_id == 2 or gen_id == 3:
+            return [test_pokemon] * size
+        else:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Only generation 1 to 3 are supported")
 else:
+    @app.get("/Pokemon_Id/{pokemon_id}")
     @app.post("/Pokemon_Id/{pokemon_id}")
     async def read_pokemon(pokemon_id: int, request: Request):
-        """Api call: Post request to retrieve a pokemon by id
+        """Api call: Get request to retrieve a pokemon by id, cacheable by browsers and proxies. 
+        The post request is kept for older clients
 
         :param pokemon_id: id of the pokemon
         :type pokemon_id: int
         :param request: the get request
         :type request: Request
         :return: PokemonObj in form of a dictionary
-        :rtype: dict
+        :rtype: Response
         """
-        return PokemonObj(pokemon_id).__dict__()
-
+        entry = response_cache.get(pokemon_id)
+        if entry is None:
+            pokemon = await load_pokemon_from_catalog(pokemon_id)
+            entry = cache_pokemon_response(pokemon)
+            if entry is None:
+                return pokemon_response(pokemon)
+        return cached_response(request, entry)
+
+    @app.get("/Pokemon_Name/{pokemon_name}")
     @app.post("/Pokemon_Name/{pokemon_name}")
     async def get_pokemon_by_name(pokemon_name:str, request: Request):
-        """Api call: Post request to retrive a pokemon by name
+        """Api call: Get request to retrive a pokemon by name, cacheable by browsers and proxies. 
+        The post request is kept for older clients
 
         :param pokemon_name: the name of the pokemon
         :type pokemon_name: str
         :param request: the get request
         :type request: Request
         :return: PokemonObj in form of a dictionary
-        :rtype: dict
+        :rtype: Response
         """
-        pokemon = PokemonObj.from_pokemon_name(pokemon_name)
-        if isinstance(pokemon, dict):
-            return pokemon
-        else:
-            print(pokemon.__dict__())
-            return pokemon.__dict__()
+        name = pokemon_name.lower()
+        entry = response_cache.get_by_name(name)
+        if entry is None:
+            pokemon = catalog.get_by_name(pokemon_name)
+            if pokemon is None:
+                pokemon = await load_pokemon_by_name(pokemon_name)
+            if isinstance(pokemon, dict):
+                return pokemon
+            entry = cache_pokemon_response(pokemon, (name,))
+            if entry is None:
+                return pokemon_response(pokemon)
+        return cached_response(request, entry)
 
     @app.post("/Pokemon_Rand/{gen_id}")
     async def get_random_pokemon_from_gen(gen_id: int, request: Request):
@@ -358,14 +723,49 @@ else:
         :rtype: dict
         """
         if gen_id == 1:
-            return gen_1.get_random_pokemon().__dict__()
+            return pokemon_response(await load_pokemon_from_catalog(gen_1.get_random_pokemon_id()))
         elif gen_id == 2:
-            return gen_2.get_random_pokemon().__dict__()
+            return pokemon_response(await load_pokemon_from_catalog(gen_2.get_random_pokemon_id()))
         elif gen_id == 3:
-            return gen_3.get_random_pokemon().__dict__()
+            return pokemon_response(await load_pokemon_from_catalog(gen_3.get_random_pokemon_id()))
         else:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Only generation 1 to 3 are supported")
 
+    @app.post("/Pokemon_Batch")
+    async def get_pokemon_batch(request: PokemonBatchModel):
+        """Api call: Post request to retrieve many pokemon by id and/or name in one response. 
+        Duplicates are removed and the pokemon are streamed in order of their first occurrence
+
+        :param request: the request containing the list of pokemon ids and/or names
+        :type request: PokemonBatchModel
+        :raises HTTPException: raises if the batch is too large
+        :return: streamed json: {"pokemon": [{...}, {...}]}, {"details": str} for pokemon that could not be found
+        :rtype: StreamingResponse
+        """
+        check_pokemon_batch(request)
+        return StreamingResponse(stream_pokemon_batch(request.pokemon), media_type="application/json")
+
+    def draw_pack_pokemon(gen_id: int, size: int, weighted: bool) -> list:
+        """Draws the pokemon of a pack from a generation (1-3)
+
+        :param gen_id: id of the generation
+        :type gen_id: int
+        :param size: number of pokemon to draw
+        :type size: int
+        :param weighted: if `True` rare pokemon drop less often
+        :type weighted: bool
+        :raises HTTPException: raises if the generation is not 1-3
+        :return: list of the drawn pokemon in form of dictionaries
+        :rtype: list[dict]
+        """
+        generations = {1: gen_1, 2: gen_2, 3: gen_3}
+        if gen_id not in generations:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Only generation 1 to 3 are supported")
+        generation = generations[gen_id]
+        pokemon_ids = generation.get_random_pokemon_ids(size, weighted)
+        pokemon = {pokemon.get_id(): pokemon.__dict__() for pokemon in PokemonObj.iter_batch(pokemon_ids, catalog) if not isinstance(pokemon, dict)}
+        return [pokemon[pokemon_id] for pokemon_id in pokemon_ids if pokemon_id in pokemon]
+
 err_dict = {"details": "Error occured! Did not add element to user"}
 
 @app.post("/add_to_deck")
@@ -381,10 +781,56 @@ async def add_elem_to_user_deck(request: AddDeckModel):
         return err_dict_user
     if not isinstance(request.new_elem, dict):
         return err_dict
-    if db.add_elem_to_user_deck(request.username, request.new_elem) != 0:
+    result = await db.add_elem_to_user_deck(request.username, request.new_elem)
+    if result == 0:
+        return {"details": "New element got added to user"}
+    elif result == 14:
+        return {"details": "Element is already part of the deck"}
+    else:
         return err_dict
+
+@app.get("/Pokemon_Search/{query}")
+async def search_pokemon(query: str, limit: int = Query(10, ge=1, le=50)):
+    """Api call: Get request to search pokemon names for the typeahead. Prefix matches come first, followed by similar names
+
+    :param query: the search query
+    :type query: str
+    :param limit: maximum number of results (1-50), defaults to 10
+    :type limit: int, optional
+    :return: list of matches inside of dict: {"pokemon": [{"pokemon_id": int, "pokemon_name": str}, ...]}
+    :rtype: dict
+    """
+    return {"pokemon": search_index.search(query, limit)}
+
+@app.post("/open_pack/{gen_id}")
+async def open_pack(gen_id: int, size: int = Query(PACK_SIZE, ge=1, le=PACK_SIZE_MAX), weighted: bool = False, 
+                    current_user: User = Depends(get_current_user)):
+    """Api call: Post request to open a pack. Draws the pokemon of a generation (1-3) and adds them to the deck of the authenticated user in one transaction
+
+    :param gen_id: id of the generation
+    :type gen_id: int
+    :param size: number of pokemon inside of the pack (1-10), defaults to 5
+    :type size: int, optional
+    :param weighted: if `True` rare pokemon drop less often, defaults to False
+    :type weighted: bool, optional
+    :param current_user: will be retrieved from the token inside of authentication header, defaults to Depends(get_current_user)
+    :type current_user: User, optional
+    :raises HTTPException: raises if the generation is not 1-3
+    :return: dictionary containing the drawn pokemon and details of the result: {"pokemon": [{...}, {...}], "details": msg_str}
+    :rtype: dict
+    """
+    # drawing may build pokemon that are missing in the catalog, which blocks
+    pokemon = await run_in_threadpool(draw_pack_pokemon, gen_id, size, weighted)
+    new_elems = [{"_id": elem["pokemon_id"], "_name": elem["pokemon_name"]} for elem in pokemon if elem["pokemon_name"] != ""]
+    if len(new_elems) == 0:
+        return {"pokemon": pokemon, "details": "Error occured! Could not draw pokemon"}
+    result = await db.add_elems_to_user_deck(current_user.user_name, new_elems)
+    if result == 0:
+        return {"pokemon": pokemon, "details": "New elements got added to user"}
+    elif result == 14:
+        return {"pokemon": pokemon, "details": "Elements are already part of the deck"}
     else:
-        return {"details": "New element got added to user"}
+        return {"pokemon": pokemon, **err_dict}
 
 @app.post("/update_points")
 async def update_points_of_user(request: AddPointsModel):
@@ -399,21 +845,29 @@ async def update_points_of_user(request: AddPointsModel):
         return err_dict_user
     if not isinstance(request.points_elem, int) or request.points_elem < 0:
         return {"details": "Input error! Point elem must be positive integer"}
-    if db.update_user_points(request.username, request.points_elem) != 0:
+    if await db.update_user_points(request.username, request.points_elem) != 0:
         return err_dict
     return {"details": "Added points to user successfully"}
 
 @app.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    """Api call: Post request to generate a token with login credentials: username, password
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """Api call: Post request to generate a token with login credentials: username, password.
+    Too many logins at the same time for one user or client are rejected before the password is hashed
 
+    :param request: the request, used for the client address
+    :type request: Request
     :param form_data: login form containing username and password, defaults to Depends()
     :type form_data: OAuth2PasswordRequestForm, optional
     :raises HTTPException: raises if authentication fails
+    :raises HTTPException: raises if too many logins run at the same time
     :return: dict containing token and type: {"access_token": token, "token_type": type}
     :rtype: dict
     """
-    user = db.authenticate_user(form_data.username, form_data.password)
+    client_ip = request.client.host if request.client else None
+    with login_limiter.limit(form_data.username, client_ip) as allowed:
+        if not allowed:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many login attempts", headers={"Retry-After": "1"})
+        user = await db.authenticate_user(form_data.username, form_data.password)
     if user["user_id"] == -1:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password", headers={"WWW_Authenticate": "Bearer"})
     access_token_expires = timedelta(minutes=ACESS_TOKEN_EXPIRE_MINUTES)
@@ -1 +1 @@
-from .interface import PokemonObj, GenerationObj, Database
\ No newline at end of file
+from .interface import PokemonObj, GenerationObj, PokemonCatalog, Database, AsyncDatabase
\ No newline at end of file
@@ -1,37 +1,108 @@
 from .module_logger import LoggerClass
 from .module_pokeapi import (
-    get_pokemon_by_id, 
+    CACHE_DIR,
     get_pokemon_id_from_name,
     get_pokemon_id_names_by_generation, 
-    get_pokemon_rarity_and_generation_by_id, 
-    get_pokesprite_url_by_id, 
+    resolve_pokemon,
     PokemonRarity
 )
+from .module_leaderboard import LeaderboardCache
+from .module_sampler import AliasSampler
+from .module_password import password_hasher, is_legacy_hash
 from .module_postgresql import (
     DB_SETTINGS,
-    add_user_with_crypt_pass,
-    close_connection,
+    POOL_SETTINGS,
+    USER_STREAM_ITERSIZE,
+    ConnectionPool,
+    UserObj,
+    PoolTimeoutError,
+    DatabaseConnectionError,
+    add_user_with_password_hash,
+    check_new_user_input,
     create_table,
     clean_table,
     delete_table,
-    get_postgress_conn,
     get_user_from_db,
     get_all_users_from_db,
-    authenticate_user_from_db,
+    get_users_page_from_db,
+    get_leaderboard_from_db,
+    get_user_rank_from_db,
+    get_user_password_from_db,
+    verify_user_password,
+    rehash_password_from_db,
     update_user_from_db,
     update_user_from_db_points,
+    append_elem_to_user_deck_from_db,
+    append_elems_to_user_deck_from_db,
     delete_user_from_db,
+    import_users_to_db,
+    export_users_from_db,
+    unit_of_work,
     DatabaseError
 )
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import asyncio
+import functools
+import hashlib
+import json
+import os
 import random as rand
+import sys
+import threading
+import time
 
 # create logger object to log system
 log = LoggerClass().get_logger()
 
+# generations that are supported by the application
+SUPPORTED_GENERATIONS = (1, 2, 3)
+
+# file of the on-disk catalog snapshot, empty string disables the snapshot
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT", CACHE_DIR + "catalog.json")
+CATALOG_SNAPSHOT_VERSION = 1
+
+# relative drop weights of the rarities for weighted draws
+RARITY_DROP_WEIGHTS = {
+    PokemonRarity.NORMAL: 1.0,
+    PokemonRarity.LEGENDARY: 0.1,
+    PokemonRarity.MYTHIC: 0.02
+}
+
+# number of threads that load pokemon of a batch which are not part of the catalog
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+
+def _normalize_pokemon_key(pokemon_key):
+    """Turns a pokemon id or name into the key used to deduplicate batches: ids (also as digit strings) become int, names lowercase str
+
+    :param pokemon_key: id or name of a pokemon
+    :type pokemon_key: int | str
+    :return: the normalized key, `None` if the key is neither an id nor a name
+    :rtype: int | str | None
+    """
+    if isinstance(pokemon_key, bool):
+        return None
+    if isinstance(pokemon_key, int):
+        return pokemon_key
+    if isinstance(pokemon_key, str):
+        pokemon_key = pokemon_key.strip().lower()
+        if pokemon_key.isdigit():
+            return int(pokemon_key)
+        if pokemon_key != "":
+            return pokemon_key
+    return None
+
+
+def _intern_stats(stats: list) -> list:
+    """Returns the stats with interned stat names, so all pokemon share the same name strings
+    """
+    return [{"stat_name": sys.intern(stat["stat_name"]), "stat_value": stat["stat_value"]} for stat in stats]
+
 
 class PokemonObj(object):
-    """This class represents a Pokemon
+    """This class represents a Pokemon. The attributes are written once when the pokemon is built, 
+    its json form is serialized on first use and reused afterwards (see :meth:`to_json`). Pokemon compare by id
     :class: `api.interface.PokemonObj`
     
     :param poke_id: Pokemon Id, must be 1 or higher
@@ -43,6 +114,8 @@ class PokemonObj(object):
     :raises ValueError: Pokemen Id must be an integer and at least 1
     """
     
+    __slots__ = ("_poke_id", "_name", "_generation", "_rarity", "_points", "_stats", "_sprite", "_json")
+    
     def __init__(self, poke_id: int, load_sprite = True):
         """constructor method
 
@@ -60,42 +133,54 @@ class PokemonObj(object):
 
         self._poke_id = poke_id
 
-        self._load_stats()
+        self._load(load_sprite)
 
-        if load_sprite:
-            self._load_sprite_path()
-        else:
-            self._sprite = ""
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f"PokemonObj attribute {name} is already set")
+        object.__setattr__(self, name, value)
 
-    def _load_sprite_path(self):
-        """Loads the sprite path for the pokemon with its id
-        """
-        self._sprite = get_pokesprite_url_by_id(self._poke_id)
+    def __delattr__(self, name):
+        raise AttributeError("PokemonObj attributes can not be deleted")
 
-    def _load_stats(self):
-        """Loads the stats for the pokemon with its id
+    def _load(self, load_sprite: bool):
+        """Loads stats, rarity, generation and sprite path of the pokemon with one lookup, see :func:`resolve_pokemon`
         """
         
-        self._name = ""
-        self._generation = 0
-        self._rarity = PokemonRarity.NONE
-        self._points = 0
-        self._stats = []
-        
-        pokemon = get_pokemon_by_id(self._poke_id)
+        pokemon = resolve_pokemon(self._poke_id, load_sprite)
         if pokemon != {}:
             self._name = pokemon["pokemon_name"]
-            self._stats = pokemon["pokemon_stats"]
-            
-            _gen_and_rarity = get_pokemon_rarity_and_generation_by_id(self._poke_id)
-            self._generation = _gen_and_rarity["pokemon_gen_name"]
-            self._rarity = _gen_and_rarity["pokemon_rarity"]
-            multiplier = 1
-            if self._rarity == PokemonRarity.LEGENDARY:
-                multiplier = 2
-            elif self._rarity == PokemonRarity.MYTHIC:
-                multiplier = 5
-            self._points = self._stats[0]["stat_value"] * multiplier  # hp base stat times rarity multiplier
+            self._stats = _intern_stats(pokemon["pokemon_stats"])
+            self._generation = sys.intern(pokemon["pokemon_gen_name"])
+            self._rarity = pokemon["pokemon_rarity"]
+            self._points = pokemon["pokemon_points"]
+            self._sprite = pokemon["pokemon_sprite_path"]
+        else:
+            self._name = ""
+            self._stats = []
+            self._generation = 0
+            self._rarity = PokemonRarity.NONE
+            self._points = 0
+            self._sprite = ""
+    
+    @classmethod
+    def from_dict(cls, pokemon: dict):
+        """Returns pokemon object from its dictionary form (see :meth:`__dict__`) without loading anything
+        
+        :param pokemon: dictionary form of a pokemon
+        :type pokemon: dict
+        :return: a Pokemon object with the values of the dictionary
+        :rtype: PokemonObj
+        """
+        obj = cls.__new__(cls)
+        obj._poke_id = pokemon["pokemon_id"]
+        obj._name = pokemon["pokemon_name"]
+        obj._generation = sys.intern(pokemon["pokemon_generation"]) if isinstance(pokemon["pokemon_generation"], str) else pokemon["pokemon_generation"]
+        obj._rarity = PokemonRarity(pokemon["pokemon_rarity"])
+        obj._points = pokemon["pokemon_points"]
+        obj._stats = _intern_stats(pokemon["pokemon_stats"])
+        obj._sprite = pokemon["pokemon_sprite_path"]
+        return obj
     
     @classmethod
     def from_pokemon_name(cls, pokemon_name: str, load_sprite=True):
@@ -113,6 +198,73 @@ class PokemonObj(object):
             return {"details": "Pokemon with this Name not found"}
         return cls(pokemon_id, load_sprite)
     
+    @classmethod
+    def _from_key(cls, pokemon_key, load_sprite=True):
+        """Builds a pokemon from a normalized key (see :func:`_normalize_pokemon_key`)
+
+        :return: a Pokemon object or a dictionary with details if the key could not be resolved
+        :rtype: PokemonObj | dict
+        """
+        if pokemon_key is None:
+            return {"details": "Pokemon must be given by id or name"}
+        if isinstance(pokemon_key, str):
+            return cls.from_pokemon_name(pokemon_key, load_sprite)
+        if pokemon_key < 1:
+            return {"details": "Pokemon Id must be greater than 1"}
+        return cls(pokemon_key, load_sprite)
+    
+    @classmethod
+    def iter_batch(cls, pokemon_keys: list, catalog = None, max_workers = BATCH_WORKERS):
+        """Yields the pokemon for a list of ids and/or names in order of their first occurrence. Duplicates are only resolved once,
+        pokemon of the catalog are taken from memory and the remaining ones are loaded concurrently
+
+        :param pokemon_keys: list of pokemon ids and/or names
+        :type pokemon_keys: list[int | str]
+        :param catalog: preloaded catalog to look up pokemon first, defaults to None
+        :type catalog: PokemonCatalog | None, optional
+        :param max_workers: maximum number of threads loading pokemon that are not part of the catalog, defaults to BATCH_WORKERS
+        :type max_workers: int, optional
+        :return: generator of Pokemon objects, a dictionary with details for every key that could not be resolved
+        :rtype: Generator[PokemonObj | dict]
+        """
+        keys = list(dict.fromkeys(_normalize_pokemon_key(key) for key in pokemon_keys))
+        
+        results = {}
+        misses = []
+        for key in keys:
+            pokemon = None
+            if catalog is not None and key is not None:
+                pokemon = catalog.get_by_name(key) if isinstance(key, str) else catalog.get_by_id(key)
+            if pokemon is None:
+                misses.append(key)
+            else:
+                results[key] = pokemon
+        
+        if len(misses) == 0:
+            for key in keys:
+                yield results[key]
+            return
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(misses))), thread_name_prefix="pokemon_batch") as executor:
+            futures = {key: executor.submit(cls._from_key, key) for key in misses}
+            for key in keys:
+                yield results[key] if key in results else futures[key].result()
+    
+    @classmethod
+    def from_batch(cls, pokemon_keys: list, catalog = None, max_workers = BATCH_WORKERS) -> list:
+        """Returns the pokemon for a list of ids and/or names, see :meth:`iter_batch`
+
+        :param pokemon_keys: list of pokemon ids and/or names
+        :type pokemon_keys: list[int | str]
+        :param catalog: preloaded catalog to look up pokemon first, defaults to None
+        :type catalog: PokemonCatalog | None, optional
+        :param max_workers: maximum number of threads loading pokemon that are not part of the catalog, defaults to BATCH_WORKERS
+        :type max_workers: int, optional
+        :return: list of Pokemon objects without duplicates, a dictionary with details for every key that could not be resolved
+        :rtype: list[PokemonObj | dict]
+        """
+        return list(cls.iter_batch(pokemon_keys, catalog, max_workers))
+    
     def get_id(self):
         return self._poke_id
     
@@ -138,26 +290,52 @@ class PokemonObj(object):
         return {"pokemon_id": self.get_id(), "pokemon_name": self.get_name(), "pokemon_generation": self.get_generation(), 
                 "pokemon_rarity": self.get_rarity().value, "pokemon_points": self.get_points(), "pokemon_stats": self.get_stats(), "pokemon_sprite_path": self.get_sprite_path()}
 
+    def to_json(self) -> bytes:
+        """Returns the json form of :meth:`__dict__` as utf-8 bytes, serialized once per pokemon
+
+        :return: the serialized pokemon
+        :rtype: bytes
+        """
+        try:
+            return self._json
+        except AttributeError:
+            data = json.dumps(self.__dict__(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            # equal for every thread, so a concurrent first call may simply overwrite it
+            object.__setattr__(self, "_json", data)
+            return data
+
     def __str__(self):
         return self.__dict__().__str__()
     
     def __eq__(self, value):
-        return self.__str__() == value.__str__()
+        if isinstance(value, PokemonObj):
+            return self._poke_id == value._poke_id
+        if isinstance(value, dict):
+            return self.__dict__() == value
+        return NotImplemented
+    
+    def __hash__(self):
+        return hash(self._poke_id)
 
 class GenerationObj(object):
-    """This class represents all Pokemon in a Generation
+    """This class represents all Pokemon in a Generation. Random draws use precomputed alias tables, 
+    one uniform and optionally one weighted by the rarity of the pokemon (see :meth:`set_rarity_weights`)
 
     :param gen_id: The id of the generation. Must be 1, 2 or 3
     :type gen_id: int
+    :param seed: seed for the random draws of this generation, defaults to None
+    :type seed: int | None, optional
     
     :raises ValueError: Generation id must be an integer and between 1 to 3
     """
     
-    def __init__(self, gen_id: int):
+    def __init__(self, gen_id: int, seed = None):
         """constructor method
 
         :param gen_id: The id of the generation. Must be one 1, 2 or 3
         :type gen_id: int
+        :param seed: seed for the random draws of this generation, defaults to None
+        :type seed: int | None, optional
     
         :raises ValueError: Generation id must be an integer and between 1 to 3
         """
@@ -166,16 +344,28 @@ class GenerationObj(object):
             log.error("Only Generation 1 - 3 are supported")
             raise ValueError("Only Generation 1 - 3 are supported")
         self._gen_id = gen_id
+        self._rng = rand.Random(seed)
         self._load_pokemon()
     
     def _load_pokemon(self):
         """try to load list with pokemon in this generation
         """
         
-        self._pokemon_list = []
         _pokemon_list = get_pokemon_id_names_by_generation(self._gen_id)
-        if len(_pokemon_list) > 0:
-            self._pokemon_list = _pokemon_list
+        self._set_pokemon_list(_pokemon_list if len(_pokemon_list) > 0 else [])
+    
+    def _set_pokemon_list(self, pokemon_list: list):
+        """Sets the pokemon list and builds the uniform sampler for it
+
+        :param pokemon_list: list of pokemon of form `[{"pokemon_id": int, "pokemon_name": str}, ...]`
+        :type pokemon_list: list
+        """
+        
+        self._pokemon_list = pokemon_list
+        self._sampler = None
+        self._rarity_sampler = None
+        if len(pokemon_list) > 0:
+            self._sampler = AliasSampler([pokemon_json["pokemon_id"] for pokemon_json in pokemon_list], rng=self._rng)
     
     def get_pokemon_list(self):
         return self._pokemon_list
@@ -201,22 +391,99 @@ class GenerationObj(object):
             log.error("Pokemon list is empty")
             raise IndexError("Pokemon List is empty")
 
-    def get_random_pokemon(self):
-        """Returns a random pokemon out of the pokemon list of this generation
+    def get_rarity_weights(self, catalog, rarity_weights = RARITY_DROP_WEIGHTS) -> list:
+        """Returns the drop weight of every pokemon of this generation by its rarity, in order of the pokemon list
+
+        :param catalog: preloaded catalog to look up the rarity of the pokemon
+        :type catalog: PokemonCatalog
+        :param rarity_weights: weight of every rarity, pokemon that are not part of the catalog count as normal, defaults to RARITY_DROP_WEIGHTS
+        :type rarity_weights: dict, optional
+        :return: list of weights
+        :rtype: list[float]
+        """
+        
+        weights = []
+        for pokemon_json in self._pokemon_list:
+            pokemon = catalog.get_by_id(pokemon_json["pokemon_id"])
+            rarity = PokemonRarity.NORMAL if pokemon is None else pokemon.get_rarity()
+            weights.append(rarity_weights.get(rarity, rarity_weights.get(PokemonRarity.NORMAL, 1.0)))
+        return weights
+
+    def set_rarity_weights(self, catalog, rarity_weights = RARITY_DROP_WEIGHTS):
+        """Precomputes the sampler for weighted draws from the rarity of the pokemon (see :meth:`get_rarity_weights`)
+
+        :param catalog: preloaded catalog to look up the rarity of the pokemon
+        :type catalog: PokemonCatalog
+        :param rarity_weights: weight of every rarity, defaults to RARITY_DROP_WEIGHTS
+        :type rarity_weights: dict, optional
+        :raises ValueError: raises if all weights are zero
+        """
+        
+        if len(self._pokemon_list) > 0:
+            self._rarity_sampler = AliasSampler(self._sampler.get_items(), self.get_rarity_weights(catalog, rarity_weights), rng=self._rng)
+
+    def get_sampler(self, weighted = False):
+        """Returns the sampler of this generation
+
+        :param weighted: if `True` the rarity weighted sampler is returned, defaults to False
+        :type weighted: bool, optional
+        :return: the sampler, `None` if the pokemon list is empty or the rarity weights are not set
+        :rtype: AliasSampler | None
+        """
+        return self._rarity_sampler if weighted else self._sampler
+
+    def get_random_pokemon_id(self):
+        """Returns the id of a random pokemon out of the pokemon list of this generation
 
         :raises IndexError: The pokemon list for this generation is empty
-        :return: Pokemon Object with a random pokemon_id
-        :rtype: PokemonObj
+        :return: a random pokemon_id
+        :rtype: int
         """
         
         if len(self._pokemon_list) > 0:
-            rand_index = rand.randint(0, len(self._pokemon_list)-1)
-            poke_id = self._pokemon_list[rand_index]["pokemon_id"]
-            return PokemonObj(poke_id)
+            return self._sampler.draw()
         else:
             log.error("Pokemon list is empty")
             raise IndexError("Pokemon List is empty")
 
+    def get_random_pokemon_ids(self, count: int, weighted = False) -> list:
+        """Returns the ids of several random pokemon out of the pokemon list of this generation, the same pokemon can be drawn more than once
+
+        :param count: number of pokemon to draw
+        :type count: int
+        :param weighted: if `True` rare pokemon drop less often, uniform if the rarity weights are not set (see :meth:`set_rarity_weights`), defaults to False
+        :type weighted: bool, optional
+        :raises IndexError: The pokemon list for this generation is empty
+        :return: list of random pokemon_ids
+        :rtype: list[int]
+        """
+        
+        if len(self._pokemon_list) > 0:
+            sampler = self._sampler
+            if weighted:
+                if self._rarity_sampler is None:
+                    log.warning("Rarity weights are not set, drawing uniform")
+                else:
+                    sampler = self._rarity_sampler
+            return sampler.draw_many(count)
+        else:
+            log.error("Pokemon list is empty")
+            raise IndexError("Pokemon List is empty")
+
+    def get_random_pokemon(self, catalog = None):
+        """Returns a random pokemon out of the pokemon list of this generation
+
+        :param catalog: preloaded catalog to take the pokemon from, defaults to None
+        :type catalog: PokemonCatalog | None, optional
+        :raises IndexError: The pokemon list for this generation is empty
+        :return: Pokemon Object with a random pokemon_id
+        :rtype: PokemonObj
+        """
+        
+        pokemon_id = self.get_random_pokemon_id()
+        pokemon = None if catalog is None else catalog.get_by_id(pokemon_id)
+        return PokemonObj(pokemon_id) if pokemon is None else pokemon
+
     def get_generation_id(self):
         return self._gen_id
 
@@ -228,35 +495,256 @@ class GenerationObj(object):
 
     def __eq__(self, value):
         return self.__str__() == value.__str__()
+
+
+class PokemonCatalog(object):
+    """This class represents an in-memory table of all pokemon of the supported generations.
+    It is filled once by :meth:`load` and can be read afterwards without touching the pokebase cache.
+    The loaded table can be written to an on-disk snapshot so warm restarts skip the rebuild.
+
+    :param generations: ids of the generations that belong to the catalog, defaults to (1, 2, 3)
+    :type generations: tuple, optional
+    :param snapshot_path: path of the on-disk snapshot, no snapshot is used if empty, defaults to CATALOG_SNAPSHOT
+    :type snapshot_path: str, optional
+    """
     
+    def __init__(self, generations = SUPPORTED_GENERATIONS, snapshot_path = CATALOG_SNAPSHOT):
+        """constructor method
+
+        :param generations: ids of the generations that belong to the catalog, defaults to (1, 2, 3)
+        :type generations: tuple, optional
+        :param snapshot_path: path of the on-disk snapshot, no snapshot is used if empty, defaults to CATALOG_SNAPSHOT
+        :type snapshot_path: str, optional
+        """
+        
+        self._generations = tuple(generations)
+        self._snapshot_path = snapshot_path
+        self._by_id = {}
+        self._by_name = {}
+        self._version = ""
+        self._last_modified = None
+    
+    def load(self) -> int:
+        """Loads the catalog from the snapshot if possible, otherwise builds it from the pokebase cache and writes a new snapshot
+
+        :return: number of pokemon inside the catalog
+        :rtype: int
+        """
+        
+        pokemon_list = self._load_snapshot()
+        if pokemon_list is None:
+            pokemon_list, complete = self._build()
+            # never persist a catalog that misses pokemon
+            if complete:
+                self._save_snapshot(pokemon_list)
+        # workers that share a snapshot report the same modification time
+        try:
+            last_modified = os.path.getmtime(self._snapshot_path) if self._snapshot_path else None
+        except OSError:
+            last_modified = None
+        self._set_table(pokemon_list, last_modified)
+        log.info(f"Pokemon catalog loaded with {len(self._by_id)} pokemon")
+        return len(self._by_id)
+
+    def _build(self):
+        """Builds all pokemon objects of the catalog generations
+
+        :return: list of loaded pokemon and `True` if every pokemon could be loaded
+        :rtype: tuple[list[PokemonObj], bool]
+        """
+        
+        pokemon_list = []
+        complete = True
+        for gen_id in self._generations:
+            generation_list = get_pokemon_id_names_by_generation(gen_id)
+            if len(generation_list) == 0:
+                complete = False
+            for elem in generation_list:
+                pokemon = PokemonObj(elem["pokemon_id"])
+                if pokemon.get_name() == "" or pokemon.get_sprite_path() == "":
+                    complete = False
+                    continue
+                pokemon_list.append(pokemon)
+        return pokemon_list, complete
+
+    def _load_snapshot(self):
+        """Loads the pokemon of the catalog from the snapshot
+
+        :return: list of pokemon or `None` if there is no usable snapshot
+        :rtype: list[PokemonObj] | None
+        """
         
+        if not self._snapshot_path or not os.path.exists(self._snapshot_path):
+            return None
+        try:
+            with open(self._snapshot_path) as file:
+                snapshot = json.load(file)
+            if snapshot["version"] != CATALOG_SNAPSHOT_VERSION or tuple(snapshot["generations"]) != self._generations:
+                log.warning("Pokemon catalog snapshot is outdated and will be rebuilt")
+                return None
+            return [PokemonObj.from_dict(elem) for elem in snapshot["pokemon"]]
+        except (OSError, ValueError, KeyError) as e:
+            log.warning(f"Could not load pokemon catalog snapshot. Error: {e.__str__()}")
+            return None
+
+    def _save_snapshot(self, pokemon_list: list):
+        """Writes the pokemon of the catalog to the snapshot. The file is replaced atomically
+
+        :param pokemon_list: list of pokemon that will be written
+        :type pokemon_list: list[PokemonObj]
+        """
+        
+        if not self._snapshot_path:
+            return
+        snapshot = {
+            "version": CATALOG_SNAPSHOT_VERSION,
+            "generations": list(self._generations),
+            "pokemon": [pokemon.__dict__() for pokemon in pokemon_list]
+        }
+        tmp_path = f"{self._snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as file:
+                json.dump(snapshot, file)
+            os.replace(tmp_path, self._snapshot_path)
+        except OSError as e:
+            log.warning(f"Could not write pokemon catalog snapshot. Error: {e.__str__()}")
+
+    def _set_table(self, pokemon_list: list, last_modified = None):
+        """Replaces the tables of the catalog with the given pokemon. The version of the catalog is a hash of 
+        the serialized pokemon, so it is the same for every worker that loaded the same data
+
+        :param pokemon_list: list of pokemon of the catalog
+        :type pokemon_list: list[PokemonObj]
+        :param last_modified: unix timestamp of the data, defaults to None (now)
+        :type last_modified: float | None, optional
+        """
+        
+        version = hashlib.blake2b(digest_size=8)
+        for pokemon in sorted(pokemon_list, key=lambda pokemon: pokemon.get_id()):
+            version.update(pokemon.to_json())
+        self._by_id = {pokemon.get_id(): pokemon for pokemon in pokemon_list}
+        self._by_name = {pokemon.get_name(): pokemon for pokemon in pokemon_list}
+        self._version = version.hexdigest()
+        self._last_modified = time.time() if last_modified is None else last_modified
+
+    def get_version(self) -> str:
+        """Returns the version of the loaded pokemon
+
+        :return: hash of the catalog, empty if the catalog is not loaded
+        :rtype: str
+        """
+        
+        return self._version if self.is_loaded() else ""
+
+    def get_last_modified(self):
+        """Returns when the loaded pokemon were last modified
+
+        :return: unix timestamp, `None` if the catalog is not loaded
+        :rtype: float | None
+        """
+        
+        return self._last_modified if self.is_loaded() else None
+
+    def is_loaded(self):
+        return len(self._by_id) > 0
+
+    def get_by_id(self, poke_id: int):
+        """Returns the pokemon with the given id
+
+        :param poke_id: id of the pokemon
+        :type poke_id: int
+        :return: the pokemon or `None` if it is not part of the catalog
+        :rtype: PokemonObj | None
+        """
+        
+        return self._by_id.get(poke_id)
+
+    def get_by_name(self, pokemon_name: str):
+        """Returns the pokemon with the given name
+
+        :param pokemon_name: name of the pokemon
+        :type pokemon_name: str
+        :return: the pokemon or `None` if it is not part of the catalog
+        :rtype: PokemonObj | None
+        """
+        
+        if not isinstance(pokemon_name, str):
+            return None
+        return self._by_name.get(pokemon_name.lower())
+
+    def __len__(self):
+        return len(self._by_id)
+
+
 class Database(object):
-    """This class represents the connection to the database and offers methods for functionallity
+    """This class represents the connection to the database and offers methods for functionallity.
+    It owns a bounded connection pool, every method checks out its own connection for the duration of the call.
 
     :param db_settings: Dictionary containing all the information to connect to a database, defaults to None
     :type db_settings: dict | None
+    :param pool_settings: Dictionary containing the settings of the connection pool (min_size, max_size, timeout, check_interval), defaults to None
+    :type pool_settings: dict | None
     
     :raises ConnectionError: Raises if connection to database failed
     """
     
-    def __init__(self, db_settings = None):
+    def __init__(self, db_settings = None, pool_settings = None):
         """constructor method
 
         :param db_settings: Dictionary containing all the information to connect to a database, if none environment variables will be used, defaults to None
         :type db_settings: dict | None
+        :param pool_settings: Dictionary containing the settings of the connection pool, if none environment variables will be used, defaults to None
+        :type pool_settings: dict | None
         
         :raises ConnectionError: Raises if connection to database failed
         """
         
-        if db_settings is not None:
-            self._conn = get_postgress_conn(db_settings)
-        else:
-            self._conn = get_postgress_conn(DB_SETTINGS)
-        if self._conn is None:
-            raise ConnectionError("Could not connect do Database")
+        if db_settings is None:
+            db_settings = DB_SETTINGS
+        if pool_settings is None:
+            pool_settings = POOL_SETTINGS
+        self._pool = ConnectionPool(db_settings, **pool_settings)
+        self._leaderboard = LeaderboardCache()
+        self._leaderboard_lock = threading.Lock()
+        self._user_listeners = []
+    
+    def get_pool(self):
+        return self._pool
+    
+    def add_user_listener(self, listener):
+        """Registers a function that is called after a user got changed or deleted
+
+        :param listener: function that takes the name of the changed user, `None` if all users changed
+        :type listener: Callable[[str | None], Any]
+        """
+        self._user_listeners.append(listener)
+    
+    def _notify_user_changed(self, user_name: str | None):
+        for listener in self._user_listeners:
+            listener(user_name)
+    
+    def get_leaderboard_cache(self):
+        return self._leaderboard
+    
+    def _refresh_leaderboard(self) -> bool:
+        """Reloads the top of the leaderboard from the database if it is stale. Only one thread reloads at a time
+
+        :return: `True` if the cache is up to date, `False` if it could not be reloaded
+        :rtype: bool
+        """
+        
+        with self._leaderboard_lock:
+            if not self._leaderboard.is_stale():
+                return True
+            version = self._leaderboard.get_version()
+            with self._pool.connection(read_only=True) as conn:
+                users = get_leaderboard_from_db(conn, limit=self._leaderboard.get_size())
+            if "users" not in users:
+                return False
+            return self._leaderboard.load(users["users"], version) == 0
     
     def close(self) -> int:
-        """Closes the connection to the database
+        """Closes all connections of the pool to the database
 
         :raises ConnectionError: raises if the connection is already a none type object
         :raises DatabaseError: raises if closing the connection failes
@@ -264,9 +752,9 @@ class Database(object):
         :rtype: int
         """
         
-        output = close_connection(self._conn)
+        output = self._pool.close()
         if output == 1:
-            raise ConnectionError("Close connection function received none type object for connection")
+            raise DatabaseConnectionError("Close connection function received none type object for connection")
         elif output == 2:
             raise DatabaseError("Unresolved error occured, could not close connection")
         else:
@@ -281,9 +769,11 @@ class Database(object):
         :rtype: int
         """
         
-        output = create_table(self._conn)
+        with self._pool.connection() as conn:
+            output = create_table(conn)
+        self._leaderboard.invalidate()
         if output == 1:
-            raise ConnectionError("Create table function received none type object for connection")
+            raise DatabaseConnectionError("Create table function received none type object for connection")
         elif output == 2:
             raise DatabaseError("Unresolved error occured, could not create table")
         else:
@@ -298,9 +788,12 @@ class Database(object):
         :rtype: int
         """
 
-        output = clean_table(self._conn)
+        with self._pool.connection() as conn:
+            output = clean_table(conn)
+        self._leaderboard.invalidate()
+        self._notify_user_changed(None)
         if output == 1:
-            raise ConnectionError("Create table function received none type object for connection")
+            raise DatabaseConnectionError("Create table function received none type object for connection")
         elif output == 2:
             raise DatabaseError("Unresolved error occured, could not create table")
         else:
@@ -315,14 +808,50 @@ class Database(object):
         :rtype: int
         """
         
-        output = delete_table(self._conn)
+        with self._pool.connection() as conn:
+            output = delete_table(conn)
+        self._leaderboard.invalidate()
+        self._notify_user_changed(None)
         if output == 1:
-            raise ConnectionError("Delete table function received none type object for connection")
+            raise DatabaseConnectionError("Delete table function received none type object for connection")
         elif output == 2:
             raise DatabaseError("Unresolved error occured, could not delete table")
         else:
             return output
     
+    @contextmanager
+    def transaction(self):
+        """Context manager for a unit of work: all writes of the yielded :class:`DatabaseTransaction` share one connection 
+        and are committed together when the block ends, e.g. registering a user and seeding the deck.
+        Passwords are hashed before the block, see :meth:`DatabaseTransaction.add_user_with_hash`.
+        Caches and user listeners are only informed after the commit
+
+        :raises ConnectionError: raises if no connection could be checked out
+        :raises DatabaseError: raises if a write failed inside of the database or the commit failed, nothing was written
+        :yield: the transaction to write with
+        :rtype: DatabaseTransaction
+        """
+        
+        with self._pool.connection() as conn:
+            with unit_of_work(conn):
+                transaction = DatabaseTransaction(conn)
+                yield transaction
+        if transaction.has_changes():
+            self._leaderboard.invalidate()
+            for user_name in transaction.get_changed_users():
+                self._notify_user_changed(user_name)
+
+    def run_transaction(self, func, *args):
+        """Runs a function inside of :meth:`transaction`
+
+        :param func: function that gets the transaction followed by the arguments
+        :type func: Callable[[DatabaseTransaction, ...], Any]
+        :return: the result of the function
+        """
+        
+        with self.transaction() as transaction:
+            return func(transaction, *args)
+
     def get_user(self, user_name: str) -> dict:
         """Returns a user in dictionary format containing his id, name, and list of pokemon_ids inside his deck called deck_id
 
@@ -334,7 +863,8 @@ class Database(object):
         :rtype: dict
         """
         
-        return get_user_from_db(self._conn, user_name).__dict__()
+        with self._pool.connection(read_only=True) as conn:
+            return get_user_from_db(conn, user_name).__dict__()
 
     def get_users(self):
         """Returns a dictionary containing a list of all users in the table
@@ -346,10 +876,124 @@ class Database(object):
         :rtype: dict
         """
         
-        return get_all_users_from_db(self._conn)
+        with self._pool.connection(read_only=True) as conn:
+            return get_all_users_from_db(conn)
+
+    def get_users_page(self, after_id = 0, limit = USER_STREAM_ITERSIZE) -> list:
+        """Returns the next users ordered by id after the given id, see :func:`get_users_page_from_db`
+
+        :param after_id: id of the last user of the previous page, defaults to 0
+        :type after_id: int, optional
+        :param limit: maximum number of users to return, defaults to USER_STREAM_ITERSIZE
+        :type limit: int, optional
+        :raises DatabaseError: raises if fetching failed
+        :return: the users: `[{"user_id": int, "user_name": str, "deck_ids": list, "points": int}, ...]`
+        :rtype: list[dict]
+        """
+        
+        with self._pool.connection(read_only=True) as conn:
+            return get_users_page_from_db(conn, after_id, limit)
+
+    def iter_users(self, itersize = USER_STREAM_ITERSIZE):
+        """Yields all users one by one ordered by id, fetched in pages of `itersize` with :meth:`get_users_page`.
+        A connection of the pool is only checked out while a page is fetched, not while the consumer is waiting.
+        The pages are no snapshot, see :func:`iter_users_from_db`
+
+        :param itersize: rows fetched per round trip, defaults to USER_STREAM_ITERSIZE
+        :type itersize: int, optional
+        :raises DatabaseError: raises if fetching failed
+        :yield: `{"user_id": int, "user_name": str, "deck_ids": list, "points": int}`
+        :rtype: Generator[dict]
+        """
+        
+        after_id = 0
+        itersize = max(1, itersize)
+        while True:
+            users = self.get_users_page(after_id, itersize)
+            yield from users
+            if len(users) < itersize:
+                return
+            after_id = users[-1]["user_id"]
+
+    def get_leaderboard(self, limit = 10, offset = 0, after_points = None, after_id = None) -> dict:
+        """Returns the users with the most points ordered by points, see :func:`get_leaderboard_from_db`.
+        Served from the leaderboard cache, the database is only queried if the cache is stale or the page reaches below the cached top
+
+        :param limit: maximum number of users to return, defaults to 10
+        :type limit: int, optional
+        :param offset: number of users to skip, defaults to 0
+        :type offset: int, optional
+        :param after_points: points of the last user of the previous page, defaults to None
+        :type after_points: int | None, optional
+        :param after_id: id of the last user of the previous page, defaults to None
+        :type after_id: int | None, optional
+        :return: A dictionary containing the names and points of the users:
+                  `{"users": [{"user_id": int, "user_name": str, "points": int}, ...]}`
+                  `{}` if fetch failed
+        :rtype: dict
+        """
+        
+        if self._refresh_leaderboard():
+            page = self._leaderboard.get_top(limit, offset, after_points, after_id)
+            if page is not None:
+                return page
+        with self._pool.connection(read_only=True) as conn:
+            return get_leaderboard_from_db(conn, limit, offset, after_points, after_id)
+
+    def get_user_rank(self, user_name: str) -> int:
+        """Returns the rank of a user on the leaderboard. Served from the leaderboard cache, 
+        the database is only queried if the cache is stale or the user is below the cached top
+
+        :param user_name: the user name of the user
+        :type user_name: str
+        :return: rank of the user starting at `1`, `-1` if the user does not exist
+        :rtype: int
+        """
+        
+        if self._refresh_leaderboard():
+            rank = self._leaderboard.get_rank(user_name)
+            if rank != -1:
+                return rank
+        with self._pool.connection(read_only=True) as conn:
+            return get_user_rank_from_db(conn, user_name)
+
+    def get_user_password(self, user_name: str, user_password: str) -> tuple:
+        """Returns the user and its stored hash, see :func:`get_user_password_from_db`. The connection is released before the password is hashed
+
+        :param user_name: the user name of the user to get
+        :type user_name: str
+        :param user_password: password of the user, only used for legacy hashes
+        :type user_password: str
+        :return: `(UserObj, hash)`, `(empty UserObj, None)` if the user does not exist or a legacy hash did not match
+        :rtype: tuple[UserObj, str | None]
+        """
+        
+        with self._pool.connection(read_only=True) as conn:
+            return get_user_password_from_db(conn, user_name, user_password)
+
+    def rehash_password(self, user_name: str, password_hash: str, old_password_hash: str) -> int:
+        """Replaces the hash of a user after a successful login, see :func:`rehash_password_from_db`. 
+        A failed rehash does not fail the login, so a missing connection is only reported
+
+        :param user_name: the user name of the user
+        :type user_name: str
+        :param password_hash: the new hash
+        :type password_hash: str
+        :param old_password_hash: the hash the password was verified against
+        :type old_password_hash: str
+        :return: `0` if successful, `1` if no connection was available, `2` if the update failed
+        :rtype: int
+        """
+        
+        try:
+            with self._pool.connection() as conn:
+                return rehash_password_from_db(conn, user_name, password_hash, old_password_hash)
+        except (PoolTimeoutError, DatabaseConnectionError):
+            return 1
 
     def authenticate_user(self, user_name: str, user_password: str) -> dict:
-        """Authenticates the user and if the authentication is successfully it returns the user
+        """Authenticates the user and if the authentication is successfully it returns the user. 
+        The password is hashed without holding a connection of the pool
 
         :param user_name: the user name of the user to get
         :type user_name: str
@@ -361,7 +1005,12 @@ class Database(object):
         :rtype: dict
         """
         
-        return authenticate_user_from_db(self._conn, user_name, user_password).__dict__()
+        user, password_hash = self.get_user_password(user_name, user_password)
+        if not verify_user_password(user_password, password_hash):
+            return UserObj.create_empty().__dict__()
+        if password_hasher.needs_rehash(password_hash):
+            self.rehash_password(user_name, password_hasher.hash(user_password), password_hash)
+        return user.__dict__()
 
     def add_user(self, user_name: str, passwd: str, pokemon_list = []) -> int:
         """Add a new user to the table
@@ -378,30 +1027,87 @@ class Database(object):
         :rtype: int
         """
         
-        output = add_user_with_crypt_pass(self._conn, user_name, passwd, pokemon_list)
+        output = check_new_user_input(user_name, passwd, pokemon_list)
+        if output != 0:
+            return output
+        # hashed before a connection is checked out
+        return self.add_user_with_hash(user_name, password_hasher.hash(passwd), pokemon_list)
+
+    def add_user_with_hash(self, user_name: str, password_hash: str, pokemon_list = []) -> int:
+        """Add a new user with an already hashed password to the table, see :meth:`add_user`
+
+        :param user_name: The name of the user
+        :type user_name: str
+        :param password_hash: The hash of the password of the user, e.g. by :data:`password_hasher`
+        :type password_hash: str
+        :param pokemon_list: a list of pokemon ids representing the deck of the user, defaults to []
+        :type pokemon_list: list, optional
+        :raises ConnectionError: raises if the connection is a none type object
+        :raises DatabaseError: raises if adding the user failes
+        :return: `0` if successfull, `1` if ConnectionError, `2` if DatabaseError
+        :rtype: int
+        """
+        
+        with self._pool.connection() as conn:
+            output = add_user_with_password_hash(conn, user_name, password_hash, pokemon_list)
+        if output == 0:
+            self._leaderboard.invalidate()
         if output == 1:
-            raise ConnectionError("Add user function received none type object for connection")
+            raise DatabaseConnectionError("Add user function received none type object for connection")
         elif output == 2:
             raise DatabaseError("Unresolved error occured, could not add new user")
         else:
             return output
 
-    def add_elem_to_user_deck(self, user_name: str, new_elem):
-        """Add an element to a users deck
+    def add_elem_to_user_deck(self, user_name: str, new_elem) -> int:
+        """Add an element to a users deck if it is not already part of it. The check and the append happen inside the database in one statement
 
         :param user_name: The name of the user
         :type user_name: str
         :param new_elem: the element that should be added to the user of form `{"_id": int, "_name": str}`
         :type new_elem: dict
+        :raises ConnectionError: raises if the connection is a none type object
+        :raises DatabaseError: raises if adding the element failes
+        :return: `0` if the element was new and got added, `14` if the element is already part of the deck, `15` if the user does not exist, 
+                 other codes see :func:`append_elem_to_user_deck_from_db`
+        :rtype: int
+        """
+        
+        with self._pool.connection() as conn:
+            output = append_elem_to_user_deck_from_db(conn, user_name, new_elem)
+        if output == 0:
+            self._notify_user_changed(user_name)
+        if output == 1:
+            raise DatabaseConnectionError("Add element function received none type object for connection")
+        elif output == 2:
+            raise DatabaseError("Unresolved error occured, could not add element to user")
+        else:
+            return output
+        
+    def add_elems_to_user_deck(self, user_name: str, new_elems: list) -> int:
+        """Add several elements to a users deck in one transaction, elements that are already part of the deck are skipped
 
-        :return: `0` if successfull
-        :rtype: int | void
+        :param user_name: The name of the user
+        :type user_name: str
+        :param new_elems: the elements that should be added to the user of form `[{"_id": int, "_name": str}, ...]`
+        :type new_elems: list
+        :raises ConnectionError: raises if the connection is a none type object
+        :raises DatabaseError: raises if adding the elements failes
+        :return: `0` if at least one element was new and got added, `14` if all elements are already part of the deck, `15` if the user does not exist, 
+                 other codes see :func:`append_elems_to_user_deck_from_db`
+        :rtype: int
         """
-        user = get_user_from_db(self._conn, user_name)
-        if not user.__empty__() and new_elem not in user.deck_ids:
-            user.deck_ids.append(new_elem)
-            print(user.deck_ids)
-            return self.update_user(user_name, user.deck_ids)
+        
+        with self._pool.connection() as conn:
+            output = append_elems_to_user_deck_from_db(conn, user_name, new_elems)
+        if output == 0:
+            self._notify_user_changed(user_name)
+        if output == 1:
+            raise DatabaseConnectionError("Add elements function received none type object for connection")
+        elif output == 2:
+            raise DatabaseError("Unresolved error occured, could not add elements to user")
+        else:
+            return output
         
     def update_user(self, user_name: str, pokemon_list = []) -> int:
         """Updates the deck of a user.
@@ -416,9 +1122,12 @@ class Database(object):
         :rtype: int
         """
         
-        output = update_user_from_db(self._conn, user_name, pokemon_list)
+        with self._pool.connection() as conn:
+            output = update_user_from_db(conn, user_name, pokemon_list)
+        if output == 0:
+            self._notify_user_changed(user_name)
         if output == 1:
-            raise ConnectionError("Update user function received none type object for connection")
+            raise DatabaseConnectionError("Update user function received none type object for connection")
         elif output == 2:
             raise DatabaseError("Unresolved error occured, could not update user")
         else:
@@ -437,9 +1146,14 @@ class Database(object):
         :rtype: int
         """
         
-        output = update_user_from_db_points(self._conn, user_name, points)
+        with self._pool.connection() as conn:
+            output = update_user_from_db_points(conn, user_name, points)
+        if output == 0:
+            if not self._leaderboard.update(user_name, points):
+                self._leaderboard.invalidate()
+            self._notify_user_changed(user_name)
         if output == 1:
-            raise ConnectionError("Update user function received none type object for connection")
+            raise DatabaseConnectionError("Update user function received none type object for connection")
         elif output == 2:
             raise DatabaseError("Unresolved error occured, could not update user")
         else:
@@ -456,10 +1170,344 @@ class Database(object):
         :rtype: int
         """
         
-        output = delete_user_from_db(self._conn, user_name)
+        with self._pool.connection() as conn:
+            output = delete_user_from_db(conn, user_name)
+        if output == 0:
+            self._leaderboard.remove(user_name)
+            self._notify_user_changed(user_name)
         if output == 1:
-            raise ConnectionError("Delete user function received none type object for connection")
+            raise DatabaseConnectionError("Delete user function received none type object for connection")
         elif output == 2:
             raise DatabaseError("Unresolved error occured, could not delete user")
         else:
-            return output
\ No newline at end of file
+            return output
+
+    def import_users(self, source, copy_format = "csv", on_conflict = "skip", progress = None) -> dict:
+        """Imports users in bulk with COPY, see :func:`import_users_to_db`. Passwords must already be hashed
+
+        :param source: file opened for reading or iterable of str or bytes chunks (e.g. csv lines)
+        :param copy_format: "csv" or "binary", defaults to "csv"
+        :type copy_format: str, optional
+        :param on_conflict: "skip" keeps existing users, "update" overwrites them, defaults to "skip"
+        :type on_conflict: str, optional
+        :param progress: function that takes the number of bytes read so far, defaults to None
+        :type progress: Callable[[int], Any] | None, optional
+        :raises DatabaseError: raises if the import failed, nothing was imported
+        :return: `{"read": int, "imported": int}`
+        :rtype: dict
+        """
+        
+        with self._pool.connection() as conn:
+            output = import_users_to_db(conn, source, copy_format, on_conflict, progress)
+        if output == {}:
+            raise DatabaseError("Unresolved error occured, could not import users")
+        if output["imported"] > 0:
+            self._leaderboard.invalidate()
+            self._notify_user_changed(None)
+        return output
+
+    def export_users(self, file, copy_format = "csv", progress = None) -> dict:
+        """Exports all users in bulk with COPY, see :func:`export_users_from_db`
+
+        :param file: file opened for writing, text mode for csv or binary mode
+        :param copy_format: "csv" or "binary", defaults to "csv"
+        :type copy_format: str, optional
+        :param progress: function that takes the number of bytes written so far, defaults to None
+        :type progress: Callable[[int], Any] | None, optional
+        :raises DatabaseError: raises if the export failed
+        :return: `{"exported": int}`
+        :rtype: dict
+        """
+        
+        with self._pool.connection(read_only=True) as conn:
+            output = export_users_from_db(conn, file, copy_format, progress)
+        if output == {}:
+            raise DatabaseError("Unresolved error occured, could not export users")
+        return output
+
+
+class DatabaseTransaction(object):
+    """This class offers the writes of :class:`Database` on the connection of a unit of work, see :meth:`Database.transaction`.
+    Nothing is committed before the unit of work ends
+
+    :param conn: the connection of the unit of work
+    :type conn: psycopg2.connect
+    """
+    
+    def __init__(self, conn):
+        """constructor method
+
+        :param conn: the connection of the unit of work
+        :type conn: psycopg2.connect
+        """
+        
+        self._conn = conn
+        self._changed_users = []
+        self._changed = False
+
+    def _written(self, output: int, user_name: str, action: str) -> int:
+        """Maps the result of a write like :class:`Database` does and remembers the changed user
+        """
+        
+        if output == 0:
+            self._changed = True
+            if user_name not in self._changed_users:
+                self._changed_users.append(user_name)
+        if output == 1:
+            raise DatabaseConnectionError(f"{action} function received none type object for connection")
+        elif output == 2:
+            raise DatabaseError(f"Unresolved error occured, could not {action.lower()}")
+        return output
+
+    def has_changes(self) -> bool:
+        return self._changed
+
+    def get_changed_users(self) -> list:
+        return list(self._changed_users)
+
+    def get_user(self, user_name: str) -> dict:
+        """See :meth:`Database.get_user`, sees the writes of this transaction
+        """
+        
+        return get_user_from_db(self._conn, user_name).__dict__()
+
+    def add_user_with_hash(self, user_name: str, password_hash: str, pokemon_list = []) -> int:
+        """See :meth:`Database.add_user_with_hash`. The password has to be hashed before :meth:`Database.transaction`, 
+        so the connection of the unit is not held while hashing. If the user already exists (`3`) the transaction can only be rolled back
+        """
+        
+        return self._written(add_user_with_password_hash(self._conn, user_name, password_hash, pokemon_list), user_name, "Add user")
+
+    def add_elem_to_user_deck(self, user_name: str, new_elem) -> int:
+        """See :meth:`Database.add_elem_to_user_deck`
+        """
+        
+        return self._written(append_elem_to_user_deck_from_db(self._conn, user_name, new_elem), user_name, "Add element")
+
+    def add_elems_to_user_deck(self, user_name: str, new_elems: list) -> int:
+        """See :meth:`Database.add_elems_to_user_deck`
+        """
+        
+        return self._written(append_elems_to_user_deck_from_db(self._conn, user_name, new_elems), user_name, "Add elements")
+
+    def update_user(self, user_name: str, pokemon_list = []) -> int:
+        """See :meth:`Database.update_user`
+        """
+        
+        return self._written(update_user_from_db(self._conn, user_name, pokemon_list), user_name, "Update user")
+
+    def update_user_points(self, user_name: str, points: int) -> int:
+        """See :meth:`Database.update_user_points`
+        """
+        
+        return self._written(update_user_from_db_points(self._conn, user_name, points), user_name, "Update user points")
+
+    def delete_user(self, user_name: str) -> int:
+        """See :meth:`Database.delete_user`
+        """
+        
+        return self._written(delete_user_from_db(self._conn, user_name), user_name, "Delete user")
+
+
+class AsyncDatabase(object):
+    """Asyncio twin of :class:`Database` with the same method surface. Every call runs on a thread pool that is sized like the connection pool,
+    so awaiting handlers never block the event loop and no worker thread has to wait for a free connection.
+    Table management and closing stay synchronous since they only run on startup and shutdown.
+
+    :param db_settings: Dictionary containing all the information to connect to a database, defaults to None
+    :type db_settings: dict | None
+    :param pool_settings: Dictionary containing the settings of the connection pool, defaults to None
+    :type pool_settings: dict | None
+    
+    :raises ConnectionError: Raises if connection to database failed
+    """
+    
+    def __init__(self, db_settings = None, pool_settings = None):
+        """constructor method
+
+        :param db_settings: Dictionary containing all the information to connect to a database, if none environment variables will be used, defaults to None
+        :type db_settings: dict | None
+        :param pool_settings: Dictionary containing the settings of the connection pool, if none environment variables will be used, defaults to None
+        :type pool_settings: dict | None
+        
+        :raises ConnectionError: Raises if connection to database failed
+        """
+        
+        self._db = Database(db_settings, pool_settings)
+        self._executor = ThreadPoolExecutor(max_workers=self._db.get_pool().get_max_size(), thread_name_prefix="database")
+
+    def get_database(self):
+        return self._db
+
+    def add_user_listener(self, listener):
+        """See :meth:`Database.add_user_listener`, listeners are called on the worker threads
+        """
+        self._db.add_user_listener(listener)
+
+    async def _run(self, func, *args):
+        """Runs a blocking database method on the executor of this object
+
+        :param func: the method of the synchronous database that should run
+        :type func: callable
+        :return: the result of the method
+        """
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    def close(self) -> int:
+        """Stops the executor and closes all connections of the pool. See :meth:`Database.close`
+        """
+        
+        self._executor.shutdown(wait=True)
+        return self._db.close()
+
+    def create_table(self) -> int:
+        """See :meth:`Database.create_table`
+        """
+        
+        return self._db.create_table()
+
+    def clean_table(self) -> int:
+        """See :meth:`Database.clean_table`
+        """
+        
+        return self._db.clean_table()
+
+    def delete_table(self) -> int:
+        """See :meth:`Database.delete_table`
+        """
+        
+        return self._db.delete_table()
+
+    async def run_transaction(self, func, *args):
+        """See :meth:`Database.run_transaction`, the function runs on a worker thread
+        """
+        
+        return await self._run(self._db.run_transaction, func, *args)
+
+    async def get_user(self, user_name: str) -> dict:
+        """See :meth:`Database.get_user`
+        """
+        
+        return await self._run(self._db.get_user, user_name)
+
+    async def get_users(self) -> dict:
+        """See :meth:`Database.get_users`
+        """
+        
+        return await self._run(self._db.get_users)
+
+    async def get_users_page(self, after_id = 0, limit = USER_STREAM_ITERSIZE) -> list:
+        """See :meth:`Database.get_users_page`
+        """
+        
+        return await self._run(self._db.get_users_page, after_id, limit)
+
+    async def iter_users(self, itersize = USER_STREAM_ITERSIZE):
+        """See :meth:`Database.iter_users`. Every page is fetched by one worker thread call on a connection that is released right after,
+        so neither a thread nor a connection is held while the consumer is waiting
+
+        :param itersize: rows fetched per round trip and per worker thread call, defaults to USER_STREAM_ITERSIZE
+        :type itersize: int, optional
+        :yield: `{"user_id": int, "user_name": str, "deck_ids": list, "points": int}`
+        :rtype: AsyncGenerator[dict]
+        """
+        
+        after_id = 0
+        itersize = max(1, itersize)
+        while True:
+            users = await self.get_users_page(after_id, itersize)
+            for user in users:
+                yield user
+            if len(users) < itersize:
+                return
+            after_id = users[-1]["user_id"]
+
+    async def get_leaderboard(self, limit = 10, offset = 0, after_points = None, after_id = None) -> dict:
+        """See :meth:`Database.get_leaderboard`
+        """
+        
+        return await self._run(self._db.get_leaderboard, limit, offset, after_points, after_id)
+
+    async def get_user_rank(self, user_name: str) -> int:
+        """See :meth:`Database.get_user_rank`
+        """
+        
+        return await self._run(self._db.get_user_rank, user_name)
+
+    async def authenticate_user(self, user_name: str, user_password: str) -> dict:
+        """See :meth:`Database.authenticate_user`. Only the queries run on the executor of this object,
+        the password is hashed on the pool of :data:`password_hasher` without holding a worker thread or a connection
+        """
+        
+        user, password_hash = await self._run(self._db.get_user_password, user_name, user_password)
+        if password_hash is None:
+            # as long as a wrong password, so unknown user names are not revealed
+            await password_hasher.verify_async(user_password, password_hasher.get_dummy_hash())
+            return UserObj.create_empty().__dict__()
+        # legacy hashes were already verified by the database
+        if not is_legacy_hash(password_hash) and not await password_hasher.verify_async(user_password, password_hash):
+            return UserObj.create_empty().__dict__()
+        if password_hasher.needs_rehash(password_hash):
+            new_password_hash = await password_hasher.hash_async(user_password)
+            await self._run(self._db.rehash_password, user_name, new_password_hash, password_hash)
+        return user.__dict__()
+
+    async def add_user(self, user_name: str, passwd: str, pokemon_list = []) -> int:
+        """See :meth:`Database.add_user`, the password is hashed on the pool of :data:`password_hasher` before the insert runs on the executor
+        """
+        
+        output = check_new_user_input(user_name, passwd, pokemon_list)
+        if output != 0:
+            return output
+        password_hash = await password_hasher.hash_async(passwd)
+        return await self._run(self._db.add_user_with_hash, user_name, password_hash, pokemon_list)
+
+    async def add_user_with_hash(self, user_name: str, password_hash: str, pokemon_list = []) -> int:
+        """See :meth:`Database.add_user_with_hash`
+        """
+        
+        return await self._run(self._db.add_user_with_hash, user_name, password_hash, pokemon_list)
+
+    async def add_elem_to_user_deck(self, user_name: str, new_elem):
+        """See :meth:`Database.add_elem_to_user_deck`
+        """
+        
+        return await self._run(self._db.add_elem_to_user_deck, user_name, new_elem)
+
+    async def add_elems_to_user_deck(self, user_name: str, new_elems: list) -> int:
+        """See :meth:`Database.add_elems_to_user_deck`
+        """
+        
+        return await self._run(self._db.add_elems_to_user_deck, user_name, new_elems)
+
+    async def update_user(self, user_name: str, pokemon_list = []) -> int:
+        """See :meth:`Database.update_user`
+        """
+        
+        return await self._run(self._db.update_user, user_name, pokemon_list)
+
+    async def update_user_points(self, user_name: str, points: int) -> int:
+        """See :meth:`Database.update_user_points`
+        """
+        
+        return await self._run(self._db.update_user_points, user_name, points)
+
+    async def delete_user(self, user_name: str) -> int:
+        """See :meth:`Database.delete_user`
+        """
+        
+        return await self._run(self._db.delete_user, user_name)
+
+    async def import_users(self, source, copy_format = "csv", on_conflict = "skip", progress = None) -> dict:
+        """See :meth:`Database.import_users`, the progress function is called on a worker thread
+        """
+        
+        return await self._run(self._db.import_users, source, copy_format, on_conflict, progress)
+
+    async def export_users(self, file, copy_format = "csv", progress = None) -> dict:
+        """See :meth:`Database.export_users`, the progress function is called on a worker thread
+        """
+        
+        return await self._run(self._db.export_users, file, copy_format, progress)
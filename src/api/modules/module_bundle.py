@@ -0,0 +1,272 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pokebase.common import api_url_build, cache_uri_build, sprite_url_build
+import pokebase as pb
+import dbm
+import hashlib
+import json
+import os
+import requests
+import shelve
+import shutil
+import tarfile
+import tempfile
+import time
+
+from .module_logger import log_function
+from .module_pokeapi import FILE_CACHE_NAME, name_id_index, _cache_dir_lock
+
+MODULE_NAME="module_bundle"
+
+# version of the bundle layout, bundles of another format are rejected
+BUNDLE_FORMAT = 1
+
+# generations supported by the api
+WARMUP_GENERATIONS = (1, 2, 3)
+
+# seconds until a single download is aborted
+REQUEST_TIMEOUT = 10
+
+MANIFEST_NAME = "manifest.json"
+ENTRIES_NAME = "api_cache.jsonl"
+NAME_IDS_NAME = "cache_ids.json"
+MARKER_NAME = "bundle.json"
+
+def _sha256_file(file_path: str) -> str:
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def _download(url: str, retries: int, backoff: float) -> requests.Response:
+    """Downloads an url, connection errors and server errors are retried with exponential backoff
+
+    :raises requests.RequestException: raises if the download failed after all retries or the resource does not exist
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = requests.get(url, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            return response
+        except requests.RequestException as e:
+            status_code = getattr(e.response, "status_code", None)
+            # client errors like 404 will not change with a retry
+            if attempt == retries or (status_code is not None and status_code < 500 and status_code != 429):
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+def _write_atomic(file_path: str, data: bytes):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, file_path)
+
+def _fetch_resource(endpoint: str, resource_id: int, retries: int, backoff: float):
+    return _download(api_url_build(endpoint, resource_id), retries, backoff).json()
+
+def _fetch_sprite(resource_id: int, retries: int, backoff: float):
+    data = _download(sprite_url_build("pokemon", resource_id), retries, backoff).content
+    _write_atomic(pb.cache.get_sprite_path("pokemon", resource_id), data)
+
+def warm_cache(generations = WARMUP_GENERATIONS, workers: int = 8, retries: int = 3, backoff: float = 0.5) -> dict:
+    """Prefetches the generation lists, pokemon, pokemon species and sprites of the given generations into the pokebase cache.
+    Resources that are already cached are skipped, so an interrupted warm up can be continued.
+    Downloads run on `workers` threads, the api cache is only written by the calling thread
+
+    :param generations: ids of the generations to fetch, defaults to WARMUP_GENERATIONS
+    :type generations: tuple, optional
+    :param workers: number of parallel downloads, defaults to 8
+    :type workers: int, optional
+    :param retries: retries of a failed download, defaults to 3
+    :type retries: int, optional
+    :param backoff: seconds to wait before the first retry, doubled with every retry, defaults to 0.5
+    :type backoff: float, optional
+    :return: `{"fetched": int, "cached": int, "failed": int}`
+    :rtype: dict
+    """
+    function_name = "warm_cache"
+
+    stats = {"fetched": 0, "cached": 0, "failed": 0}
+    with shelve.open(pb.cache.API_CACHE) as cache:
+        # the generation lists name the species to fetch
+        species = {}
+        for generation in generations:
+            uri = cache_uri_build("generation", generation)
+            if uri in cache:
+                stats["cached"] += 1
+            else:
+                try:
+                    cache[uri] = _fetch_resource("generation", generation, retries, backoff)
+                    stats["fetched"] += 1
+                except requests.RequestException as e:
+                    log_function(MODULE_NAME, function_name, f"Could not fetch generation {generation}. Error: {e.__str__()}", "error")
+                    stats["failed"] += 1
+                    continue
+            for pokemon_source in cache[uri]["pokemon_species"]:
+                species[pokemon_source["name"]] = int(pokemon_source["url"].split("/")[-2])
+        name_id_index.add_many(species)
+
+        tasks = []
+        for poke_id in sorted(species.values()):
+            for endpoint in ("pokemon", "pokemon-species"):
+                if cache_uri_build(endpoint, poke_id) in cache:
+                    stats["cached"] += 1
+                else:
+                    tasks.append((endpoint, poke_id))
+            if os.path.exists(pb.cache.get_sprite_path("pokemon", poke_id)):
+                stats["cached"] += 1
+            else:
+                tasks.append(("sprite", poke_id))
+        log_function(MODULE_NAME, function_name, f"Fetching {len(tasks)} resources of {len(species)} pokemon")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup") as executor:
+            futures = {}
+            for endpoint, poke_id in tasks:
+                if endpoint == "sprite":
+                    futures[executor.submit(_fetch_sprite, poke_id, retries, backoff)] = (endpoint, poke_id)
+                else:
+                    futures[executor.submit(_fetch_resource, endpoint, poke_id, retries, backoff)] = (endpoint, poke_id)
+            for future in as_completed(futures):
+                endpoint, poke_id = futures[future]
+                try:
+                    data = future.result()
+                except requests.RequestException as e:
+                    log_function(MODULE_NAME, function_name, f"Could not fetch {endpoint} {poke_id}. Error: {e.__str__()}", "error")
+                    stats["failed"] += 1
+                    continue
+                if endpoint != "sprite":
+                    cache[cache_uri_build(endpoint, poke_id)] = data
+                stats["fetched"] += 1
+    log_function(MODULE_NAME, function_name, f"Warm up finished: {stats}")
+    return stats
+
+def create_cache_bundle(bundle_path: str, version: str | None = None) -> dict:
+    """Packs the pokebase cache (api entries, sprites and the name id index) into a gzipped tar file.
+    The manifest of the bundle contains its format, version and the sha256 checksum of every file
+
+    :param bundle_path: path of the bundle that will be written
+    :type bundle_path: str
+    :param version: version of the bundle, defaults to None (creation time)
+    :type version: str | None, optional
+    :return: the manifest of the bundle, `{}` if the bundle could not be created
+    :rtype: dict
+    """
+    function_name = "create_cache_bundle"
+
+    created = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        files = {}  # name inside the bundle -> path on disk
+        # api entries as json lines, shelve files depend on the platform
+        entries_path = os.path.join(tmp_dir, ENTRIES_NAME)
+        with shelve.open(pb.cache.API_CACHE, flag="r") as cache, open(entries_path, "w") as file:
+            uris = sorted(cache.keys())
+            for uri in uris:
+                file.write(json.dumps({"uri": uri, "data": cache[uri]}) + "\n")
+        files[ENTRIES_NAME] = entries_path
+        if os.path.exists(FILE_CACHE_NAME):
+            files[NAME_IDS_NAME] = FILE_CACHE_NAME
+        for root, _, file_names in os.walk(pb.cache.SPRITE_CACHE):
+            for file_name in sorted(file_names):
+                path = os.path.join(root, file_name)
+                files["sprite/" + os.path.relpath(path, pb.cache.SPRITE_CACHE).replace(os.sep, "/")] = path
+
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "version": version if version is not None else created,
+            "created": created,
+            "entries": len(uris),
+            "sprites": len(files) - 1 - (NAME_IDS_NAME in files),
+            "files": {name: {"sha256": _sha256_file(path), "size": os.path.getsize(path)} for name, path in files.items()}
+        }
+        manifest_path = os.path.join(tmp_dir, MANIFEST_NAME)
+        with open(manifest_path, "w") as file:
+            json.dump(manifest, file, indent=2)
+
+        tmp_bundle_path = f"{bundle_path}.{os.getpid()}.tmp"
+        with tarfile.open(tmp_bundle_path, "w:gz") as tar:
+            tar.add(manifest_path, MANIFEST_NAME)
+            for name, path in files.items():
+                tar.add(path, name)
+        os.replace(tmp_bundle_path, bundle_path)
+        log_function(MODULE_NAME, function_name, f"Created bundle {bundle_path} version {manifest['version']} with {manifest['entries']} entries and {manifest['sprites']} sprites")
+        return manifest
+    except (OSError, tarfile.TarError, ValueError, *dbm.error) as e:
+        log_function(MODULE_NAME, function_name, f"Could not create bundle {bundle_path}. Error: {e.__str__()}", "error")
+        return {}
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _read_marker(marker_path: str) -> str | None:
+    try:
+        with open(marker_path) as file:
+            return json.load(file).get("checksum")
+    except (OSError, ValueError):
+        return None
+
+def load_cache_bundle(bundle_path: str) -> int:
+    """Loads a bundle created by :func:`create_cache_bundle` into the pokebase cache.
+    Every file is checked against the manifest before anything is written, a bundle that was already loaded is skipped
+
+    :param bundle_path: path of the bundle
+    :type bundle_path: str
+    :return: `0` if loaded, `1` if the bundle is already loaded, `2` if the bundle does not exist, `3` if the bundle is invalid or could not be loaded
+    :rtype: int
+    """
+    function_name = "load_cache_bundle"
+
+    if not os.path.exists(bundle_path):
+        log_function(MODULE_NAME, function_name, f"No cache bundle at {bundle_path}")
+        return 2
+
+    marker_path = os.path.join(pb.cache.CACHE_DIR, MARKER_NAME)
+    tmp_dir = tempfile.mkdtemp(dir=pb.cache.CACHE_DIR)
+    try:
+        with tarfile.open(bundle_path, "r:gz") as tar:
+            manifest_bytes = tar.extractfile(MANIFEST_NAME).read()
+            manifest = json.loads(manifest_bytes)
+            if manifest.get("format") != BUNDLE_FORMAT:
+                log_function(MODULE_NAME, function_name, f"Unsupported bundle format {manifest.get('format')}", "error")
+                return 3
+            checksum = hashlib.sha256(manifest_bytes).hexdigest()
+            if _read_marker(marker_path) == checksum:
+                log_function(MODULE_NAME, function_name, f"Bundle version {manifest['version']} is already loaded")
+                return 1
+            members = [member for member in tar.getmembers() if member.name in manifest["files"]]
+            if len(members) != len(manifest["files"]):
+                log_function(MODULE_NAME, function_name, "Bundle is missing files of its manifest", "error")
+                return 3
+            tar.extractall(tmp_dir, members=members, filter="data")
+
+        for name, info in manifest["files"].items():
+            if _sha256_file(os.path.join(tmp_dir, name)) != info["sha256"]:
+                log_function(MODULE_NAME, function_name, f"Checksum mismatch for {name}", "error")
+                return 3
+
+        # only one process loads the bundle, the others skip it afterwards
+        with _cache_dir_lock(marker_path):
+            if _read_marker(marker_path) == checksum:
+                return 1
+            with shelve.open(pb.cache.API_CACHE) as cache, open(os.path.join(tmp_dir, ENTRIES_NAME)) as file:
+                for line in file:
+                    entry = json.loads(line)
+                    cache[entry["uri"]] = entry["data"]
+            for name in manifest["files"]:
+                if name.startswith("sprite/"):
+                    sprite_path = os.path.join(pb.cache.SPRITE_CACHE, *name.split("/")[1:])
+                    os.makedirs(os.path.dirname(sprite_path), exist_ok=True)
+                    os.replace(os.path.join(tmp_dir, name), sprite_path)
+            if NAME_IDS_NAME in manifest["files"]:
+                with open(os.path.join(tmp_dir, NAME_IDS_NAME)) as file:
+                    name_id_index.add_many(json.load(file))
+            with open(marker_path, "w") as file:
+                json.dump({"version": manifest["version"], "checksum": checksum}, file)
+        log_function(MODULE_NAME, function_name, f"Loaded bundle version {manifest['version']} with {manifest['entries']} entries and {manifest['sprites']} sprites")
+        return 0
+    except (OSError, tarfile.TarError, ValueError, KeyError, *dbm.error) as e:
+        log_function(MODULE_NAME, function_name, f"Could not load bundle {bundle_path}. Error: {e.__str__()}", "error")
+        return 3
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,289 @@
+from collections import OrderedDict, namedtuple
+import hashlib
+import threading
+import time
+
+MODULE_NAME="module_cache"
+
+class TTLCache():
+    """Thread safe, size bounded cache. Entries expire after their ttl and the least recently used entry is evicted once the cache is full
+
+    :param max_size: maximum number of entries, defaults to 1024
+    :type max_size: int, optional
+    :param ttl: default and maximum time to live of an entry in seconds, defaults to 60.0
+    :type ttl: float, optional
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        """constructor method
+
+        :raises ValueError: raises if max_size is smaller than 1
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._max_size = max_size
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._hits = 0
+        self._misses = 0
+
+    def _removed(self, key, value):
+        """Hook that is called (with the lock held) whenever an entry leaves the cache
+        """
+        pass
+
+    def get(self, key, default=None):
+        """Returns the value of a key and marks it as recently used
+
+        :param key: the key of the entry
+        :type key: hashable
+        :param default: value returned if the key is missing or expired, defaults to None
+        :type default: any, optional
+        :return: the cached value or default
+        :rtype: any
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                self._removed(key, entry[1])
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: float | None = None) -> bool:
+        """Stores a value
+
+        :param key: the key of the entry
+        :type key: hashable
+        :param value: the value to store
+        :type value: any
+        :param ttl: time to live in seconds, capped at the ttl of the cache, defaults to the ttl of the cache
+        :type ttl: float | None, optional
+        :return: `True` if stored, `False` if the ttl is already over
+        :rtype: bool
+        """
+        with self._lock:
+            return self._set(key, value, ttl)
+
+    def _set(self, key, value, ttl: float | None) -> bool:
+        """Stores a value, the lock must be held
+        """
+        ttl = self._ttl if ttl is None else min(ttl, self._ttl)
+        if ttl <= 0:
+            return False
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._removed(key, old[1])
+        self._data[key] = (time.monotonic() + ttl, value)
+        while len(self._data) > self._max_size:
+            evicted_key, evicted = self._data.popitem(last=False)
+            self._removed(evicted_key, evicted[1])
+        return True
+
+    def delete(self, key) -> bool:
+        """Removes a key from the cache
+
+        :param key: the key of the entry
+        :type key: hashable
+        :return: `True` if removed, `False` if the key was not cached
+        :rtype: bool
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return False
+            self._removed(key, entry[1])
+            return True
+
+    def clear(self):
+        """Removes all entries
+        """
+        with self._lock:
+            for key, entry in self._data.items():
+                self._removed(key, entry[1])
+            self._data.clear()
+
+    def get_stats(self) -> dict:
+        """Returns the hit and miss counters of the cache
+
+        :return: `{"size": int, "hits": int, "misses": int}`
+        :rtype: dict
+        """
+        with self._lock:
+            return {"size": len(self._data), "hits": self._hits, "misses": self._misses}
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class TokenCache(TTLCache):
+    """TTLCache for authenticated tokens that remembers the user of every token, so all tokens of a user can be invalidated at once
+
+    :param max_size: maximum number of tokens, defaults to 1024
+    :type max_size: int, optional
+    :param ttl: maximum time to live of a token in seconds, defaults to 60.0
+    :type ttl: float, optional
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        """constructor method
+        """
+        super().__init__(max_size, ttl)
+        self._tokens_by_user = {}   # user_name -> set of tokens
+        self._user_by_token = {}    # token -> user_name
+        self._generation = 0        # changes with every invalidation
+
+    def _removed(self, key, value):
+        user_name = self._user_by_token.pop(key, None)
+        tokens = self._tokens_by_user.get(user_name)
+        if tokens is not None:
+            tokens.discard(key)
+            if not tokens:
+                del self._tokens_by_user[user_name]
+
+    def get_generation(self) -> int:
+        """Returns a counter that changes with every invalidation.
+        Pass it to :meth:`set_user` so a user that was loaded before an invalidation is not cached
+
+        :return: current generation of the cache
+        :rtype: int
+        """
+        with self._lock:
+            return self._generation
+
+    def set_user(self, token: str, user_name: str, value, expires: float | None = None, generation: int | None = None) -> bool:
+        """Stores the value of a token that belongs to a user
+
+        :param token: the token
+        :type token: str
+        :param user_name: name of the user the token belongs to
+        :type user_name: str
+        :param value: the value to store
+        :type value: any
+        :param expires: unix timestamp at which the token expires, defaults to None
+        :type expires: float | None, optional
+        :param generation: value of :meth:`get_generation` before the value was loaded, defaults to None
+        :type generation: int | None, optional
+        :return: `True` if stored, `False` if the token is already expired or an invalidation happened since `generation`
+        :rtype: bool
+        """
+        ttl = None if expires is None else expires - time.time()
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            if not self._set(token, value, ttl):
+                return False
+            self._user_by_token[token] = user_name
+            self._tokens_by_user.setdefault(user_name, set()).add(token)
+        return True
+
+    def invalidate_user(self, user_name: str | None) -> int:
+        """Removes all tokens of a user
+
+        :param user_name: name of the user, `None` removes the tokens of all users
+        :type user_name: str | None
+        :return: number of removed tokens
+        :rtype: int
+        """
+        with self._lock:
+            self._generation += 1
+            if user_name is None:
+                count = len(self._data)
+                self._data.clear()
+                self._tokens_by_user.clear()
+                self._user_by_token.clear()
+                return count
+            tokens = self._tokens_by_user.pop(user_name, set())
+            for token in tokens:
+                self._user_by_token.pop(token, None)
+                self._data.pop(token, None)
+            return len(tokens)
+
+
+CachedResponse = namedtuple("CachedResponse", ["body", "etag"])
+
+class ResponseCache(TTLCache):
+    """TTLCache for serialized responses. Every entry stores the body with its strong etag and can be found by 
+    its key (the pokemon id) or by one of its names, names are removed together with their entry
+
+    :param max_size: maximum number of responses, defaults to 1024
+    :type max_size: int, optional
+    :param ttl: time to live of a response in seconds, defaults to 60.0
+    :type ttl: float, optional
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0):
+        """constructor method
+        """
+        super().__init__(max_size, ttl)
+        self._key_by_name = {}      # name -> key
+        self._names_by_key = {}     # key -> set of names
+
+    def _removed(self, key, value):
+        for name in self._names_by_key.pop(key, ()):
+            self._key_by_name.pop(name, None)
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        """Returns the strong etag of a body
+
+        :param body: the serialized response
+        :type body: bytes
+        :return: quoted hash of the body
+        :rtype: str
+        """
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+    def put(self, key, body: bytes, names = ()) -> CachedResponse:
+        """Stores a serialized response
+
+        :param key: the key of the response
+        :type key: hashable
+        :param body: the serialized response
+        :type body: bytes
+        :param names: names the response can also be found by, defaults to ()
+        :type names: iterable, optional
+        :return: the stored response
+        :rtype: CachedResponse
+        """
+        entry = CachedResponse(body, self.make_etag(body))
+        with self._lock:
+            if self._set(key, entry, None):
+                names_of_key = self._names_by_key.setdefault(key, set())
+                for name in names:
+                    old_key = self._key_by_name.get(name)
+                    if old_key is not None and old_key != key:
+                        self._names_by_key.get(old_key, set()).discard(name)
+                    self._key_by_name[name] = key
+                    names_of_key.add(name)
+        return entry
+
+    def get_by_name(self, name, default=None):
+        """Returns the response stored for a name
+
+        :param name: one of the names given to :meth:`put`
+        :type name: hashable
+        :param default: value returned if the name is unknown or its response expired, defaults to None
+        :type default: any, optional
+        :return: the cached response or default
+        :rtype: CachedResponse | any
+        """
+        with self._lock:
+            key = self._key_by_name.get(name)
+            if key is None:
+                self._misses += 1
+                return default
+        return self.get(key, default)
@@ -0,0 +1,182 @@
+from bisect import bisect_left, bisect_right, insort
+from dotenv import load_dotenv
+from .module_logger import log_function
+import os
+import threading
+import time
+
+load_dotenv()
+
+MODULE_NAME="module_leaderboard"
+
+LEADERBOARD_TTL = float(os.getenv("LEADERBOARD_TTL", "30"))
+# number of users with the most points that are kept in memory, pages and ranks below are answered by the database
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "1000"))
+
+class LeaderboardCache():
+    """In process copy of the top of the leaderboard. The `size` users with the most points are kept in a list sorted by points (ties by newest id)
+    so that pages and ranks are answered with a binary search instead of a database query.
+    Point changes are applied incrementally, the top is reloaded from the database once the ttl ran out
+
+    :param ttl: seconds after which the leaderboard has to be reloaded, defaults to LEADERBOARD_TTL
+    :type ttl: float, optional
+    :param size: number of users kept in memory, defaults to LEADERBOARD_SIZE
+    :type size: int, optional
+    """
+
+    def __init__(self, ttl: float = LEADERBOARD_TTL, size: int = LEADERBOARD_SIZE):
+        """constructor method
+        """
+        self._ttl = ttl
+        self._size = size
+        self._complete = True   # False if users below the cached top exist
+        self._lock = threading.Lock()
+        self._keys = []         # sorted list of (-points, -user_id, user_name)
+        self._users = {}        # user_name -> key inside of self._keys
+        self._loaded_at = None
+        self._version = 0
+
+    def get_size(self) -> int:
+        return self._size
+
+    def get_version(self) -> int:
+        """Returns a counter that changes with every modification of the leaderboard.
+        Pass it to :meth:`load` to detect changes made while the users were fetched
+
+        :return: current version of the leaderboard
+        :rtype: int
+        """
+        with self._lock:
+            return self._version
+
+    def is_stale(self) -> bool:
+        """Checks if the leaderboard has to be reloaded from the database
+
+        :return: `True` if never loaded, invalidated or older than the ttl
+        :rtype: bool
+        """
+        with self._lock:
+            return self._loaded_at is None or time.monotonic() - self._loaded_at > self._ttl
+
+    def invalidate(self):
+        """Marks the leaderboard as stale, the next read reloads it from the database
+        """
+        with self._lock:
+            self._loaded_at = None
+            self._version += 1
+
+    def load(self, users: list, version: int | None = None) -> int:
+        """Replaces the leaderboard with the given users. If `size` users are given, users with less points are assumed to exist
+
+        :param users: the top `size` users as returned by :func:`get_leaderboard_from_db`: `[{"user_id": int, "user_name": str, "points": int}, ...]`
+        :type users: list
+        :param version: value of :meth:`get_version` before the users were fetched, defaults to None
+        :type version: int | None, optional
+        :return: `0` if loaded, `1` if the leaderboard changed since `version` (loaded but kept stale)
+        :rtype: int
+        """
+        function_name = "load"
+
+        keys = sorted((-user["points"], -user["user_id"], user["user_name"]) for user in users if user["points"] is not None)
+        with self._lock:
+            changed = version is not None and version != self._version
+            self._keys = keys[:self._size]
+            self._users = {key[2]: key for key in self._keys}
+            self._complete = len(users) < self._size
+            self._version += 1
+            if changed:
+                # a change happened while the users were fetched, the snapshot could be outdated
+                log_function(MODULE_NAME, function_name, "Leaderboard changed while loading, keeping it stale", "warn")
+                self._loaded_at = None
+                return 1
+            self._loaded_at = time.monotonic()
+        return 0
+
+    def update(self, user_name: str, points: int) -> bool:
+        """Updates the points of a user. A user that falls below the cached top is removed,
+        a user below the cached top only matters if the new points reach it
+
+        :param user_name: the name of the user
+        :type user_name: str
+        :param points: the new points of the user
+        :type points: int
+        :return: `True` if the leaderboard is still correct, `False` if the user is unknown and could be part of the top (reload it)
+        :rtype: bool
+        """
+        with self._lock:
+            key = self._users.get(user_name)
+            if key is None:
+                # users below the top with less points than the last cached user do not change the top
+                return not self._complete and len(self._keys) > 0 and points < -self._keys[-1][0]
+            del self._keys[bisect_left(self._keys, key)]
+            key = (-points, key[1], user_name)
+            self._version += 1
+            if not self._complete and (len(self._keys) == 0 or key > self._keys[-1]):
+                # unknown users could have more points now, the remaining users are still the top
+                del self._users[user_name]
+                return True
+            insort(self._keys, key)
+            self._users[user_name] = key
+            return True
+
+    def remove(self, user_name: str) -> bool:
+        """Removes a user from the leaderboard
+
+        :param user_name: the name of the user
+        :type user_name: str
+        :return: `True` if removed, `False` if the user is not part of the leaderboard
+        :rtype: bool
+        """
+        with self._lock:
+            key = self._users.pop(user_name, None)
+            if key is None:
+                return False
+            del self._keys[bisect_left(self._keys, key)]
+            self._version += 1
+            return True
+
+    def get_top(self, limit = 10, offset = 0, after_points = None, after_id = None) -> dict | None:
+        """Returns a page of the leaderboard, same arguments and result as :func:`get_leaderboard_from_db`.
+        Pages that reach below the cached top return `None`
+
+        :param limit: maximum number of users to return, `None` returns all users, defaults to 10
+        :type limit: int | None, optional
+        :param offset: number of users to skip, defaults to 0
+        :type offset: int, optional
+        :param after_points: points of the last user of the previous page, defaults to None
+        :type after_points: int | None, optional
+        :param after_id: id of the last user of the previous page, defaults to None
+        :type after_id: int | None, optional
+        :return: dictionary containing the users: `{"users": [{"user_id": int, "user_name": str, "points": int}, ...]}`, 
+                 `None` if the page is not part of the cached top
+        :rtype: dict | None
+        """
+        with self._lock:
+            start = offset
+            if after_points is not None:
+                # the page starts behind the last user of the previous page
+                start += bisect_right(self._keys, (-after_points, -after_id, chr(0x10FFFF)))
+            end = len(self._keys) if limit is None else start + limit
+            if not self._complete and (limit is None or end > len(self._keys)):
+                return None
+            page = self._keys[start:end]
+        return {"users": [{"user_id": -_id, "user_name": _name, "points": -_points} for _points, _id, _name in page]}
+
+    def get_rank(self, user_name: str) -> int:
+        """Returns the rank of a user, users with the same points share a rank
+
+        :param user_name: the name of the user
+        :type user_name: str
+        :return: rank of the user starting at `1`, `-1` if the user is not part of the cached top
+        :rtype: int
+        """
+        with self._lock:
+            key = self._users.get(user_name)
+            if key is None:
+                return -1
+            # number of users with more points
+            return bisect_left(self._keys, (key[0],)) + 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._keys)
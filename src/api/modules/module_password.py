@@ -0,0 +1,271 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import threading
+
+from .module_logger import log_function
+
+MODULE_NAME="module_password"
+
+# prefix of hashes created by PasswordHasher, everything else is a legacy hash created by pgcrypto (md5-crypt)
+HASH_ALGORITHM = "pbkdf2_sha256"
+
+# cost factor, raising it rehashes the passwords of users on their next login
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "600000"))
+# number of passwords hashed at the same time, more requests wait for a free worker
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# logins that may run at the same time per user name and per client address, more are rejected
+LOGIN_MAX_PER_USER = int(os.getenv("LOGIN_MAX_PER_USER", "2"))
+LOGIN_MAX_PER_IP = int(os.getenv("LOGIN_MAX_PER_IP", "10"))
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+def is_legacy_hash(password_hash: str) -> bool:
+    """Checks if a password hash was created inside of the database by pgcrypto
+
+    :param password_hash: the stored hash
+    :type password_hash: str
+    :return: `True` if the hash is not a hash of :class:`PasswordHasher`
+    :rtype: bool
+    """
+    return not password_hash.startswith(HASH_ALGORITHM + "$")
+
+
+class PasswordHasher():
+    """This class hashes and verifies passwords with PBKDF2-SHA256 inside of the api instead of the database.
+    Hashing runs on a bounded thread pool (hashlib releases the GIL), so a login flood can not occupy more than `workers` cores.
+    The `_async` methods await the pool, so callers on the event loop neither block it nor a thread of another pool.
+    Hashes have the form `pbkdf2_sha256$<iterations>$<salt>$<hash>`
+
+    :param iterations: cost factor of new hashes, defaults to PASSWORD_HASH_ITERATIONS
+    :type iterations: int, optional
+    :param workers: number of passwords hashed at the same time, defaults to PASSWORD_HASH_WORKERS
+    :type workers: int, optional
+    """
+
+    def __init__(self, iterations: int = PASSWORD_HASH_ITERATIONS, workers: int = PASSWORD_HASH_WORKERS):
+        """constructor method
+
+        :raises ValueError: raises if iterations or workers are smaller than 1
+        """
+        if iterations < 1 or workers < 1:
+            raise ValueError("iterations and workers must be at least 1")
+        self._iterations = iterations
+        self._workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get_iterations(self) -> int:
+        return self._iterations
+
+    def get_dummy_hash(self) -> str:
+        """Returns a hash that costs as much to verify as a stored one but never matches,
+        verifying against it when a user does not exist hides which user names exist
+
+        :return: the dummy hash
+        :rtype: str
+        """
+        return f"{HASH_ALGORITHM}${self._iterations}${_b64encode(bytes(16))}${_b64encode(bytes(32))}"
+
+    def _submit(self, func, *args):
+        """Submits a function to the thread pool of the hasher
+
+        :return: the future of the function
+        :rtype: concurrent.futures.Future
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="password")
+        return self._executor.submit(func, *args)
+
+    def _run(self, func, *args):
+        """Runs a function on the thread pool of the hasher and waits for the result
+        """
+        return self._submit(func, *args).result()
+
+    async def _run_async(self, func, *args):
+        """Runs a function on the thread pool of the hasher and awaits the result
+        """
+        return await asyncio.wrap_future(self._submit(func, *args))
+
+    @staticmethod
+    def _derive(password: str, salt: bytes, iterations: int) -> bytes:
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+    def hash(self, password: str) -> str:
+        """Hashes a password with a new random salt
+
+        :param password: the password
+        :type password: str
+        :return: the hash to store
+        :rtype: str
+        """
+        salt = os.urandom(16)
+        derived = self._run(self._derive, password, salt, self._iterations)
+        return f"{HASH_ALGORITHM}${self._iterations}${_b64encode(salt)}${_b64encode(derived)}"
+
+    async def hash_async(self, password: str) -> str:
+        """See :meth:`hash`, awaits the thread pool instead of blocking
+        """
+        salt = os.urandom(16)
+        derived = await self._run_async(self._derive, password, salt, self._iterations)
+        return f"{HASH_ALGORITHM}${self._iterations}${_b64encode(salt)}${_b64encode(derived)}"
+
+    def _split(self, password_hash: str):
+        """Splits a hash of this class into salt, iterations and derived key, `None` if it is malformed or a legacy hash
+        """
+        function_name = "PasswordHasher.verify"
+
+        try:
+            algorithm, iterations, salt, expected = password_hash.split("$")
+            if algorithm != HASH_ALGORITHM:
+                return None
+            return _b64decode(salt), int(iterations), _b64decode(expected)
+        except (ValueError, TypeError, AttributeError) as e:
+            log_function(MODULE_NAME, function_name, f"Malformed password hash. Error: {e.__str__()}", "error")
+            return None
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Verifies a password against a hash of this class
+
+        :param password: the password
+        :type password: str
+        :param password_hash: the stored hash
+        :type password_hash: str
+        :return: `True` if the password matches, `False` if not, the password is no string or the hash is malformed or a legacy hash
+        :rtype: bool
+        """
+        parts = self._split(password_hash)
+        if parts is None or not isinstance(password, str):
+            return False
+        salt, iterations, expected = parts
+        return hmac.compare_digest(self._run(self._derive, password, salt, iterations), expected)
+
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        """See :meth:`verify`, awaits the thread pool instead of blocking
+        """
+        parts = self._split(password_hash)
+        if parts is None or not isinstance(password, str):
+            return False
+        salt, iterations, expected = parts
+        return hmac.compare_digest(await self._run_async(self._derive, password, salt, iterations), expected)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Checks if a hash should be replaced on the next successful login, because it is a legacy hash or uses less iterations than configured
+
+        :param password_hash: the stored hash
+        :type password_hash: str
+        :return: `True` if the hash should be replaced
+        :rtype: bool
+        """
+        if is_legacy_hash(password_hash):
+            return True
+        try:
+            return int(password_hash.split("$")[1]) < self._iterations
+        except (IndexError, ValueError):
+            return True
+
+    def close(self):
+        """Stops the thread pool of the hasher, it is started again on the next use
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+class LoginLimiter():
+    """This class limits the logins that run at the same time per user name and per client address,
+    so a flood against one account or from one client can not occupy all password hashing workers
+
+    :param max_per_user: logins at the same time per user name, defaults to LOGIN_MAX_PER_USER
+    :type max_per_user: int, optional
+    :param max_per_ip: logins at the same time per client address, defaults to LOGIN_MAX_PER_IP
+    :type max_per_ip: int, optional
+    """
+
+    def __init__(self, max_per_user: int = LOGIN_MAX_PER_USER, max_per_ip: int = LOGIN_MAX_PER_IP):
+        """constructor method
+        """
+        self._limits = {"user": max_per_user, "ip": max_per_ip}
+        self._lock = threading.Lock()
+        self._running = {}  # (kind, key) -> number of running logins
+        self._rejected = 0
+
+    def _keys(self, user_name: str, ip: str | None) -> list:
+        keys = [("user", user_name.lower() if isinstance(user_name, str) else str(user_name))]
+        if ip is not None:
+            keys.append(("ip", ip))
+        return keys
+
+    def acquire(self, user_name: str, ip: str | None = None) -> bool:
+        """Starts a login if the limits allow it, every successful acquire must be followed by :meth:`release`
+
+        :param user_name: name of the user that logs in
+        :type user_name: str
+        :param ip: address of the client, defaults to None
+        :type ip: str | None, optional
+        :return: `True` if the login may run, `False` if a limit is reached
+        :rtype: bool
+        """
+        keys = self._keys(user_name, ip)
+        with self._lock:
+            if any(self._running.get(key, 0) >= self._limits[key[0]] for key in keys):
+                self._rejected += 1
+                return False
+            for key in keys:
+                self._running[key] = self._running.get(key, 0) + 1
+            return True
+
+    def release(self, user_name: str, ip: str | None = None):
+        """Ends a login started by :meth:`acquire`
+
+        :param user_name: name of the user that logged in
+        :type user_name: str
+        :param ip: address of the client, defaults to None
+        :type ip: str | None, optional
+        """
+        with self._lock:
+            for key in self._keys(user_name, ip):
+                count = self._running.get(key, 0) - 1
+                if count > 0:
+                    self._running[key] = count
+                else:
+                    self._running.pop(key, None)
+
+    @contextmanager
+    def limit(self, user_name: str, ip: str | None = None):
+        """Context manager around :meth:`acquire` and :meth:`release`
+
+        :yield: `True` if the login may run, `False` if a limit is reached
+        :rtype: bool
+        """
+        allowed = self.acquire(user_name, ip)
+        try:
+            yield allowed
+        finally:
+            if allowed:
+                self.release(user_name, ip)
+
+    def get_stats(self) -> dict:
+        """Returns the number of running and rejected logins
+
+        :return: `{"running": int, "rejected": int}`
+        :rtype: dict
+        """
+        with self._lock:
+            return {"running": sum(count for (kind, _), count in self._running.items() if kind == "user"), "rejected": self._rejected}
+
+
+# hasher used by the database functions
+password_hasher = PasswordHasher()
@@ -1,8 +1,19 @@
 import pokebase as pb
+import requests
+from contextlib import contextmanager
 from enum import Enum
+import glob
 import re
 import json
 import os
+import shelve
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # windows: no locking between processes
+    fcntl = None
 
 # set chache folder for pokebase
 STATIC_FOLDER = "api/static/"
@@ -13,7 +24,13 @@ pb.cache.set_cache(CACHE_DIR)
 
 FILE_CACHE_NAME = CACHE_DIR + "cache_ids.json"
 
+STORE_FILE_NAME = CACHE_DIR + "pokemon.store"
+
 from .module_logger import log_function
+from .module_cache import TTLCache
+from .module_singleflight import SingleFlight
+from .module_search import normalize_query
+from .module_store import PokemonStore, StoreRecord, STAT_NAMES, check_record, write_store
 
 MODULE_NAME="module_pokeapi"
 
@@ -26,18 +43,291 @@ class PokemonRarity(Enum):
     MYTHIC = "mythical"
 
 
+# points multiplier for the rarity of a pokemon (every other rarity counts once)
+RARITY_POINTS_MULTIPLIER = {
+    PokemonRarity.LEGENDARY: 2,
+    PokemonRarity.MYTHIC: 5
+}
+
+def calc_pokemon_points(pokemon_stats: list, rarity: PokemonRarity) -> int:
+    """Calculates the points of a pokemon: hp base stat times rarity multiplier
+
+    :param pokemon_stats: list of stats of the pokemon, the hp stat must be the first element
+    :type pokemon_stats: list
+    :param rarity: the rarity of the pokemon
+    :type rarity: PokemonRarity
+    :return: points of the pokemon, `0` if the pokemon has no stats
+    :rtype: int
+    """
+    if len(pokemon_stats) == 0:
+        return 0
+    return pokemon_stats[0]["stat_value"] * RARITY_POINTS_MULTIPLIER.get(rarity, 1)
+
 def load_cached_name_id_list(file_path):
     if os.path.exists(file_path):
-        with open(file_path) as file:
-            return json.load(file)#
+        try:
+            with open(file_path) as file:
+                return json.load(file)
+        except ValueError:
+            return {}
     else:
         return {}
 
+@contextmanager
+def _cache_dir_lock(file_path):
+    """Exclusive lock on the directory of a cache file, shared by all processes (no-op where flock is not available)
+
+    :param file_path: path of the cache file
+    :type file_path: str
+    """
+    if fcntl is None:
+        yield
+        return
+    dir_fd = os.open(os.path.dirname(file_path) or ".", os.O_RDONLY)
+    try:
+        fcntl.flock(dir_fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(dir_fd, fcntl.LOCK_UN)
+        os.close(dir_fd)
+
+def _file_version(file_path):
+    """Returns a value that changes whenever the file is replaced or written, `None` if it does not exist
+    """
+    try:
+        stat = os.stat(file_path)
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def _update_name_id_file(file_path, entries: dict):
+    """Adds names to the cache file. Entries of other processes are merged under the lock and the file is swapped atomically, 
+    so readers never see a partly written file
+
+    :param entries: the names and ids to add `{poke_name: poke_id, ...}`
+    :type entries: dict
+
+    :return: the updated name id dictionary and the version of the written file
+    :rtype: tuple[dict, tuple]
+    """
+    with _cache_dir_lock(file_path):
+        current_cache = load_cached_name_id_list(file_path)
+        current_cache.update(entries)
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(current_cache, file)
+        os.replace(tmp_path, file_path)
+        return current_cache, _file_version(file_path)
+
 def add_name_id_to_cache(file_path, poke_name: str, poke_id: int):
-    current_cache = load_cached_name_id_list(file_path)
-    current_cache[poke_name] = poke_id
-    with open(file_path, "w") as file:
-        json.dump(current_cache, file)
+    _update_name_id_file(file_path, {poke_name: poke_id})
+
+
+class NameIdIndex():
+    """In-memory name to id index backed by a json file. The file is read once, hits are dictionary lookups. 
+    On a miss the file is reloaded if another process changed it since, new entries are merged into the file atomically
+
+    :param file_path: path of the json file
+    :type file_path: str
+    """
+
+    def __init__(self, file_path: str):
+        """constructor method
+        """
+        self._file_path = file_path
+        self._lock = threading.Lock()
+        self._index = None
+        self._version = None
+
+    def _reload(self):
+        """Reloads the index if the file changed, the lock must be held
+        """
+        version = _file_version(self._file_path)
+        if self._index is None or version != self._version:
+            self._index = load_cached_name_id_list(self._file_path)
+            self._version = version
+
+    def get(self, poke_name: str) -> int:
+        """Returns the id of a pokemon name
+
+        :param poke_name: the name of the pokemon
+        :type poke_name: str
+        :return: the pokemon id, `-1` if the name is not part of the index
+        :rtype: int
+        """
+        with self._lock:
+            if self._index is None:
+                self._reload()
+            poke_id = self._index.get(poke_name)
+            if poke_id is None:
+                # another worker could have added the name in the meantime
+                self._reload()
+                poke_id = self._index.get(poke_name, -1)
+            return poke_id
+
+    def add(self, poke_name: str, poke_id: int):
+        """Adds a name to the index and the file
+
+        :param poke_name: the name of the pokemon
+        :type poke_name: str
+        :param poke_id: the id of the pokemon
+        :type poke_id: int
+        """
+        self.add_many({poke_name: poke_id})
+
+    def add_many(self, entries: dict):
+        """Adds several names to the index and writes the file once
+
+        :param entries: the names and ids to add `{poke_name: poke_id, ...}`
+        :type entries: dict
+        """
+        with self._lock:
+            self._index, self._version = _update_name_id_file(self._file_path, entries)
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._index is None:
+                self._reload()
+            return len(self._index)
+
+
+# name to id index shared by all lookups of this process
+name_id_index = NameIdIndex(FILE_CACHE_NAME)
+
+# ids and names the api reported as not existing, so repeated bad lookups skip the api call
+NEGATIVE_CACHE_SIZE = int(os.getenv("NEGATIVE_CACHE_SIZE", "4096"))
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "600"))
+
+negative_cache = TTLCache(NEGATIVE_CACHE_SIZE, NEGATIVE_CACHE_TTL)
+
+def is_known_missing(resource: str, key) -> bool:
+    """Checks if a resource is known to not exist
+
+    :param resource: the resource type, for example `"pokemon"` or `"pokemon-species"`
+    :type resource: str
+    :param key: id or name of the resource
+    :type key: int | str
+    :return: `True` if the api reported the resource as missing within the ttl
+    :rtype: bool
+    """
+    return negative_cache.get((resource, key), False)
+
+def forget_missing(resource: str, key) -> bool:
+    """Removes a resource from the negative cache
+
+    :param resource: the resource type
+    :type resource: str
+    :param key: id or name of the resource
+    :type key: int | str
+    :return: `True` if the resource was cached as missing
+    :rtype: bool
+    """
+    return negative_cache.delete((resource, key))
+
+def get_negative_cache_stats() -> dict:
+    """Returns the size and the counters of the negative cache, hits are lookups that were answered as missing
+
+    :return: `{"size": int, "hits": int, "misses": int}`
+    :rtype: dict
+    """
+    return negative_cache.get_stats()
+
+def _remember_missing(func_name: str, resource: str, key):
+    log_function(MODULE_NAME, func_name, f"Remembering {resource} {key} as missing", "warn")
+    negative_cache.set((resource, key), True)
+
+def _remember_if_missing(func_name: str, resource: str, key, error: Exception) -> bool:
+    """Adds a resource to the negative cache if the api answered the call with 404.
+    Connection errors, bad or truncated responses (a JSONDecodeError is a ValueError) and other failures are not cached
+    """
+    if isinstance(error, requests.HTTPError) and getattr(error.response, "status_code", None) == 404:
+        _remember_missing(func_name, resource, key)
+        return True
+    return False
+
+# concurrent api fetches of the same resource share one request
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "30"))
+
+pokeapi_flight = SingleFlight()
+
+def _fetch(resource: str, key, fetch, *args):
+    """Fetches a resource from the api. If the same resource is already being fetched by another thread, 
+    waits at most FETCH_TIMEOUT seconds for that fetch and shares its result or exception
+
+    :raises TimeoutError: raises if the fetch of another thread did not finish in time
+    """
+    return pokeapi_flight.do((resource, key), fetch, *args, timeout=FETCH_TIMEOUT)
+
+# fixed layout copy of the cached pokemon, read without opening the pokebase cache
+pokemon_store = PokemonStore(STORE_FILE_NAME)
+
+# pokemon resolved by resolve_pokemon, the data of a pokemon does not change
+RESOLVED_CACHE_SIZE = int(os.getenv("RESOLVED_CACHE_SIZE", "2048"))
+RESOLVED_CACHE_TTL = float(os.getenv("RESOLVED_CACHE_TTL", "3600"))
+
+resolved_cache = TTLCache(RESOLVED_CACHE_SIZE, RESOLVED_CACHE_TTL)
+
+def _sprite_url(sprite_path: str) -> str:
+    return sprite_path.split("static")[1].replace("\\", "/")
+
+def is_store_stale(file_path: str = STORE_FILE_NAME) -> bool:
+    """Checks if the pokemon store has to be rebuilt, because it does not exist or the pokebase cache changed after it was built
+
+    :param file_path: path of the store, defaults to STORE_FILE_NAME
+    :type file_path: str, optional
+    :return: `True` if the store is missing or older than the pokebase cache
+    :rtype: bool
+    """
+    try:
+        store_mtime = os.stat(file_path).st_mtime_ns
+    except OSError:
+        return True
+    # the shelve of the cache can consist of several files, depending on the dbm backend
+    cache_mtimes = [os.stat(path).st_mtime_ns for path in glob.glob(glob.escape(pb.cache.API_CACHE) + "*")]
+    return any(mtime > store_mtime for mtime in cache_mtimes)
+
+def build_pokemon_store(file_path: str = STORE_FILE_NAME) -> int:
+    """Writes every pokemon of the pokebase cache that has a cached pokemon species into the store, see :class:`PokemonStore`.
+    Pokemon missing in the store are still loaded from the pokebase cache
+
+    :param file_path: path of the store, defaults to STORE_FILE_NAME
+    :type file_path: str, optional
+    :return: number of pokemon in the store, `-1` if the store could not be built
+    :rtype: int
+    """
+    func_name = "build_pokemon_store"
+    
+    pokemon_uri = re.compile(r"^pokemon/(\d+)/$")
+    records = []
+    skipped = 0
+    try:
+        with shelve.open(pb.cache.API_CACHE, flag="r") as cache:
+            for uri in cache.keys():
+                match = pokemon_uri.match(uri)
+                species_uri = f"pokemon-species/{match.group(1)}/" if match else None
+                if species_uri is None or species_uri not in cache:
+                    continue
+                pokemon, species = cache[uri], cache[species_uri]
+                stats = {stat["stat"]["name"]: stat["base_stat"] for stat in pokemon["stats"]}
+                if set(stats) != set(STAT_NAMES):
+                    continue
+                sprite_path = pb.cache.get_sprite_path("pokemon", pokemon["id"])
+                record = StoreRecord(pokemon["id"], pokemon["name"], [stats[name] for name in STAT_NAMES], species["is_legendary"], species["is_mythical"], 
+                                     int(species["generation"]["url"].split("/")[-2]), species["generation"]["name"], 
+                                     _sprite_url(sprite_path) if os.path.exists(sprite_path) else "")
+                # e.g. names longer than the layout allows, these pokemon are loaded from the pokebase cache instead
+                reason = check_record(record)
+                if reason is not None:
+                    log_function(MODULE_NAME, func_name, f"Skipping pokemon {pokemon['id']} in store. Error: {reason}", "warn")
+                    skipped += 1
+                    continue
+                records.append(record)
+        count = write_store(file_path, records)
+        log_function(MODULE_NAME, func_name, f"Built pokemon store with {count} pokemon, skipped {skipped}")
+        return count
+    except Exception as e:
+        log_function(MODULE_NAME, func_name, f"Could not build pokemon store. Error: {e.__str__()}", "error")
+        return -1
 
 # utility function: check function for integer values (poke_id and depth)
 def check_input(function_name: str, input: int, val_name: str) -> int:
@@ -184,7 +474,7 @@ def get_pokemon_id_names_by_generation(generation: int, depth=0) -> list:
         # use api load function !!!
         elif depth == 1:
             log_function(MODULE_NAME, func_name, "Try fetching from api")
-            gen_resource = pb.generation(generation)
+            gen_resource = _fetch("generation", generation, pb.generation, generation)
             log_function(MODULE_NAME, func_name, "Successfully fetched from api")
             pokemon_list = []
             for pokemon_source in gen_resource.pokemon_species:
@@ -216,26 +506,39 @@ def get_pokemon_id_from_name(pokemon_name: str) -> int:
     
     if check_pokemon_name(func_name, pokemon_name) == -1:
         return -1
+    # "Pikachu" and "pikachu" share the index and negative cache entries
+    pokemon_name = normalize_query(pokemon_name)
+    
+    if is_known_missing("pokemon-species", pokemon_name):
+        log_function(MODULE_NAME, func_name, f"Pokemon name {pokemon_name} is known to not exist")
+        return -1
     
     try:
         log_function(MODULE_NAME, func_name, "Loading pokemon id from cache")
-        cached_name_id_list = load_cached_name_id_list(FILE_CACHE_NAME)
-        if pokemon_name in cached_name_id_list:
+        pokemon_id = name_id_index.get(pokemon_name)
+        if pokemon_id != -1:
             log_function(MODULE_NAME, func_name, "Loaded pokemon id from cache successful")
-            return cached_name_id_list[pokemon_name]
+            return pokemon_id
         else:
             # fetch from api if loading from cache failed
             log_function(MODULE_NAME, func_name, "Fetching pokemon id from api")
-            pokemon_species = pb.pokemon_species(pokemon_name)
+            pokemon_species = _fetch("pokemon-species", pokemon_name, pb.pokemon_species, pokemon_name)
+            if pokemon_species.id_ is None:
+                # pokebase did not find the name in the species list of the api
+                log_function(MODULE_NAME, func_name, f"Pokemon name {pokemon_name} does not exist", "warn")
+                _remember_missing(func_name, "pokemon-species", pokemon_name)
+                return -1
             log_function(MODULE_NAME, func_name, "Fetched pokemon id from api successful")
-            add_name_id_to_cache(FILE_CACHE_NAME, pokemon_name, pokemon_species.id)
+            name_id_index.add(pokemon_name, pokemon_species.id)
             return pokemon_species.id
     except KeyError as e:
         # otherwise its a keyerror from api -> error return {}
         log_function(MODULE_NAME, func_name, f"KeyError! Could not get pokemon id for name {pokemon_name} Error: {e.__str__()}", "error")
+        _remember_if_missing(func_name, "pokemon-species", pokemon_name, e)
         return -1
     except Exception as e:
         log_function(MODULE_NAME, func_name, f"Unresolfed error occured! Error: {e.__str__()}", "error")
+        _remember_if_missing(func_name, "pokemon-species", pokemon_name, e)
         return -1
 
 def get_pokemon_rarity_and_generation_by_id(poke_id: int, depth = 0) -> dict:
@@ -264,9 +567,16 @@ def get_pokemon_rarity_and_generation_by_id(poke_id: int, depth = 0) -> dict:
         log_function(MODULE_NAME, func_name, f"Could not load pokemon with id {poke_id}", "error")
         return {}
     
+    if is_known_missing("pokemon-species", poke_id):
+        log_function(MODULE_NAME, func_name, f"Pokemon species with id {poke_id} is known to not exist")
+        return {}
+    
     try:
         # try loading from cache
         if depth == 0:
+            record = pokemon_store.get(poke_id)
+            if record is not None:
+                return {"pokemon_rarity": _check_poke_rarity(record, False), "pokemon_gen_id": str(record.generation_id), "pokemon_gen_name": record.generation_name}
             log_function(MODULE_NAME, func_name, "Loading pokemon species from cache")
             pokemon_species = pb.cache.load("pokemon-species", poke_id)
             log_function(MODULE_NAME, func_name, "Loaded pokemon species from cache successful")
@@ -277,7 +587,7 @@ def get_pokemon_rarity_and_generation_by_id(poke_id: int, depth = 0) -> dict:
         elif depth == 1:
             # fetch from api if loading from cache failed
             log_function(MODULE_NAME, func_name, "Fetching pokemon species from api")
-            pokemon_species = pb.pokemon_species(poke_id)
+            pokemon_species = _fetch("pokemon-species", poke_id, pb.pokemon_species, poke_id)
             log_function(MODULE_NAME, func_name, "Fetched pokemon species from api successful")
             rarity = _check_poke_rarity(pokemon_species, False)
             pokemon_gen_id = pokemon_species.generation.url.split("/")[-2]
@@ -290,9 +600,12 @@ def get_pokemon_rarity_and_generation_by_id(poke_id: int, depth = 0) -> dict:
         else:
             # otherwise its a keyerror from api -> error return {}
             log_function(MODULE_NAME, func_name, f"KeyError on depth != 0! Error: {e.__str__()}", "error")
+            _remember_if_missing(func_name, "pokemon-species", poke_id, e)
             return {}
     except Exception as e:
         log_function(MODULE_NAME, func_name, f"Unresolfed error occured! Error: {e.__str__()}", "error")
+        if depth == 1:
+            _remember_if_missing(func_name, "pokemon-species", poke_id, e)
         return {}
 
 
@@ -322,10 +635,18 @@ def get_pokemon_by_id(poke_id: int, depth = 0) -> dict:
         log_function(MODULE_NAME, func_name, f"Could not load pokemon with id {poke_id}", "error")
         return {}
     
+    if is_known_missing("pokemon", poke_id):
+        log_function(MODULE_NAME, func_name, f"Pokemon with id {poke_id} is known to not exist")
+        return {}
+    
     # try to fetch pokemon from database
     try:
         # load from cache
         if depth == 0:
+            record = pokemon_store.get(poke_id)
+            if record is not None:
+                return {"pokemon_id": record.id, "pokemon_name": record.name, 
+                        "pokemon_stats": [{"stat_name": stat_name, "stat_value": stat_value} for stat_name, stat_value in zip(STAT_NAMES, record.stats)]}
             log_function(MODULE_NAME, func_name, f"Try loading from cache for pokemon id {poke_id}")
             poke_resource = pb.cache.load("pokemon", poke_id)
             log_function(MODULE_NAME, func_name, f"Successfully loaded from cache for pokemon id {poke_id}")
@@ -338,7 +659,7 @@ def get_pokemon_by_id(poke_id: int, depth = 0) -> dict:
             return {"pokemon_id": poke_resource["id"], "pokemon_name": poke_resource["name"], "pokemon_stats": poke_stats}
         elif depth == 1: # fetch from api
             log_function(MODULE_NAME, func_name, f"Try fetching from api for pokemon id {poke_id}")
-            poke_resource = pb.pokemon(poke_id)
+            poke_resource = _fetch("pokemon", poke_id, pb.pokemon, poke_id)
             log_function(MODULE_NAME, func_name, f"Successfully fetched from api for pokemon id {poke_id}")
             
             poke_stats = []
@@ -354,9 +675,12 @@ def get_pokemon_by_id(poke_id: int, depth = 0) -> dict:
             return get_pokemon_by_id(poke_id, depth + 1)
         else:
             log_function(MODULE_NAME, func_name, f"KeyError on depth != 0! Error: {e.__str__()}", "error")
+            _remember_if_missing(func_name, "pokemon", poke_id, e)
             return {}
     except Exception as e:
         log_function(MODULE_NAME, func_name, f"Unresolfed error occured for pokemon id {poke_id}! Error:{e.__str__()}", "error")
+        if depth == 1:
+            _remember_if_missing(func_name, "pokemon", poke_id, e)
         return {}
 
 
@@ -390,19 +714,26 @@ def get_pokesprite_url_by_id(poke_id: int, depth = 0) -> str:
         log_function(MODULE_NAME, func_name, f"Could not load sprite for pokemon with id {poke_id}", "error")
         return ""
     
+    if is_known_missing("sprite", poke_id):
+        log_function(MODULE_NAME, func_name, f"Sprite for pokemon id {poke_id} is known to not exist")
+        return ""
+    
     # try fetching pokesprite url
     try:
         sprite_path = ""
         # load from cache
         if depth == 0:
+            record = pokemon_store.get(poke_id)
+            if record is not None and record.sprite_path != "":
+                return record.sprite_path
             log_function(MODULE_NAME, func_name, f"Loading pokemon sprite from cache for pokemon id: {poke_id}")
-            sprite_path = pb.cache.load_sprite("pokemon", poke_id)["path"].split("static")[1].replace("\\", "/")
+            sprite_path = _sprite_url(pb.cache.load_sprite("pokemon", poke_id)["path"])
             log_function(MODULE_NAME, func_name, f"Loaded pokemon sprite from cache successfuly for pokemon id: {poke_id}")
             return sprite_path
         if depth == 1:
             # fetch from api
             log_function(MODULE_NAME, func_name, f"Fetching pokemon sprite from api for pokemon id: {poke_id}")
-            sprite_path = pb.SpriteResource('pokemon', poke_id).path.split("static")[1].replace("\\", "/")
+            sprite_path = _sprite_url(_fetch("sprite", poke_id, pb.SpriteResource, 'pokemon', poke_id).path)
             log_function(MODULE_NAME, func_name, f"Fetched pokemon sprite from api successfuly for pokemon id: {poke_id}")
         return sprite_path
     except FileNotFoundError as e:
@@ -415,4 +746,54 @@ def get_pokesprite_url_by_id(poke_id: int, depth = 0) -> str:
             return ""
     except Exception as e:
         log_function(MODULE_NAME, func_name, f"Failed fetching sprite for pokemon id {poke_id}. Error: {e.__str__()}", "error")
-        return ""
\ No newline at end of file
+        if depth == 1:
+            _remember_if_missing(func_name, "sprite", poke_id, e)
+        return ""
+
+
+def resolve_pokemon(poke_id: int, load_sprite = True) -> dict:
+    """Returns everything known about a pokemon in one lookup: the pokemon store if it contains the pokemon, 
+    otherwise :func:`get_pokemon_by_id`, :func:`get_pokemon_rarity_and_generation_by_id` and :func:`get_pokesprite_url_by_id`.
+    Complete results are memoized, the returned dictionary is shared and must not be modified
+
+    :param poke_id: id of the pokemon
+    :type poke_id: int
+    :param load_sprite: tells if the sprite path should be loaded, defaults to True
+    :type load_sprite: bool, optional
+    :return: `{}` if the pokemon could not be loaded. `{"pokemon_id": int, "pokemon_name": str, "pokemon_stats": list, "pokemon_rarity": PokemonRarity, 
+            "pokemon_gen_id": str, "pokemon_gen_name": str, "pokemon_points": int, "pokemon_sprite_path": str}` if successfull
+    :rtype: dict
+    """
+    func_name = "resolve_pokemon"
+    
+    poke_id = check_input(func_name, poke_id, "poke_id")
+    if poke_id < 1:
+        return {}
+    
+    key = (poke_id, bool(load_sprite))
+    pokemon = resolved_cache.get(key)
+    if pokemon is not None:
+        return pokemon
+    
+    record = pokemon_store.get(poke_id)
+    if record is not None and (record.sprite_path != "" or not load_sprite):
+        stats = [{"stat_name": stat_name, "stat_value": stat_value} for stat_name, stat_value in zip(STAT_NAMES, record.stats)]
+        rarity = _check_poke_rarity(record, False)
+        pokemon = {"pokemon_id": record.id, "pokemon_name": record.name, "pokemon_stats": stats, "pokemon_rarity": rarity, 
+                   "pokemon_gen_id": str(record.generation_id), "pokemon_gen_name": record.generation_name, 
+                   "pokemon_points": calc_pokemon_points(stats, rarity), "pokemon_sprite_path": record.sprite_path if load_sprite else ""}
+    else:
+        pokemon = get_pokemon_by_id(poke_id)
+        if pokemon == {}:
+            return {}
+        gen_and_rarity = get_pokemon_rarity_and_generation_by_id(poke_id)
+        if gen_and_rarity == {}:
+            return {}
+        sprite_path = get_pokesprite_url_by_id(poke_id) if load_sprite else ""
+        pokemon = {**pokemon, **gen_and_rarity, "pokemon_points": calc_pokemon_points(pokemon["pokemon_stats"], gen_and_rarity["pokemon_rarity"]), 
+                   "pokemon_sprite_path": sprite_path}
+        if load_sprite and sprite_path == "":
+            # the sprite could be loaded by the next call
+            return pokemon
+    resolved_cache.set(key, pokemon)
+    return pokemon
\ No newline at end of file
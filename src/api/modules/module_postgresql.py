@@ -3,7 +3,15 @@ from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 from .module_logger import log_function
+from .module_password import password_hasher, is_legacy_hash
+from collections import deque
+from contextlib import contextmanager
+import threading
+import time
+import io
 import json
+import re
+import weakref
 
 load_dotenv()
 
@@ -13,6 +21,16 @@ class DatabaseError(Exception):
     def __init__(self, err_msg=""):
         super().__init__(err_msg)
 
+class PoolTimeoutError(DatabaseError):
+    def __init__(self, err_msg=""):
+        super().__init__(err_msg)
+
+class DatabaseConnectionError(ConnectionError):
+    """Raised if the database can not be reached or a connection is missing, a `ConnectionError` that is not raised by other libraries
+    """
+    def __init__(self, err_msg=""):
+        super().__init__(err_msg)
+
 class UserObj():
     """This class represents a User entry in the database
     
@@ -79,6 +97,26 @@ DB_SETTINGS = {
         'application_name': 'sqs_2025'
     }
 
+# connection pool settings
+POOL_SETTINGS = {
+        'min_size'        : int(os.getenv("DB_POOL_MIN", "1")),
+        'max_size'        : int(os.getenv("DB_POOL_MAX", "10")),
+        'timeout'         : float(os.getenv("DB_POOL_TIMEOUT", "5")),
+        'check_interval'  : float(os.getenv("DB_POOL_CHECK_INTERVAL", "30"))
+    }
+
+# prepare statements on the server, disable it for poolers that do not keep sessions (e.g. pgbouncer in transaction mode)
+PREPARE_STATEMENTS = os.getenv("DB_PREPARE_STATEMENTS", "1") == "1"
+
+# users fetched per page when users are streamed
+USER_STREAM_ITERSIZE = int(os.getenv("USER_STREAM_ITERSIZE", "1000"))
+
+# formats of bulk imports and exports with COPY, binary only works between databases with the same column types
+COPY_FORMATS = ("csv", "binary")
+# bytes read from or written to a file per COPY chunk and between two progress reports
+COPY_CHUNK_SIZE = 64 * 1024
+COPY_PROGRESS_INTERVAL = 1024 * 1024
+
 # INPUT CHECK
 def check_passwd_input(password: str, function_name="check_passwd_input") -> int:
     """Check the password input if it is correct
@@ -211,6 +249,443 @@ def get_postgress_conn(db_settings: dict):
         return None
 
 
+def check_connection(conn) -> bool:
+    """Checks if a connection is still usable by sending a minimal query to the database
+
+    :param conn: Connection object that will be checked
+    :type conn: psycopg2.connect
+    :return: `True` if the connection is alive, `False` otherwise
+    :rtype: bool
+    """
+    
+    function_name="check_connection"
+
+    if conn is None or conn.closed:
+        return False
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        # do not leave the ping open as a transaction
+        if not conn.autocommit:
+            conn.rollback()
+        return True
+    except ps.Error as e:
+        log_function(MODULE_NAME, function_name, f"Connection check failed. Error: {e.__str__()}", "warn")
+        return False
+
+
+class ConnectionPool():
+    """This class represents a bounded pool of connections to the database. Connections are checked out per call and returned afterwards
+    
+    :param db_settings: settings for the connections of the pool
+    :type db_settings: dict
+    :param min_size: number of connections that are opened on creation, defaults to 1
+    :type min_size: int, optional
+    :param max_size: maximum number of connections the pool will open, defaults to 10
+    :type max_size: int, optional
+    :param timeout: seconds to wait for a free connection before giving up, defaults to 5.0
+    :type timeout: float, optional
+    :param check_interval: connections idle for longer than this many seconds are pinged before they are handed out, defaults to 30.0
+    :type check_interval: float, optional
+
+    :raises ValueError: raises if the pool sizes are invalid
+    :raises ConnectionError: raises if the initial connections could not be opened
+    """
+    
+    def __init__(self, db_settings: dict, min_size = 1, max_size = 10, timeout = 5.0, check_interval = 30.0):
+        """constructor method
+
+        :param db_settings: settings for the connections of the pool
+        :type db_settings: dict
+        :param min_size: number of connections that are opened on creation, defaults to 1
+        :type min_size: int, optional
+        :param max_size: maximum number of connections the pool will open, defaults to 10
+        :type max_size: int, optional
+        :param timeout: seconds to wait for a free connection before giving up, defaults to 5.0
+        :type timeout: float, optional
+        :param check_interval: connections idle for longer than this many seconds are pinged before they are handed out, defaults to 30.0
+        :type check_interval: float, optional
+
+        :raises ValueError: raises if the pool sizes are invalid
+        :raises ConnectionError: raises if the initial connections could not be opened
+        """
+        
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        
+        self._db_settings = db_settings
+        self._min_size = min_size
+        self._max_size = max_size
+        self._timeout = timeout
+        self._check_interval = check_interval
+        
+        self._cond = threading.Condition()
+        # idle connections as (connection, time it was returned)
+        self._idle = deque()
+        # number of connections currently owned by the pool (idle + checked out)
+        self._size = 0
+        self._closed = False
+
+        for _ in range(min_size):
+            conn = get_postgress_conn(db_settings)
+            if conn is None:
+                self.close()
+                raise DatabaseConnectionError("Could not connect do Database")
+            self._idle.append((conn, time.monotonic()))
+            self._size += 1
+
+    def get_max_size(self):
+        return self._max_size
+
+    def get_size(self):
+        return self._size
+    
+    def get_idle_size(self):
+        return len(self._idle)
+
+    def getconn(self, timeout = None):
+        """Checks out a connection from the pool. Idle connections are health checked and replaced if they are broken
+
+        :param timeout: seconds to wait for a free connection, defaults to the timeout of the pool
+        :type timeout: float | None, optional
+        :raises PoolTimeoutError: raises if no connection got free in time
+        :raises DatabaseConnectionError: raises if the pool is closed or a new connection could not be opened
+        :return: a connection that is ready to use
+        :rtype: psycopg2.connect
+        """
+        
+        function_name="ConnectionPool.getconn"
+
+        if timeout is None:
+            timeout = self._timeout
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise DatabaseConnectionError("Connection pool is closed")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._size < self._max_size:
+                    # reserve a slot and open the connection outside of the lock
+                    self._size += 1
+                    conn, idle_since = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    log_function(MODULE_NAME, function_name, f"No free connection after {timeout} seconds", "error")
+                    raise PoolTimeoutError(f"No free database connection after {timeout} seconds")
+                self._cond.wait(remaining)
+
+        if conn is not None:
+            healthy = not conn.closed
+            if healthy and time.monotonic() - idle_since > self._check_interval:
+                healthy = check_connection(conn)
+            if not healthy:
+                log_function(MODULE_NAME, function_name, "Dropping broken connection and reconnecting", "warn")
+                self._discard(conn, release_slot=False)
+                conn = None
+
+        if conn is None:
+            conn = get_postgress_conn(self._db_settings)
+            if conn is None:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise DatabaseConnectionError("Could not connect do Database")
+        return conn
+
+    def putconn(self, conn):
+        """Returns a connection to the pool. Open transactions are rolled back and broken connections are dropped
+
+        :param conn: the connection that was checked out before
+        :type conn: psycopg2.connect
+        """
+        
+        if conn.closed:
+            self._discard(conn)
+            return
+        
+        # read only checkouts switch to autocommit, which is client side only
+        if conn.autocommit:
+            conn.autocommit = False
+
+        # never hand out a connection with a pending or failed transaction
+        if conn.info.transaction_status != ps.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except ps.Error:
+                self._discard(conn)
+                return
+
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                close_connection(conn)
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, conn, release_slot = True):
+        """Closes a connection that will not be reused
+
+        :param conn: the connection to drop
+        :type conn: psycopg2.connect
+        :param release_slot: tells if the slot of the connection is given back to the pool, defaults to True
+        :type release_slot: bool, optional
+        """
+        
+        if not conn.closed:
+            close_connection(conn)
+        if release_slot:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout = None, read_only = False):
+        """Context manager that checks out a connection and returns it to the pool afterwards
+
+        :param timeout: seconds to wait for a free connection, defaults to the timeout of the pool
+        :type timeout: float | None, optional
+        :param read_only: the connection runs in autocommit mode for lookups, so no transaction is opened and no commit is sent, defaults to False
+        :type read_only: bool, optional
+        :yield: a connection that is ready to use
+        :rtype: psycopg2.connect
+        """
+        
+        conn = self.getconn(timeout)
+        try:
+            if read_only:
+                conn.autocommit = True
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def close(self) -> int:
+        """Closes all idle connections of the pool. Checked out connections are closed when they are returned
+
+        :return: `0` if successful, `1` if the pool was already closed, `2` if closing a connection failed
+        :rtype: int
+        """
+        
+        with self._cond:
+            if self._closed:
+                return 1
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        
+        output = 0
+        for conn, _ in idle:
+            if close_connection(conn) != 0:
+                output = 2
+        return output
+
+
+class StatementRegistry():
+    """This class composes every query once per table and prepares it once per connection on the database server.
+    Later calls only send `EXECUTE` with the parameters, so neither the query string nor the plan is built again.
+    Prepared statements live as long as the connection, connections are tracked weakly and forgotten when they are gone
+
+    :param prepare: tells if statements are prepared on the server, otherwise only the composed query is reused, defaults to PREPARE_STATEMENTS
+    :type prepare: bool, optional
+    """
+    
+    _PLACEHOLDER = re.compile(r"%%|%s")
+
+    def __init__(self, prepare = PREPARE_STATEMENTS):
+        """constructor method
+
+        :param prepare: tells if statements are prepared on the server, otherwise only the composed query is reused, defaults to PREPARE_STATEMENTS
+        :type prepare: bool, optional
+        """
+        
+        self._prepare = prepare
+        self._lock = threading.Lock()
+        # query name -> function that composes the query for a table name
+        self._queries = {}
+        # (query name, table name) -> (statement name, query, prepare statement, number of parameters)
+        self._statements = {}
+        # connection -> names of the statements prepared on it
+        self._prepared = weakref.WeakKeyDictionary()
+        self._executions = {}
+        self._prepares = 0
+
+    def register(self, name: str):
+        """Decorator that registers the function composing a query. The function gets the table name 
+        and returns the query with `%s` placeholders
+
+        :param name: name of the query
+        :type name: str
+        :return: decorator that returns the function unchanged
+        :rtype: Callable
+        """
+        
+        def decorator(compose):
+            self._queries[name] = compose
+            return compose
+        return decorator
+
+    def _get_statement(self, cursor, name: str, table_name: str):
+        key = (name, table_name)
+        statement = self._statements.get(key)
+        if statement is None:
+            query = self._queries[name](table_name).as_string(cursor.connection)
+            count = 0
+            def placeholder(match):
+                nonlocal count
+                if match.group(0) == "%%":
+                    return "%"
+                count += 1
+                return f"${count}"
+            prepared_query = self._PLACEHOLDER.sub(placeholder, query)
+            with self._lock:
+                statement = self._statements.setdefault(key, (f"s{len(self._statements)}_{name}", query, prepared_query, count))
+        return statement
+
+    def _prepare_statement(self, cursor, statement_name: str, prepared_query: str):
+        conn = cursor.connection
+        if conn.autocommit:
+            # a failed statement does not abort anything without a transaction
+            try:
+                cursor.execute(f"PREPARE {statement_name} AS {prepared_query}")
+            except ps.errors.DuplicatePreparedStatement:
+                cursor.execute(f"DEALLOCATE {statement_name}")
+                cursor.execute(f"PREPARE {statement_name} AS {prepared_query}")
+            return
+        # the savepoint keeps the transaction of the caller usable if the statement was prepared before it was tracked
+        cursor.execute("SAVEPOINT prepare_statement")
+        try:
+            cursor.execute(f"PREPARE {statement_name} AS {prepared_query}")
+        except ps.errors.DuplicatePreparedStatement:
+            # the existing statement may belong to another query, it is replaced
+            cursor.execute("ROLLBACK TO SAVEPOINT prepare_statement")
+            cursor.execute(f"DEALLOCATE {statement_name}")
+            cursor.execute(f"PREPARE {statement_name} AS {prepared_query}")
+        cursor.execute("RELEASE SAVEPOINT prepare_statement")
+
+    def execute(self, cursor, name: str, table_name: str, params = ()):
+        """Executes a registered query, it is composed and prepared on first use
+
+        :param cursor: cursor of the connection that executes the query
+        :type cursor: psycopg2.cursor
+        :param name: name of the query
+        :type name: str
+        :param table_name: name of the table the query is composed for
+        :type table_name: str
+        :param params: parameters of the query, defaults to ()
+        :type params: list, optional
+        :raises psycopg2.Error: raises if preparing or executing failed
+        """
+        
+        statement_name, query, prepared_query, count = self._get_statement(cursor, name, table_name)
+        with self._lock:
+            self._executions[name] = self._executions.get(name, 0) + 1
+        if not self._prepare:
+            cursor.execute(query, params)
+            return
+        
+        conn = cursor.connection
+        with self._lock:
+            prepared = self._prepared.setdefault(conn, set())
+            is_prepared = statement_name in prepared
+        if not is_prepared:
+            self._prepare_statement(cursor, statement_name, prepared_query)
+            with self._lock:
+                prepared.add(statement_name)
+                self._prepares += 1
+        try:
+            if count == 0:
+                cursor.execute(f"EXECUTE {statement_name}")
+            else:
+                cursor.execute(f"EXECUTE {statement_name} ({', '.join(['%s'] * count)})", params)
+        except ps.errors.InvalidSqlStatementName:
+            # the session lost its statements (e.g. DISCARD ALL), prepare again on the next call
+            with self._lock:
+                prepared.clear()
+            raise
+
+    def get_stats(self) -> dict:
+        """Returns how often every query was executed and how many statements were prepared
+
+        :return: `{"executions": {query name: int}, "prepared": int}`
+        :rtype: dict
+        """
+        
+        with self._lock:
+            return {"executions": dict(self._executions), "prepared": self._prepares}
+
+
+# queries of the user table, shared by all connections
+statements = StatementRegistry()
+
+# connections inside of a unit of work, the functions of this module leave committing to :func:`unit_of_work`
+_units_of_work = weakref.WeakSet()
+
+def _commit(conn):
+    """Commits the work of a function, unless the connection belongs to a unit of work.
+    Connections in autocommit mode have nothing to commit, psycopg2 sends no query for them
+    """
+    if conn not in _units_of_work:
+        conn.commit()
+
+def _rollback(conn):
+    """Rolls back the work of a failed function, unless the connection belongs to a unit of work.
+    A unit of work keeps the failed transaction, so it is rolled back as a whole when the unit ends
+    """
+    if conn not in _units_of_work:
+        conn.rollback()
+
+@contextmanager
+def unit_of_work(conn):
+    """Context manager that groups the functions of this module called with the connection into one transaction,
+    committed once when the block ends. If the block raises or one of the functions failed inside of the database
+    the whole transaction is rolled back. A nested unit of work joins the outer one
+
+    :param conn: Connection object must not be None type
+    :type conn: psycopg2.connect
+    :raises ConnectionError: raises if the connection is a none type object
+    :raises DatabaseError: raises if a function failed inside of the database or the commit failed, nothing was written
+    :yield: the connection
+    :rtype: psycopg2.connect
+    """
+    
+    function_name="unit_of_work"
+
+    if conn is None:
+        raise DatabaseConnectionError("Unit of work received none type object for connection")
+    if conn in _units_of_work:
+        yield conn
+        return
+
+    autocommit = conn.autocommit
+    if autocommit:
+        conn.autocommit = False
+    _units_of_work.add(conn)
+    try:
+        yield conn
+        if conn.info.transaction_status == ps.extensions.TRANSACTION_STATUS_INERROR:
+            raise DatabaseError("A statement of the unit of work failed, the transaction was rolled back")
+        conn.commit()
+    except ps.Error as e:
+        log_function(MODULE_NAME, function_name, f"Unit of work failed. Error: {type(e)} | {e.__str__()}", "error")
+        conn.rollback()
+        raise DatabaseError("Unit of work failed, the transaction was rolled back") from e
+    except BaseException:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        _units_of_work.discard(conn)
+        if autocommit and not conn.closed:
+            conn.autocommit = True
+
+
 def create_table(conn, table_name="users") -> int:
     """Create a table inside the database
 
@@ -239,9 +714,11 @@ def create_table(conn, table_name="users") -> int:
                 {password} TEXT NOT NULL,
                 {deck_ids} JSONB,
                 {points} INTEGER
-            )
+            );
+            CREATE INDEX IF NOT EXISTS {points_index} ON {table_name} ({points} DESC NULLS LAST, id DESC);
             """).format(
                 table_name=sql.Identifier(table_name),
+                points_index=sql.Identifier(f"{table_name}_points_idx"),
                 user_name=sql.Identifier(TABLE_COL_NAMES[0]),
                 password=sql.Identifier(TABLE_COL_NAMES[1]),
                 deck_ids=sql.Identifier(TABLE_COL_NAMES[2]),
@@ -339,8 +816,21 @@ def delete_table(conn, table_name="users") -> int:
         return 2
 
 
+@statements.register("add_user")
+def _compose_add_user(table_name: str):
+    col_names = sql.SQL(', ').join(sql.Identifier(n) for n in TABLE_COL_NAMES )
+    return sql.SQL("""insert into {table_name} ({col_names}) values (
+        %s,
+        %s,
+        %s,
+        %s
+    )""").format(
+        table_name=sql.Identifier(table_name),
+        col_names=col_names
+    )
+
 def add_user_with_crypt_pass(conn, user_name: str, passwd: str, deck_ids: list, table_name="users") -> int:
-    """Add a new user to a table inside the database
+    """Add a new user to a table inside the database. The password is hashed by :data:`password_hasher` inside of the api
 
     :param conn: Connection object must not be None type
     :type conn: psycopg2.connect
@@ -369,6 +859,27 @@ def add_user_with_crypt_pass(conn, user_name: str, passwd: str, deck_ids: list,
         return 1
     
     # check input
+    input_check = check_new_user_input(user_name, passwd, deck_ids, function_name)
+    if input_check != 0:
+        return input_check
+
+    return add_user_with_password_hash(conn, user_name, password_hasher.hash(passwd), deck_ids, table_name)
+
+def check_new_user_input(user_name: str, passwd: str, deck_ids: list, function_name="check_new_user_input") -> int:
+    """Check the input of a new user, so the password is only hashed for valid input
+
+    :param user_name: the name of the user
+    :type user_name: str
+    :param passwd: the password of the user
+    :type passwd: str
+    :param deck_ids: list containing pokemon ids that resemble the deck of the user
+    :type deck_ids: list[int]
+    :param function_name: Name of the function which called this function, defaults to "check_new_user_input"
+    :type function_name: str, optional
+    :return: `0` if the input is correct, otherwise the codes of :func:`check_passwd_input`, :func:`check_user_input` and :func:`check_deck_ids_input`
+    :rtype: int
+    """
+    
     passwd_check = check_passwd_input(passwd, function_name)
     if passwd_check != 0:
         return passwd_check # error >= 10 for password error
@@ -377,40 +888,74 @@ def add_user_with_crypt_pass(conn, user_name: str, passwd: str, deck_ids: list,
     if user_name_check != 0:
         return user_name_check
 
+    return check_deck_ids_input(deck_ids, function_name)
+
+def add_user_with_password_hash(conn, user_name: str, password_hash: str, deck_ids: list, table_name="users") -> int:
+    """Add a new user with an already hashed password to a table inside the database, e.g. hashed by :data:`password_hasher` 
+    before the connection was checked out
+
+    :param conn: Connection object must not be None type
+    :type conn: psycopg2.connect
+    :param user_name: the name of the user
+    :type user_name: str
+    :param password_hash: the hash of the password of the user
+    :type password_hash: str
+    :param deck_ids: list containing pokemon ids that resemble the deck of the user
+    :type deck_ids: list[int]
+    :param table_name: Name of the table, defaults to "users"
+    :type table_name: str, optional
+    :return: `0` if successful, `1` if None Type connection, `2` if unusual error happens, 
+             `3` if user already exists,
+             `4` if username is not a string, `5` if username is empty, `6` if username does not start with a letter,
+             `7` if deck_ids is empty, `8` if the deck_ids list contains something diffrent that an integer
+    :rtype: int
+    """
+    
+    function_name="add_user_with_password_hash"
+
+    if conn is None:
+        log_function(MODULE_NAME, function_name, 
+        f"Adding user with name {user_name} failed. Error: Connection to DB missing.", "error")
+        return 1
+    
+    # check input
+    user_name_check = check_user_input(user_name, function_name)
+    if user_name_check != 0:
+        return user_name_check
+
     deck_ids_check = check_deck_ids_input(deck_ids, function_name)
     if deck_ids_check != 0:
         return deck_ids_check
 
     try:
         log_function(MODULE_NAME, function_name, f"Trying to add user {user_name}")
-        
-        col_names = sql.SQL(', ').join(sql.Identifier(n) for n in TABLE_COL_NAMES )
-        # create querry. get current courser of database, execute querry and commit changes
-        query_base = sql.SQL("""insert into {table_name} ({col_names}) values (
-            %s,
-            crypt(%s, gen_salt('md5')),
-            %s,
-            %s
-        )""").format(
-        table_name=sql.Identifier(table_name),
-        col_names=col_names
-        )
-
         cursor = conn.cursor()
-        cursor.execute(query_base, [user_name, passwd, json.dumps(deck_ids), 0])
-        conn.commit()
+        statements.execute(cursor, "add_user", table_name, [user_name, password_hash, json.dumps(deck_ids), 0])
+        _commit(conn)
         log_function(MODULE_NAME, function_name, f"Added user {user_name} successfully")
         return 0
     except ps.errors.UniqueViolation as e:
         log_function(MODULE_NAME, function_name, f"Adding user {user_name} failed. Error: User already exists!!!", "error")
-        conn.rollback()
+        _rollback(conn)
         return 3
     except ps.Error as e:
         log_function(MODULE_NAME, function_name, f"Creating user {user_name} failed. Error: {type(e)} | {e.__str__()}", "error")
-        conn.rollback()
+        _rollback(conn)
         return 2
 
 
+@statements.register("get_user")
+def _compose_get_user(table_name: str):
+    return sql.SQL("""SELECT id, {col_1}, {col_3}, {col_4} FROM {table_name} 
+                         WHERE {col_1} = %s
+                         """).format(
+        table_name=sql.Identifier(table_name),
+        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
+        col_2=sql.Identifier(TABLE_COL_NAMES[1]),
+        col_3=sql.Identifier(TABLE_COL_NAMES[2]),
+        col_4=sql.Identifier(TABLE_COL_NAMES[3])
+    )
+
 def get_user_from_db(conn, user_name: str, table_name="users") -> UserObj:
     """Returns a user from a table inside the database
 
@@ -439,20 +984,9 @@ def get_user_from_db(conn, user_name: str, table_name="users") -> UserObj:
     
     try:
         log_function(MODULE_NAME, function_name, f"Trying to fetch user {user_name}")
-        # create querry. get current courser of database, execute querry and commit changes
-        query_base = sql.SQL("""SELECT id, {col_1}, {col_3}, {col_4} FROM {table_name} 
-                             WHERE {col_1} = %s
-                             """).format(
-        table_name=sql.Identifier(table_name),
-        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
-        col_2=sql.Identifier(TABLE_COL_NAMES[1]),
-        col_3=sql.Identifier(TABLE_COL_NAMES[2]),
-        col_4=sql.Identifier(TABLE_COL_NAMES[3])
-        )
-
         cursor = conn.cursor()
-        cursor.execute(query_base, [user_name])
-        conn.commit()
+        statements.execute(cursor, "get_user", table_name, [user_name])
+        _commit(conn)
         fetch = cursor.fetchone()
         # check if the fetch was successful -> User exists or not?
         if fetch is not None:
@@ -464,9 +998,18 @@ def get_user_from_db(conn, user_name: str, table_name="users") -> UserObj:
             return UserObj.create_empty()
     except ps.Error as e:
         log_function(MODULE_NAME, function_name, f"Fetching user {user_name} failed. Error: {type(e)} | {e.__str__()}", "error")
-        conn.rollback()
+        _rollback(conn)
         return UserObj.create_empty()
 
+@statements.register("get_all_users")
+def _compose_get_all_users(table_name: str):
+    return sql.SQL("""SELECT id, {col_1}, {col_3}, {col_4} FROM {table_name}""").format(
+        table_name=sql.Identifier(table_name),
+        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
+        col_3=sql.Identifier(TABLE_COL_NAMES[2]),
+        col_4=sql.Identifier(TABLE_COL_NAMES[3])
+    )
+
 def get_all_users_from_db(conn, table_name="users") -> dict:
     """Returns a dictionary containing all users in the table
 
@@ -487,17 +1030,9 @@ def get_all_users_from_db(conn, table_name="users") -> dict:
     
     try:
         log_function(MODULE_NAME, function_name, "Trying to fetch all users")
-        # create querry. get current courser of database, execute querry and commit changes
-        query_base = sql.SQL("""SELECT id, {col_1}, {col_3}, {col_4} FROM {table_name}""").format(
-        table_name=sql.Identifier(table_name),
-        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
-        col_3=sql.Identifier(TABLE_COL_NAMES[2]),
-        col_4=sql.Identifier(TABLE_COL_NAMES[3])
-        )
-
         cursor = conn.cursor()
-        cursor.execute(query_base)
-        conn.commit()
+        statements.execute(cursor, "get_all_users", table_name)
+        _commit(conn)
         fetch = cursor.fetchall()
         
         # check if the fetch was successful -> User exists or not?
@@ -512,11 +1047,467 @@ def get_all_users_from_db(conn, table_name="users") -> dict:
             return {"users": []}
     except ps.Error as e:
         log_function(MODULE_NAME, function_name, f"Fetching users failed. Error: {type(e)} | {e.__str__()}", "error")
-        conn.rollback()
+        _rollback(conn)
+        return {}
+
+@statements.register("get_users_page")
+def _compose_get_users_page(table_name: str):
+    return sql.SQL("""SELECT id, {col_1}, {col_3}, {col_4} FROM {table_name} 
+                         WHERE id > %s
+                         ORDER BY id
+                         LIMIT %s
+                         """).format(
+        table_name=sql.Identifier(table_name),
+        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
+        col_3=sql.Identifier(TABLE_COL_NAMES[2]),
+        col_4=sql.Identifier(TABLE_COL_NAMES[3])
+    )
+
+def get_users_page_from_db(conn, after_id = 0, limit = USER_STREAM_ITERSIZE, table_name="users") -> list:
+    """Returns the next users ordered by id after the id of the last user of the previous page (keyset paging).
+    Every page is a short query of its own, so no transaction or connection has to stay open between pages
+
+    :param conn: Connection object must not be None type
+    :type conn: psycopg2.connect
+    :param after_id: id of the last user of the previous page, defaults to 0
+    :type after_id: int, optional
+    :param limit: maximum number of users to return, defaults to USER_STREAM_ITERSIZE
+    :type limit: int, optional
+    :param table_name: Name of the table, defaults to "users"
+    :type table_name: str, optional
+    :raises ConnectionError: raises if the connection is a none type object
+    :raises DatabaseError: raises if fetching failed
+    :return: the users: `[{"user_id": int, "user_name": str, "deck_ids": list, "points": int}, ...]`
+    :rtype: list[dict]
+    """
+    function_name="get_users_page_from_db"
+
+    # check connection
+    if conn is None:
+        log_function(MODULE_NAME, function_name, 
+        "Fetching users failed. Error: Connection to DB missing.", "error")
+        raise DatabaseConnectionError("Get users page function received none type object for connection")
+    
+    try:
+        cursor = conn.cursor()
+        statements.execute(cursor, "get_users_page", table_name, [after_id, max(1, limit)])
+        fetch = cursor.fetchall()
+        _commit(conn)
+        return [UserObj(_id, _name, _deck_ids, _points).__dict__() for _id, _name, _deck_ids, _points in fetch]
+    except ps.Error as e:
+        log_function(MODULE_NAME, function_name, f"Fetching users after id {after_id} failed. Error: {type(e)} | {e.__str__()}", "error")
+        _rollback(conn)
+        raise DatabaseError(f"Fetching users after id {after_id} failed") from e
+
+def iter_users_from_db(conn, itersize = USER_STREAM_ITERSIZE, table_name="users"):
+    """Yields all users in the table one by one ordered by id. The rows are fetched in pages of `itersize` by :func:`get_users_page_from_db`, 
+    so memory stays flat no matter how many users or cards exist and no transaction stays open while the consumer is waiting.
+    The pages are no snapshot, users changed during the stream are yielded as they are when their page is fetched
+
+    :param conn: Connection object must not be None type
+    :type conn: psycopg2.connect
+    :param itersize: rows fetched per round trip, defaults to USER_STREAM_ITERSIZE
+    :type itersize: int, optional
+    :param table_name: Name of the table, defaults to "users"
+    :type table_name: str, optional
+    :raises DatabaseError: raises if fetching failed, users already yielded stay valid
+    :yield: the users: `{"user_id": int, "user_name": str, "deck_ids": list, "points": int}`
+    :rtype: Generator[dict]
+    """
+    function_name="iter_users_from_db"
+
+    # check connection
+    if conn is None:
+        log_function(MODULE_NAME, function_name, 
+        "Streaming users failed. Error: Connection to DB missing.", "error")
+        return
+    
+    log_function(MODULE_NAME, function_name, "Trying to stream all users")
+    count = 0
+    after_id = 0
+    itersize = max(1, itersize)
+    while True:
+        users = get_users_page_from_db(conn, after_id, itersize, table_name)
+        for user in users:
+            count += 1
+            yield user
+        if len(users) < itersize:
+            break
+        after_id = users[-1]["user_id"]
+    log_function(MODULE_NAME, function_name, f"Streamed {count} users")
+
+class _CopyProgress():
+    """File wrapper for COPY that counts the transferred bytes and reports them every `interval` bytes
+
+    :param file: the file COPY reads from or writes to
+    :param progress: function that takes the number of transferred bytes, defaults to None
+    :type progress: Callable[[int], Any] | None, optional
+    """
+
+    def __init__(self, file, progress = None, interval = COPY_PROGRESS_INTERVAL):
+        self._file = file
+        self._progress = progress
+        self._interval = interval
+        self._bytes = 0
+        self._reported = 0
+
+    def _add(self, size: int):
+        self._bytes += size
+        if self._progress is not None and self._bytes - self._reported >= self._interval:
+            self._reported = self._bytes
+            self._progress(self._bytes)
+
+    def read(self, size = -1):
+        data = self._file.read(size)
+        self._add(len(data))
+        return data
+
+    def write(self, data):
+        self._add(len(data))
+        # psycopg2 only writes str to text files it can see, the wrapper hides the file
+        if isinstance(self._file, io.TextIOBase):
+            data = data.decode("utf-8")
+        return self._file.write(data)
+
+    def finish(self):
+        """Reports the final number of bytes
+        """
+        if self._progress is not None and self._reported != self._bytes:
+            self._reported = self._bytes
+            self._progress(self._bytes)
+
+
+class _IterReader():
+    """Read only file over an iterable of str or bytes chunks (e.g. csv lines), only `size` bytes and one chunk are held in memory
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def read(self, size = -1):
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            parts.append(chunk)
+            length += len(chunk)
+        data = b"".join(parts)
+        if 0 <= size < len(data):
+            data, self._buffer = data[:size], data[size:]
+        else:
+            self._buffer = b""
+        return data
+
+
+def _copy_options(copy_format: str) -> sql.Composable:
+    if copy_format == "csv":
+        return sql.SQL("(FORMAT csv, HEADER true)")
+    return sql.SQL("(FORMAT binary)")
+
+def import_users_to_db(conn, source, copy_format = "csv", on_conflict = "skip", progress = None, table_name="users") -> dict:
+    """Imports users in bulk with COPY. The rows are copied into a temporary table in chunks of COPY_CHUNK_SIZE bytes
+    and inserted with one statement, so memory stays bounded no matter how many users are imported.
+    Columns are user_name, password, deck_ids, points (csv with header). Passwords must already be hashed, e.g. by an export or :data:`password_hasher`.
+    Rows with a user name that does not start with a letter, a deck that is no list or negative points are skipped
+
+    :param conn: Connection object must not be None type
+    :type conn: psycopg2.connect
+    :param source: file opened for reading or iterable of str or bytes chunks (e.g. csv lines)
+    :param copy_format: one of COPY_FORMATS, defaults to "csv"
+    :type copy_format: str, optional
+    :param on_conflict: "skip" keeps existing users, "update" overwrites password, deck and points of existing users, defaults to "skip"
+    :type on_conflict: str, optional
+    :param progress: function that takes the number of bytes read so far, defaults to None
+    :type progress: Callable[[int], Any] | None, optional
+    :param table_name: Name of the table, defaults to "users"
+    :type table_name: str, optional
+    :return: `{"read": int, "imported": int}` number of rows read and inserted or updated, `{}` if the import failed
+    :rtype: dict
+    """
+    function_name="import_users_to_db"
+
+    # check connection
+    if conn is None:
+        log_function(MODULE_NAME, function_name, 
+        "Importing users failed. Error: Connection to DB missing.", "error")
+        return {}
+    if copy_format not in COPY_FORMATS or on_conflict not in ("skip", "update"):
+        log_function(MODULE_NAME, function_name, f"Importing users failed. Error: unknown format {copy_format} or conflict handling {on_conflict}", "error")
+        return {}
+
+    if not hasattr(source, "read"):
+        source = _IterReader(source)
+    reader = _CopyProgress(source, progress)
+    staging = sql.Identifier(f"{table_name}_import")
+    col_names = sql.SQL(', ').join(sql.Identifier(n) for n in TABLE_COL_NAMES)
+    if on_conflict == "update":
+        conflict = sql.SQL("DO UPDATE SET {assignments}").format(
+            assignments=sql.SQL(', ').join(
+                sql.SQL("{col} = EXCLUDED.{col}").format(col=sql.Identifier(n)) for n in TABLE_COL_NAMES[1:]
+            )
+        )
+    else:
+        conflict = sql.SQL("DO NOTHING")
+    try:
+        log_function(MODULE_NAME, function_name, f"Trying to import users into {table_name}")
+        # the temporary table lives until the commit, so the import needs a transaction even on autocommit connections
+        with unit_of_work(conn):
+            cursor = conn.cursor()
+            cursor.execute(sql.SQL("""CREATE TEMP TABLE {staging} ON COMMIT DROP AS 
+                                      SELECT {col_names} FROM {table_name} WITH NO DATA""").format(
+                staging=staging,
+                col_names=col_names,
+                table_name=sql.Identifier(table_name)
+            ))
+            cursor.copy_expert(sql.SQL("COPY {staging} ({col_names}) FROM STDIN WITH {options}").format(
+                staging=staging,
+                col_names=col_names,
+                options=_copy_options(copy_format)
+            ), reader, size=COPY_CHUNK_SIZE)
+            read = cursor.rowcount
+            cursor.execute(sql.SQL("""INSERT INTO {table_name} ({col_names}) 
+                                      SELECT {col_1}, {col_2}, COALESCE({col_3}, '[]'::jsonb), COALESCE({col_4}, 0) FROM {staging} 
+                                      WHERE {col_1} ~ '^[[:alpha:]]' 
+                                      AND {col_2} IS NOT NULL 
+                                      AND jsonb_typeof(COALESCE({col_3}, '[]'::jsonb)) = 'array' 
+                                      AND COALESCE({col_4}, 0) >= 0 
+                                      ON CONFLICT ({col_1}) {conflict}""").format(
+                table_name=sql.Identifier(table_name),
+                col_names=col_names,
+                staging=staging,
+                conflict=conflict,
+                col_1=sql.Identifier(TABLE_COL_NAMES[0]),
+                col_2=sql.Identifier(TABLE_COL_NAMES[1]),
+                col_3=sql.Identifier(TABLE_COL_NAMES[2]),
+                col_4=sql.Identifier(TABLE_COL_NAMES[3])
+            ))
+            imported = cursor.rowcount
+        reader.finish()
+        log_function(MODULE_NAME, function_name, f"Imported {imported} of {read} users into {table_name}")
+        return {"read": read, "imported": imported}
+    except DatabaseError as e:
+        cause = e.__cause__ or e
+        log_function(MODULE_NAME, function_name, f"Importing users failed. Error: {type(cause)} | {cause.__str__()}", "error")
+        return {}
+    except ps.Error as e:
+        # only raised inside of an outer unit of work, which rolls back
+        log_function(MODULE_NAME, function_name, f"Importing users failed. Error: {type(e)} | {e.__str__()}", "error")
+        return {}
+
+def export_users_from_db(conn, file, copy_format = "csv", progress = None, table_name="users") -> dict:
+    """Exports all users in bulk with COPY, rows are written to the file while they are sent by the database so memory stays bounded.
+    Columns are user_name, password (hash), deck_ids, points, the result can be imported with :func:`import_users_to_db`
+
+    :param conn: Connection object must not be None type
+    :type conn: psycopg2.connect
+    :param file: file opened for writing, text mode for csv or binary mode
+    :param copy_format: one of COPY_FORMATS, defaults to "csv"
+    :type copy_format: str, optional
+    :param progress: function that takes the number of bytes written so far, defaults to None
+    :type progress: Callable[[int], Any] | None, optional
+    :param table_name: Name of the table, defaults to "users"
+    :type table_name: str, optional
+    :return: `{"exported": int}` number of exported users, `{}` if the export failed
+    :rtype: dict
+    """
+    function_name="export_users_from_db"
+
+    # check connection
+    if conn is None:
+        log_function(MODULE_NAME, function_name, 
+        "Exporting users failed. Error: Connection to DB missing.", "error")
+        return {}
+    if copy_format not in COPY_FORMATS:
+        log_function(MODULE_NAME, function_name, f"Exporting users failed. Error: unknown format {copy_format}", "error")
         return {}
 
-def authenticate_user_from_db(conn, user_name: str, user_password: str, table_name="users") -> UserObj:
-    """Returns a user from a table inside the database if password is correct
+    writer = _CopyProgress(file, progress)
+    try:
+        log_function(MODULE_NAME, function_name, f"Trying to export users from {table_name}")
+        cursor = conn.cursor()
+        cursor.copy_expert(sql.SQL("COPY (SELECT {col_names} FROM {table_name}) TO STDOUT WITH {options}").format(
+            col_names=sql.SQL(', ').join(sql.Identifier(n) for n in TABLE_COL_NAMES),
+            table_name=sql.Identifier(table_name),
+            options=_copy_options(copy_format)
+        ), writer, size=COPY_CHUNK_SIZE)
+        exported = cursor.rowcount
+        _commit(conn)
+        writer.finish()
+        log_function(MODULE_NAME, function_name, f"Exported {exported} users from {table_name}")
+        return {"exported": exported}
+    except ps.Error as e:
+        log_function(MODULE_NAME, function_name, f"Exporting users failed. Error: {type(e)} | {e.__str__()}", "error")
+        _rollback(conn)
+        return {}
+
+def _compose_leaderboard(table_name: str, keyset: sql.Composable):
+    # order matches the points index, a NULL limit means no limit
+    return sql.SQL("""SELECT id, {col_1}, {col_4} FROM {table_name}
+                         WHERE {col_4} IS NOT NULL {keyset}
+                         ORDER BY {col_4} DESC NULLS LAST, id DESC
+                         LIMIT %s OFFSET %s
+                         """).format(
+        table_name=sql.Identifier(table_name),
+        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
+        col_4=sql.Identifier(TABLE_COL_NAMES[3]),
+        keyset=keyset
+    )
+
+@statements.register("get_leaderboard")
+def _compose_get_leaderboard(table_name: str):
+    return _compose_leaderboard(table_name, sql.SQL(""))
+
+@statements.register("get_leaderboard_after")
+def _compose_get_leaderboard_after(table_name: str):
+    # keyset pagination, continues after the points and id of the last user of the previous page
+    return _compose_leaderboard(table_name, sql.SQL("AND ({col_4}, id) < (%s, %s)").format(col_4=sql.Identifier(TABLE_COL_NAMES[3])))
+
+def get_leaderboard_from_db(conn, limit = 10, offset = 0, after_points = None, after_id = None, table_name="users") -> dict:
+    """Returns the users with the most points, ordered by points. Only names and points are fetched, using the index on the points column.
+    Pages can be fetched by offset or by keyset (points and id of the last user of the previous page)
+
+    :param conn: Connection object must not be None type
+    :type conn: psycopg2.connect
+    :param limit: maximum number of users to return, `None` returns all users, defaults to 10
+    :type limit: int | None, optional
+    :param offset: number of users to skip, defaults to 0
+    :type offset: int, optional
+    :param after_points: points of the last user of the previous page, must be set together with after_id, defaults to None
+    :type after_points: int | None, optional
+    :param after_id: id of the last user of the previous page, must be set together with after_points, defaults to None
+    :type after_id: int | None, optional
+    :param table_name: Name of the table, defaults to "users"
+    :type table_name: str, optional
+    :return: dictionary containing the users: `{"users": [{"user_id": int, "user_name": str, "points": int}, ...]}`, `{}` if fetch failed
+    :rtype: dict
+    """
+    function_name="get_leaderboard_from_db"
+
+    # check connection
+    if conn is None:
+        log_function(MODULE_NAME, function_name, 
+        "Fetching leaderboard failed. Error: Connection to DB missing.", "error")
+        return {}
+    
+    # check input
+    if limit is not None and (not isinstance(limit, int) or limit < 1):
+        log_function(MODULE_NAME, function_name, "limit must be a positive integer", "error")
+        return {}
+    if not isinstance(offset, int) or offset < 0:
+        log_function(MODULE_NAME, function_name, "offset must be a non negative integer", "error")
+        return {}
+    if (after_points is None) != (after_id is None):
+        log_function(MODULE_NAME, function_name, "after_points and after_id must be set together", "error")
+        return {}
+    
+    try:
+        log_function(MODULE_NAME, function_name, "Trying to fetch leaderboard")
+        cursor = conn.cursor()
+        if after_points is None:
+            statements.execute(cursor, "get_leaderboard", table_name, [limit, offset])
+        else:
+            statements.execute(cursor, "get_leaderboard_after", table_name, [after_points, after_id, limit, offset])
+        _commit(conn)
+        user_arry = [{"user_id": _id, "user_name": _name, "points": _points} for _id, _name, _points in cursor.fetchall()]
+        return {"users": user_arry}
+    except ps.Error as e:
+        log_function(MODULE_NAME, function_name, f"Fetching leaderboard failed. Error: {type(e)} | {e.__str__()}", "error")
+        _rollback(conn)
+        return {}
+
+@statements.register("get_user_rank")
+def _compose_get_user_rank(table_name: str):
+    return sql.SQL("""SELECT 1 + (SELECT count(*) FROM {table_name} WHERE {col_4} > COALESCE(u.{col_4}, 0))
+                         FROM {table_name} u WHERE u.{col_1} = %s
+                         """).format(
+        table_name=sql.Identifier(table_name),
+        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
+        col_4=sql.Identifier(TABLE_COL_NAMES[3])
+    )
+
+def get_user_rank_from_db(conn, user_name: str, table_name="users") -> int:
+    """Returns the rank of a user on the leaderboard. Users with the same points share a rank
+
+    :param conn: Connection object must not be None type
+    :type conn: psycopg2.connect
+    :param user_name: the name of the user
+    :type user_name: str
+    :param table_name: Name of the table, defaults to "users"
+    :type table_name: str, optional
+    :return: rank of the user starting at `1`, `-1` if the user does not exist or fetch failed
+    :rtype: int
+    """
+    function_name="get_user_rank_from_db"
+
+    # check connection
+    if conn is None:
+        log_function(MODULE_NAME, function_name, 
+        f"Fetching rank of user {user_name} failed. Error: Connection to DB missing.", "error")
+        return -1
+    
+    # check input
+    user_name_check = check_user_input(user_name, function_name)
+    if user_name_check != 0:
+        return -1
+    
+    try:
+        log_function(MODULE_NAME, function_name, f"Trying to fetch rank of user {user_name}")
+        cursor = conn.cursor()
+        statements.execute(cursor, "get_user_rank", table_name, [user_name])
+        _commit(conn)
+        fetch = cursor.fetchone()
+        if fetch is None:
+            log_function(MODULE_NAME, function_name, f"Fetched user {user_name} not found", "warn")
+            return -1
+        return fetch[0]
+    except ps.Error as e:
+        log_function(MODULE_NAME, function_name, f"Fetching rank of user {user_name} failed. Error: {type(e)} | {e.__str__()}", "error")
+        _rollback(conn)
+        return -1
+
+@statements.register("get_user_password")
+def _compose_get_user_password(table_name: str):
+    return sql.SQL("""SELECT id, {col_1}, {col_3}, {col_4}, {col_2} FROM {table_name} 
+                         WHERE {col_1} = %s
+                         """).format(
+        table_name=sql.Identifier(table_name),
+        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
+        col_2=sql.Identifier(TABLE_COL_NAMES[1]),
+        col_3=sql.Identifier(TABLE_COL_NAMES[2]),
+        col_4=sql.Identifier(TABLE_COL_NAMES[3])
+    )
+
+@statements.register("check_legacy_password")
+def _compose_check_legacy_password(table_name: str):
+    # md5-crypt hashes of pgcrypto are verified once by the database, afterwards the password is rehashed
+    return sql.SQL("""SELECT {col_2} = crypt(%s, {col_2}) FROM {table_name} 
+                         WHERE {col_1} = %s
+                         """).format(
+        table_name=sql.Identifier(table_name),
+        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
+        col_2=sql.Identifier(TABLE_COL_NAMES[1])
+    )
+
+@statements.register("rehash_password")
+def _compose_rehash_password(table_name: str):
+    # only replaces the hash that was verified, a password changed in the meantime is kept
+    return sql.SQL("""UPDATE {table_name} 
+                         SET {col_2} = %s 
+                         WHERE {col_1} = %s AND {col_2} = %s
+                         """).format(
+        table_name=sql.Identifier(table_name),
+        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
+        col_2=sql.Identifier(TABLE_COL_NAMES[1])
+    )
+
+def get_user_password_from_db(conn, user_name: str, user_password: str, table_name="users") -> tuple:
+    """Returns a user from a table inside the database together with its stored hash, so the password can be verified 
+    inside of the api after the connection was released, see :meth:`Database.authenticate_user`. Legacy md5-crypt hashes can only be verified by the database, that happens here
 
     :param conn: Connection object must not be None type
     :type conn: psycopg2.connect
@@ -526,58 +1517,117 @@ def authenticate_user_from_db(conn, user_name: str, user_password: str, table_na
     :type user_password: str
     :param table_name: Name of the table, defaults to "users"
     :type table_name: str, optional
-    :return: Returns empty user with id `-1` if fetch fails. Returns UserObj containing user information otherwise.
-    :rtype: UserObj
+    :return: `(UserObj, hash)`, a legacy hash is only returned if the password matched it. 
+             `(empty UserObj, None)` if the user does not exist, the input is invalid, the password did not match a legacy hash or the fetch failed
+    :rtype: tuple[UserObj, str | None]
     """
     
-    function_name="authenticate_user_from_db"
+    function_name="get_user_password_from_db"
 
     # check connection
     if conn is None:
         log_function(MODULE_NAME, function_name, 
         f"Fetching user with name {user_name} failed. Error: Connection to DB missing.", "error")
-        return UserObj.create_empty()
+        return UserObj.create_empty(), None
     
     # check input
     passwd_check = check_passwd_input(user_password, function_name)
     if passwd_check != 0:
-        return UserObj.create_empty() # error >= 10 for password error
+        return UserObj.create_empty(), None # error >= 10 for password error
 
     user_name_check = check_user_input(user_name, function_name)
     if user_name_check != 0:
-        return UserObj.create_empty()
+        return UserObj.create_empty(), None
     
     try:
         log_function(MODULE_NAME, function_name, f"Trying to fetch user {user_name}")
-        # create querry. get current courser of database, execute querry and commit changes
-        query_base = sql.SQL("""SELECT id, {col_1}, {col_3}, {col_4} FROM {table_name} 
-                             WHERE {col_1} = %s
-                             AND {col_2} = crypt(%s, password);
-                             """).format(
-        table_name=sql.Identifier(table_name),
-        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
-        col_2=sql.Identifier(TABLE_COL_NAMES[1]),
-        col_3=sql.Identifier(TABLE_COL_NAMES[2]),
-        col_4=sql.Identifier(TABLE_COL_NAMES[3])
-        )
-
         cursor = conn.cursor()
-        cursor.execute(query_base, [user_name, user_password])
-        conn.commit()
+        statements.execute(cursor, "get_user_password", table_name, [user_name])
         fetch = cursor.fetchone()
         # check if the fetch was successful -> User exists or not?
-        if fetch is not None:
-            _id, _name, _deck_ids, _points = fetch
-            log_function(MODULE_NAME, function_name, f"Fetched user {user_name} successfully")
-            return UserObj(_id, _name, _deck_ids, _points)
-        else:
+        if fetch is None:
+            _commit(conn)
             log_function(MODULE_NAME, function_name, f"Fetched user {user_name} not found", "warn")
-            return UserObj.create_empty()
+            return UserObj.create_empty(), None
+        _id, _name, _deck_ids, _points, password_hash = fetch
+        if is_legacy_hash(password_hash):
+            statements.execute(cursor, "check_legacy_password", table_name, [user_password, user_name])
+            fetch = cursor.fetchone()
+            if fetch is None or fetch[0] is not True:
+                _commit(conn)
+                log_function(MODULE_NAME, function_name, f"Wrong password for user {user_name}", "warn")
+                return UserObj.create_empty(), None
+        _commit(conn)
+        log_function(MODULE_NAME, function_name, f"Fetched user {user_name} successfully")
+        return UserObj(_id, _name, _deck_ids, _points), password_hash
     except ps.Error as e:
         log_function(MODULE_NAME, function_name, f"Fetching user {user_name} failed. Error: {type(e)} | {e.__str__()}", "error")
-        conn.rollback()
-        return UserObj.create_empty()
+        _rollback(conn)
+        return UserObj.create_empty(), None
+
+def verify_user_password(user_password: str, password_hash: str | None) -> bool:
+    """Verifies a password against the hash returned by :func:`get_user_password_from_db`. 
+    Without hash a dummy hash is verified, so the answer takes as long as for a wrong password
+
+    :param user_password: the password of the user
+    :type user_password: str
+    :param password_hash: the returned hash
+    :type password_hash: str | None
+    :return: `True` if the password is correct
+    :rtype: bool
+    """
+    
+    if password_hash is None:
+        password_hasher.verify(user_password, password_hasher.get_dummy_hash())
+        return False
+    # legacy hashes were already verified by the database
+    return is_legacy_hash(password_hash) or password_hasher.verify(user_password, password_hash)
+
+def rehash_password_from_db(conn, user_name: str, password_hash: str, old_password_hash: str, table_name="users") -> int:
+    """Replaces a legacy or outdated hash after a successful login. Only the verified hash is replaced, a password changed in the meantime is kept
 
+    :param conn: Connection object must not be None type
+    :type conn: psycopg2.connect
+    :param user_name: the name of the user
+    :type user_name: str
+    :param password_hash: the new hash
+    :type password_hash: str
+    :param old_password_hash: the hash the password was verified against
+    :type old_password_hash: str
+    :param table_name: Name of the table, defaults to "users"
+    :type table_name: str, optional
+    :return: `0` if successful, `1` if None Type connection, `2` if unusual error happens
+    :rtype: int
+    """
+    
+    function_name="rehash_password_from_db"
+
+    if conn is None:
+        log_function(MODULE_NAME, function_name, 
+        f"Rehashing password of user {user_name} failed. Error: Connection to DB missing.", "error")
+        return 1
+    
+    try:
+        cursor = conn.cursor()
+        statements.execute(cursor, "rehash_password", table_name, [password_hash, user_name, old_password_hash])
+        _commit(conn)
+        log_function(MODULE_NAME, function_name, f"Rehashed password of user {user_name}")
+        return 0
+    except ps.Error as e:
+        log_function(MODULE_NAME, function_name, f"Rehashing password of user {user_name} failed. Error: {type(e)} | {e.__str__()}", "warn")
+        _rollback(conn)
+        return 2
+
+@statements.register("update_user")
+def _compose_update_user(table_name: str):
+    return sql.SQL("""UPDATE {table_name} 
+                         SET {col_3} = %s 
+                         WHERE {col_1} = %s
+                         """).format(
+        table_name=sql.Identifier(table_name),
+        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
+        col_3=sql.Identifier(TABLE_COL_NAMES[2])
+    )
 
 def update_user_from_db(conn, user_name: str, deck_ids: list, table_name="users") -> int:
     """Update a user from a table inside the database
@@ -615,26 +1665,182 @@ def update_user_from_db(conn, user_name: str, deck_ids: list, table_name="users"
 
     try:
         log_function(MODULE_NAME, function_name, f"Trying to update user {user_name}")
-        # create querry. get current courser of database, execute querry and commit changes
-        query_base = sql.SQL("""UPDATE {table_name} 
-                             SET {col_3} = %s 
-                             WHERE {col_1} = %s
-                             """).format(
+        cursor = conn.cursor()
+        statements.execute(cursor, "update_user", table_name, [json.dumps(deck_ids), user_name])
+        _commit(conn)
+        log_function(MODULE_NAME, function_name, f"Updated user {user_name} successfully")
+        return 0
+    except ps.Error as e:
+        log_function(MODULE_NAME, function_name, f"Updating user {user_name} failed. Error: {type(e)} | {e.__str__()}", "error")
+        _rollback(conn)
+        return 2
+
+@statements.register("append_elem")
+def _compose_append_elem(table_name: str):
+    return sql.SQL("""WITH target AS (
+                            SELECT id FROM {table_name} WHERE {col_1} = %s
+                         ), appended AS (
+                            UPDATE {table_name}
+                            SET {col_3} = COALESCE({col_3}, '[]'::jsonb) || %s::jsonb
+                            WHERE id IN (SELECT id FROM target)
+                            AND NOT EXISTS (
+                                SELECT 1 FROM jsonb_array_elements(COALESCE({col_3}, '[]'::jsonb)) AS d(existing) WHERE existing = %s::jsonb
+                            )
+                            RETURNING id
+                         )
+                         SELECT EXISTS (SELECT 1 FROM target), EXISTS (SELECT 1 FROM appended)
+                         """).format(
         table_name=sql.Identifier(table_name),
         col_1=sql.Identifier(TABLE_COL_NAMES[0]),
         col_3=sql.Identifier(TABLE_COL_NAMES[2])
-        )
+    )
+
+def append_elem_to_user_deck_from_db(conn, user_name: str, new_elem: dict, table_name="users") -> int:
+    """Appends an element to the deck of a user inside the database if it is not already part of it.
+    The check and the append run as a single statement, so concurrent appends for the same user can not overwrite each other
+
+    :param conn: Connection object must not be None type
+    :type conn: psycopg2.connect
+    :param user_name: the name of the user
+    :type user_name: str
+    :param new_elem: the element that should be added to the deck of form `{"_id": int, "_name": str}`
+    :type new_elem: dict
+    :param table_name: Name of the table, defaults to "users"
+    :type table_name: str, optional
+    :return: `0` if the element was new and got added, `1` if None Type connection, `2` if unusual error happens, 
+             `4` if username is not a string, `5` if username is empty, `6` if username does not start with a letter,
+             `8` if the element is not a dictionary, `14` if the element is already part of the deck, `15` if the user does not exist
+    :rtype: int
+    """
+    
+    function_name="append_elem_to_user_deck_from_db"
 
+    # check connection
+    if conn is None:
+        log_function(MODULE_NAME, function_name, 
+        f"Updating user with name {user_name} failed. Error: Connection to DB missing.", "error")
+        return 1
+
+    # check input
+    user_name_check = check_user_input(user_name, function_name)
+    if user_name_check != 0:
+        return user_name_check
+    
+    if not isinstance(new_elem, dict):
+        log_function(MODULE_NAME, function_name, "new element must be a dictionary object", "error")
+        return 8
+
+    try:
+        log_function(MODULE_NAME, function_name, f"Trying to append element to deck of user {user_name}")
+        # the update only matches if the deck does not contain an equal element yet (containment would also match subsets). 
+        # concurrent updates of the same row are re-evaluated by postgres, so duplicates can not slip through
         cursor = conn.cursor()
-        cursor.execute(query_base, [json.dumps(deck_ids), user_name])
-        conn.commit()
-        log_function(MODULE_NAME, function_name, f"Updated user {user_name} successfully")
+        statements.execute(cursor, "append_elem", table_name, [user_name, json.dumps([new_elem]), json.dumps(new_elem)])
+        user_exists, appended = cursor.fetchone()
+        _commit(conn)
+        if not user_exists:
+            log_function(MODULE_NAME, function_name, f"User {user_name} not found", "warn")
+            return 15
+        if not appended:
+            log_function(MODULE_NAME, function_name, f"Element already in deck of user {user_name}")
+            return 14
+        log_function(MODULE_NAME, function_name, f"Appended element to deck of user {user_name} successfully")
         return 0
     except ps.Error as e:
-        log_function(MODULE_NAME, function_name, f"Updating user {user_name} failed. Error: {type(e)} | {e.__str__()}", "error")
-        conn.rollback()
+        log_function(MODULE_NAME, function_name, f"Appending element to deck of user {user_name} failed. Error: {type(e)} | {e.__str__()}", "error")
+        _rollback(conn)
         return 2
 
+@statements.register("append_elems")
+def _compose_append_elems(table_name: str):
+    return sql.SQL("""WITH target AS (
+                            SELECT id, COALESCE({col_3}, '[]'::jsonb) AS deck FROM {table_name} WHERE {col_1} = %s FOR UPDATE
+                         ), new_elems AS (
+                            SELECT elem, min(ord) AS ord FROM jsonb_array_elements(%s::jsonb) WITH ORDINALITY AS e(elem, ord)
+                            WHERE NOT EXISTS (
+                                SELECT 1 FROM jsonb_array_elements((SELECT deck FROM target)) AS d(existing) WHERE existing = elem
+                            )
+                            GROUP BY elem
+                         ), appended AS (
+                            UPDATE {table_name}
+                            SET {col_3} = (SELECT deck FROM target) || (SELECT jsonb_agg(elem ORDER BY ord) FROM new_elems)
+                            WHERE id IN (SELECT id FROM target) AND EXISTS (SELECT 1 FROM new_elems)
+                            RETURNING id
+                         )
+                         SELECT EXISTS (SELECT 1 FROM target), EXISTS (SELECT 1 FROM appended)
+                         """).format(
+        table_name=sql.Identifier(table_name),
+        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
+        col_3=sql.Identifier(TABLE_COL_NAMES[2])
+    )
+
+def append_elems_to_user_deck_from_db(conn, user_name: str, new_elems: list, table_name="users") -> int:
+    """Appends several elements to the deck of a user inside the database, elements that are already part of the deck are skipped.
+    The user row is locked and all elements are appended by a single statement, so the whole batch is one transaction
+
+    :param conn: Connection object must not be None type
+    :type conn: psycopg2.connect
+    :param user_name: the name of the user
+    :type user_name: str
+    :param new_elems: the elements that should be added to the deck of form `[{"_id": int, "_name": str}, ...]`
+    :type new_elems: list
+    :param table_name: Name of the table, defaults to "users"
+    :type table_name: str, optional
+    :return: `0` if at least one element was new and got added, `1` if None Type connection, `2` if unusual error happens, 
+             `4` if username is not a string, `5` if username is empty, `6` if username does not start with a letter,
+             `8` if the elements are not a non empty list of dictionaries, `14` if all elements are already part of the deck, `15` if the user does not exist
+    :rtype: int
+    """
+    
+    function_name="append_elems_to_user_deck_from_db"
+
+    # check connection
+    if conn is None:
+        log_function(MODULE_NAME, function_name, 
+        f"Updating user with name {user_name} failed. Error: Connection to DB missing.", "error")
+        return 1
+
+    # check input
+    user_name_check = check_user_input(user_name, function_name)
+    if user_name_check != 0:
+        return user_name_check
+    
+    if not isinstance(new_elems, list) or len(new_elems) == 0 or not all(isinstance(elem, dict) for elem in new_elems):
+        log_function(MODULE_NAME, function_name, "new elements must be a non empty list of dictionary objects", "error")
+        return 8
+
+    try:
+        log_function(MODULE_NAME, function_name, f"Trying to append {len(new_elems)} elements to deck of user {user_name}")
+        # the row lock makes concurrent appends for the same user wait and re-read the deck they append to.
+        # duplicates inside of the batch are dropped, the order of first occurrence is kept
+        cursor = conn.cursor()
+        statements.execute(cursor, "append_elems", table_name, [user_name, json.dumps(new_elems)])
+        user_exists, appended = cursor.fetchone()
+        _commit(conn)
+        if not user_exists:
+            log_function(MODULE_NAME, function_name, f"User {user_name} not found", "warn")
+            return 15
+        if not appended:
+            log_function(MODULE_NAME, function_name, f"All elements already in deck of user {user_name}")
+            return 14
+        log_function(MODULE_NAME, function_name, f"Appended elements to deck of user {user_name} successfully")
+        return 0
+    except ps.Error as e:
+        log_function(MODULE_NAME, function_name, f"Appending elements to deck of user {user_name} failed. Error: {type(e)} | {e.__str__()}", "error")
+        _rollback(conn)
+        return 2
+
+@statements.register("update_user_points")
+def _compose_update_user_points(table_name: str):
+    return sql.SQL("""UPDATE {table_name} 
+                         SET {col_4} = %s 
+                         WHERE {col_1} = %s
+                         """).format(
+        table_name=sql.Identifier(table_name),
+        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
+        col_4=sql.Identifier(TABLE_COL_NAMES[3])
+    )
+
 def update_user_from_db_points(conn, user_name: str, points: int, table_name="users") -> int:
     """Update a user from a table inside the database
 
@@ -671,27 +1877,26 @@ def update_user_from_db_points(conn, user_name: str, points: int, table_name="us
 
     try:
         log_function(MODULE_NAME, function_name, f"Trying to update user {user_name}")
-        # create querry. get current courser of database, execute querry and commit changes
-        query_base = sql.SQL("""UPDATE {table_name} 
-                             SET {col_4} = %s 
-                             WHERE {col_1} = %s
-                             """).format(
-        table_name=sql.Identifier(table_name),
-        col_1=sql.Identifier(TABLE_COL_NAMES[0]),
-        col_4=sql.Identifier(TABLE_COL_NAMES[3])
-        )
-
         cursor = conn.cursor()
-        cursor.execute(query_base, [points, user_name])
-        conn.commit()
+        statements.execute(cursor, "update_user_points", table_name, [points, user_name])
+        _commit(conn)
         log_function(MODULE_NAME, function_name, f"Updated user {user_name} successfully")
         return 0
     except ps.Error as e:
         log_function(MODULE_NAME, function_name, f"Updating user {user_name} failed. Error: {type(e)} | {e.__str__()}", "error")
-        conn.rollback()
+        _rollback(conn)
         return 2
 
 
+@statements.register("delete_user")
+def _compose_delete_user(table_name: str):
+    return sql.SQL("""DELETE FROM {table_name}
+                         WHERE {col_1} = %s
+                         """).format(
+        table_name=sql.Identifier(table_name),
+        col_1=sql.Identifier(TABLE_COL_NAMES[0])
+    )
+
 def delete_user_from_db(conn, user_name: str, table_name="users"):
     """Delete a user from a table inside the database
 
@@ -721,22 +1926,14 @@ def delete_user_from_db(conn, user_name: str, table_name="users"):
 
     try:
         log_function(MODULE_NAME, function_name, f"Trying to delete user {user_name}")
-        # create querry. get current courser of database, execute querry and commit changes
-        query_base = sql.SQL("""DELETE FROM {table_name}
-                             WHERE {col_1} = %s
-                             """).format(
-        table_name=sql.Identifier(table_name),
-        col_1=sql.Identifier(TABLE_COL_NAMES[0])
-        )
-
         cursor = conn.cursor()
-        cursor.execute(query_base, [user_name])
-        conn.commit()
+        statements.execute(cursor, "delete_user", table_name, [user_name])
+        _commit(conn)
         log_function(MODULE_NAME, function_name, f"Deleted user {user_name} successfully")
         return 0
     except ps.Error as e:
         log_function(MODULE_NAME, function_name, f"Deleting user {user_name} failed. Error: {type(e)} | {e.__str__()}", "error")
-        conn.rollback()
+        _rollback(conn)
         return 2
 
 def close_connection(conn) -> int:
@@ -0,0 +1,121 @@
+import random
+
+MODULE_NAME="module_sampler"
+
+class AliasSampler():
+    """Draws items with replacement according to fixed weights. The alias table (Vose's method) is built once in O(n),
+    afterwards every draw takes O(1) and only one random number
+
+    :param items: the items to draw from
+    :type items: list
+    :param weights: relative weight of every item in order of items, defaults to None (uniform)
+    :type weights: list[float] | None, optional
+    :param rng: random number generator used for the draws, defaults to None (new generator seeded with seed)
+    :type rng: random.Random | None, optional
+    :param seed: seed for a new random number generator, only used if rng is None, defaults to None
+    :type seed: int | None, optional
+
+    :raises ValueError: raises if items is empty, weights do not match the items, are negative or all zero
+    """
+
+    def __init__(self, items: list, weights = None, rng = None, seed = None):
+        """constructor method
+        """
+        if len(items) == 0:
+            raise ValueError("items must not be empty")
+        if weights is None:
+            weights = [1.0] * len(items)
+        if len(weights) != len(items):
+            raise ValueError("weights must have the same length as items")
+        if any(weight < 0 for weight in weights):
+            raise ValueError("weights must not be negative")
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("at least one weight must be positive")
+
+        self._items = list(items)
+        self._rng = random.Random(seed) if rng is None else rng
+        self._build_table([weight / total for weight in weights])
+
+    def _build_table(self, probabilities: list):
+        """Builds the probability and alias table with Vose's method
+
+        :param probabilities: normalized probability of every item
+        :type probabilities: list[float]
+        """
+        n = len(probabilities)
+        scaled = [probability * n for probability in probabilities]
+        self._prob = [1.0] * n
+        self._alias = list(range(n))
+
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self._prob[less] = scaled[less]
+            self._alias[less] = more
+            # the large item gives away what the small one is missing
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # leftovers are only caused by rounding errors and keep probability 1
+
+    def get_items(self) -> list:
+        return self._items
+
+    def get_probability(self, item) -> float:
+        """Returns the probability to draw an item, computed from the alias table
+
+        :param item: the item
+        :type item: any
+        :return: probability between 0 and 1, `0` if the item is not part of the sampler
+        :rtype: float
+        """
+        n = len(self._items)
+        probability = 0.0
+        for index in range(n):
+            if self._items[index] == item:
+                probability += self._prob[index]
+            if self._items[self._alias[index]] == item and self._alias[index] != index:
+                probability += 1.0 - self._prob[index]
+        return probability / n
+
+    def draw(self):
+        """Draws one item
+
+        :return: the drawn item
+        :rtype: any
+        """
+        value = self._rng.random() * len(self._items)
+        index = int(value)
+        # the fractional part decides between the column and its alias
+        if value - index >= self._prob[index]:
+            index = self._alias[index]
+        return self._items[index]
+
+    def draw_many(self, count: int) -> list:
+        """Draws several items with replacement
+
+        :param count: number of items to draw
+        :type count: int
+        :raises ValueError: raises if count is negative
+        :return: list of the drawn items
+        :rtype: list
+        """
+        if count < 0:
+            raise ValueError("count must not be negative")
+        # local names keep the loop tight for large simulations
+        items, prob, alias, random_value, n = self._items, self._prob, self._alias, self._rng.random, len(self._items)
+        drawn = []
+        append = drawn.append
+        for _ in range(count):
+            value = random_value() * n
+            index = int(value)
+            append(items[index] if value - index < prob[index] else items[alias[index]])
+        return drawn
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -0,0 +1,160 @@
+from bisect import bisect_left
+import threading
+
+MODULE_NAME="module_search"
+
+def normalize_query(query: str) -> str:
+    """Normalizes a search query or pokemon name: lowercase and without surrounding whitespace
+
+    :param query: the search query
+    :type query: str
+    :return: the normalized query, `""` if the query is not a string
+    :rtype: str
+    """
+    if not isinstance(query, str):
+        return ""
+    return query.strip().lower()
+
+def _trigrams(name: str) -> set:
+    """Returns the trigrams of a name, padded so that short names and the first letters count as well
+    """
+    padded = f"  {name} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+def edit_distance(first: str, second: str, max_distance: int | None = None) -> int:
+    """Returns the levenshtein distance between two strings
+
+    :param first: the first string
+    :type first: str
+    :param second: the second string
+    :type second: str
+    :param max_distance: stop early once the distance is larger, defaults to None
+    :type max_distance: int | None, optional
+    :return: the distance, `max_distance + 1` if it exceeds max_distance
+    :rtype: int
+    """
+    if max_distance is not None and abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(second) + 1))
+    for row, char_first in enumerate(first, 1):
+        current = [row]
+        for column, char_second in enumerate(second, 1):
+            current.append(min(previous[column] + 1, current[column - 1] + 1, previous[column - 1] + (char_first != char_second)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class PokemonSearchIndex():
+    """Search index over pokemon names. Prefix matches come from a sorted name list (binary search),
+    fuzzy matches from a trigram index whose candidates are ranked by edit distance.
+    Everything is kept in memory, searches never touch the pokebase cache
+    """
+
+    def __init__(self):
+        """constructor method
+        """
+        self._lock = threading.Lock()
+        self._names = []        # sorted list of names
+        self._ids = {}          # name -> pokemon id
+        self._trigrams = {}     # trigram -> set of names
+
+    def build(self, pokemon_list: list) -> int:
+        """Replaces the index with the given pokemon
+
+        :param pokemon_list: list of pokemon of form `[{"pokemon_id": int, "pokemon_name": str}, ...]`, see :func:`get_pokemon_id_names_by_generation`
+        :type pokemon_list: list
+        :return: number of indexed names
+        :rtype: int
+        """
+        ids = {normalize_query(pokemon["pokemon_name"]): pokemon["pokemon_id"] for pokemon in pokemon_list}
+        ids.pop("", None)
+        trigrams = {}
+        for name in ids:
+            for trigram in _trigrams(name):
+                trigrams.setdefault(trigram, set()).add(name)
+        with self._lock:
+            self._names = sorted(ids)
+            self._ids = ids
+            self._trigrams = trigrams
+        return len(ids)
+
+    def _result(self, name: str) -> dict:
+        return {"pokemon_id": self._ids[name], "pokemon_name": name}
+
+    def prefix(self, query: str, limit = 10) -> list:
+        """Returns the pokemon whose name starts with the query, in alphabetical order
+
+        :param query: start of the name
+        :type query: str
+        :param limit: maximum number of results, defaults to 10
+        :type limit: int, optional
+        :return: list of pokemon of form `[{"pokemon_id": int, "pokemon_name": str}, ...]`
+        :rtype: list
+        """
+        query = normalize_query(query)
+        if query == "":
+            return []
+        with self._lock:
+            results = []
+            index = bisect_left(self._names, query)
+            while index < len(self._names) and len(results) < limit and self._names[index].startswith(query):
+                results.append(self._result(self._names[index]))
+                index += 1
+            return results
+
+    def fuzzy(self, query: str, limit = 10, max_distance = None) -> list:
+        """Returns the pokemon whose name is similar to the query, closest first
+
+        :param query: the (misspelled) name
+        :type query: str
+        :param limit: maximum number of results, defaults to 10
+        :type limit: int, optional
+        :param max_distance: maximum edit distance, defaults to None (a third of the query length, at least 1)
+        :type max_distance: int | None, optional
+        :return: list of pokemon of form `[{"pokemon_id": int, "pokemon_name": str}, ...]`
+        :rtype: list
+        """
+        query = normalize_query(query)
+        if query == "":
+            return []
+        if max_distance is None:
+            max_distance = max(1, len(query) // 3)
+        with self._lock:
+            # names sharing trigrams with the query are the only candidates
+            shared = {}
+            for trigram in _trigrams(query):
+                for name in self._trigrams.get(trigram, ()):
+                    shared[name] = shared.get(name, 0) + 1
+            ranked = []
+            for name, count in shared.items():
+                distance = edit_distance(query, name, max_distance)
+                if distance <= max_distance:
+                    ranked.append((distance, -count, name))
+            ranked.sort()
+            return [self._result(name) for _, _, name in ranked[:limit]]
+
+    def search(self, query: str, limit = 10) -> list:
+        """Returns prefix matches first and fills up with fuzzy matches
+
+        :param query: the search query
+        :type query: str
+        :param limit: maximum number of results, defaults to 10
+        :type limit: int, optional
+        :return: list of pokemon of form `[{"pokemon_id": int, "pokemon_name": str}, ...]`
+        :rtype: list
+        """
+        results = self.prefix(query, limit)
+        if len(results) < limit:
+            found = {result["pokemon_name"] for result in results}
+            for result in self.fuzzy(query, limit):
+                if len(results) >= limit:
+                    break
+                if result["pokemon_name"] not in found:
+                    results.append(result)
+        return results
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._names)
@@ -0,0 +1,110 @@
+from concurrent.futures import Future
+import asyncio
+import functools
+import threading
+
+MODULE_NAME="module_singleflight"
+
+class SingleFlight():
+    """Coalesces concurrent calls for the same key: the first caller runs the function,
+    every caller that arrives while it is running waits for and shares its result or exception.
+    Works across threads (:meth:`do`) and asyncio tasks (:meth:`do_async`), the result is not kept once the call finished
+
+    :param executor: executor that runs the calls started by :meth:`do_async`, defaults to None (default executor of the loop)
+    :type executor: concurrent.futures.Executor | None, optional
+    """
+
+    def __init__(self, executor = None):
+        """constructor method
+        """
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._calls = {}    # key -> Future of the running call
+        self._started = 0
+        self._shared = 0
+
+    def _join(self, key):
+        """Returns the future of the running call for a key, registers a new one if there is none
+
+        :return: `(future, True)` if the caller has to run the function, `(future, False)` if it only waits
+        :rtype: tuple
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._shared += 1
+                return future, False
+            future = Future()
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            self._started += 1
+            return future, True
+
+    def _run(self, key, future: Future, func, args, kwargs):
+        """Runs the function and hands its result or exception to all waiters
+        """
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future)
+            future.set_exception(e)
+        else:
+            self._finish(key, future)
+            future.set_result(result)
+
+    def _finish(self, key, future: Future):
+        # callers that arrive after this point start a new call
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do(self, key, func, *args, timeout: float | None = None, **kwargs):
+        """Calls `func(*args, **kwargs)` unless a call for the same key is already running, in that case its result is shared
+
+        :param key: identifies equal calls, for example `("pokemon", 25)`
+        :type key: hashable
+        :param func: the function to call
+        :type func: callable
+        :param timeout: seconds to wait for a call of another caller, defaults to None (wait forever)
+        :type timeout: float | None, optional
+        :raises TimeoutError: raises if the call of another caller did not finish in time
+        :return: the result of the function, exceptions of the function are raised to every caller
+        :rtype: any
+        """
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, func, args, kwargs)
+        return future.result(timeout)
+
+    async def do_async(self, key, func, *args, timeout: float | None = None, **kwargs):
+        """Same as :meth:`do` for asyncio tasks. The function runs on the executor so the event loop is not blocked
+
+        :param key: identifies equal calls, shared with calls of :meth:`do`
+        :type key: hashable
+        :param func: the blocking function to call
+        :type func: callable
+        :param timeout: seconds to wait for the call, defaults to None (wait forever)
+        :type timeout: float | None, optional
+        :raises TimeoutError: raises if the call did not finish in time, the call itself keeps running for the other callers
+        :return: the result of the function, exceptions of the function are raised to every caller
+        :rtype: any
+        """
+        future, leader = self._join(key)
+        if leader:
+            loop = asyncio.get_running_loop()
+            loop.run_in_executor(self._executor, functools.partial(self._run, key, future, func, args, kwargs))
+        # shield so a timeout or cancelled task does not cancel the call of the other callers
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+
+    def get_stats(self) -> dict:
+        """Returns the number of running, started and shared calls
+
+        :return: `{"running": int, "started": int, "shared": int}`
+        :rtype: dict
+        """
+        with self._lock:
+            return {"running": len(self._calls), "started": self._started, "shared": self._shared}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,156 @@
+from collections import namedtuple
+import mmap
+import os
+import struct
+import threading
+
+MODULE_NAME="module_store"
+
+# file layout: header, offset of every id (0 = missing), fixed size records
+STORE_MAGIC = b"PKST"
+STORE_VERSION = 1
+HEADER = struct.Struct("<4sHHII")       # magic, version, record size, record count, max id
+OFFSET = struct.Struct("<I")
+RECORD = struct.Struct("<HBB6H24s16s48s")  # id, flags, generation id, stats, name, generation name, sprite path
+
+FLAG_LEGENDARY = 1
+FLAG_MYTHICAL = 2
+
+# order of the stats inside of a record, same order as the api returns them
+STAT_NAMES = ("hp", "attack", "defense", "special-attack", "special-defense", "speed")
+
+StoreRecord = namedtuple("StoreRecord", ["id", "name", "stats", "is_legendary", "is_mythical", "generation_id", "generation_name", "sprite_path"])
+
+def _encode(value: str, size: int) -> bytes:
+    encoded = value.encode("utf-8")
+    if len(encoded) > size:
+        raise ValueError(f"{value} is longer than {size} bytes")
+    return encoded
+
+def _decode(value: bytes) -> str:
+    return value.rstrip(b"\0").decode("utf-8")
+
+def _pack(record) -> bytes:
+    if record.id < 1 or len(record.stats) != len(STAT_NAMES):
+        raise ValueError(f"invalid record for id {record.id}")
+    flags = (FLAG_LEGENDARY if record.is_legendary else 0) | (FLAG_MYTHICAL if record.is_mythical else 0)
+    try:
+        return RECORD.pack(record.id, flags, record.generation_id, *record.stats, _encode(record.name, 24),
+                           _encode(record.generation_name, 16), _encode(record.sprite_path, 48))
+    except struct.error as e:
+        raise ValueError(f"invalid record for id {record.id}: {e}") from e
+
+def check_record(record) -> str | None:
+    """Checks if a record fits into the fixed layout of the store
+
+    :param record: the record
+    :type record: StoreRecord
+    :return: `None` if the record fits, otherwise the reason why not
+    :rtype: str | None
+    """
+    try:
+        _pack(record)
+        return None
+    except ValueError as e:
+        return e.__str__()
+
+def write_store(file_path: str, records: list) -> int:
+    """Writes records into a new store file, the file is replaced atomically so open stores keep their old version
+
+    :param file_path: path of the store
+    :type file_path: str
+    :param records: list of :class:`StoreRecord`, stats in order of STAT_NAMES
+    :type records: list
+    :raises ValueError: raises if a record does not fit into the fixed layout, see :func:`check_record`
+    :return: number of written records
+    :rtype: int
+    """
+    records = sorted(records, key=lambda record: record.id)
+    max_id = records[-1].id if records else 0
+    data_start = HEADER.size + OFFSET.size * (max_id + 1)
+    offsets = [0] * (max_id + 1)
+    packed = []
+    for position, record in enumerate(records):
+        offsets[record.id] = data_start + position * RECORD.size
+        packed.append(_pack(record))
+
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(STORE_MAGIC, STORE_VERSION, RECORD.size, len(records), max_id))
+        file.write(struct.pack(f"<{max_id + 1}I", *offsets))
+        file.write(b"".join(packed))
+    os.replace(tmp_path, file_path)
+    return len(records)
+
+
+class PokemonStore():
+    """Read only store of pokemon records with a fixed layout. The file is memory mapped, so lookups only unpack one record
+    and the pages are shared by all processes that open the same file. The file is opened on first use and reopened on a miss
+    if it was replaced since
+
+    :param file_path: path of the store
+    :type file_path: str
+    """
+
+    def __init__(self, file_path: str):
+        """constructor method
+        """
+        self._file_path = file_path
+        self._lock = threading.Lock()
+        self._map = None    # (mmap, max id) of the opened file
+        self._version = None
+
+    def _open(self):
+        """Maps the file if it changed since it was opened
+        """
+        try:
+            stat = os.stat(self._file_path)
+        except OSError:
+            self._map, self._version = None, None
+            return
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if version == self._version:
+            return
+        with open(self._file_path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, store_version, record_size, _, max_id = HEADER.unpack_from(mapped, 0)
+        if magic != STORE_MAGIC or store_version != STORE_VERSION or record_size != RECORD.size:
+            raise ValueError(f"{self._file_path} is not a pokemon store of version {STORE_VERSION}")
+        self._map, self._version = (mapped, max_id), version
+
+    def _lookup(self, mapped, poke_id: int):
+        data, max_id = mapped
+        if poke_id < 1 or poke_id > max_id:
+            return None
+        offset = OFFSET.unpack_from(data, HEADER.size + OFFSET.size * poke_id)[0]
+        if offset == 0:
+            return None
+        fields = RECORD.unpack_from(data, offset)
+        return StoreRecord(fields[0], _decode(fields[9]), fields[3:9], bool(fields[1] & FLAG_LEGENDARY), bool(fields[1] & FLAG_MYTHICAL),
+                           fields[2], _decode(fields[10]), _decode(fields[11]))
+
+    def get(self, poke_id: int):
+        """Returns the record of a pokemon
+
+        :param poke_id: id of the pokemon
+        :type poke_id: int
+        :raises ValueError: raises if the file is not a store of this version
+        :return: the record, `None` if the pokemon or the store does not exist
+        :rtype: StoreRecord | None
+        """
+        mapped = self._map
+        record = None if mapped is None else self._lookup(mapped, poke_id)
+        if record is None:
+            # the store could have been rebuilt in the meantime
+            with self._lock:
+                self._open()
+                mapped = self._map
+            record = None if mapped is None else self._lookup(mapped, poke_id)
+        return record
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._open()
+            if self._map is None:
+                return 0
+            return HEADER.unpack_from(self._map[0], 0)[3]
@@ -1,13 +1,15 @@
 // pokemon search function
 function onSearch() {
     $("#search_btn").prop("disabled", true);
+    $("#search_suggestions").html("");
     let loading_elem = $("#loading");
     loading_elem.text("Loading");
     let pokemon_elem = $("#poke_elem");
     $("#poke_elem").hide();
     const serach_value = $("#search_input").val();
-    fetch("/Pokemon_Name/" + serach_value, {
-        method: "POST"
+    // get requests are cached by the browser and proxies
+    fetch("/Pokemon_Name/" + encodeURIComponent(serach_value), {
+        method: "GET"
     })
     .then(response => response.json())
     .then(data => {
@@ -31,11 +33,45 @@ function onSearch() {
         }else {
             loading_elem.text("Pokemon not found!");
             pokemon_elem.hide();
+            // offer similar names
+            update_search_suggestions();
         }
         $("#search_btn").prop("disabled", false);
     });
 }
 
+// typeahead for the search bar
+let search_timeout = null;
+
+function onSearchInput() {
+    clearTimeout(search_timeout);
+    search_timeout = setTimeout(update_search_suggestions, 150);
+}
+
+function update_search_suggestions() {
+    const query = $("#search_input").val().trim();
+    if (query == "") {
+        $("#search_suggestions").html("");
+        return;
+    }
+    fetch("/Pokemon_Search/" + encodeURIComponent(query) + "?limit=8")
+    .then(response => response.json())
+    .then(data => {
+        let html_str = "";
+        if (data.hasOwnProperty("pokemon")) {
+            for (let pokemon of data["pokemon"]) {
+                html_str += `<li class="list-group-item list-group-item-action" onclick="select_search_suggestion('${pokemon["pokemon_name"]}')">${pokemon["pokemon_name"]}</li>` + "\n";
+            }
+        }
+        $("#search_suggestions").html(html_str);
+    });
+}
+
+function select_search_suggestion(pokemon_name) {
+    $("#search_input").val(pokemon_name);
+    onSearch();
+}
+
 // login function
 function send() {
     $("#login_btn").prop("disabled", true);
@@ -253,6 +289,28 @@ function authenticate_content() {
 }
 
 // functions for deck!!!
+// pokemon of the users deck by id, loaded with one batch request
+let deck_pokemon = {};
+
+function load_deck_pokemon(deck_ids) {
+    return fetch("/Pokemon_Batch", { 
+        method: "POST",
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({pokemon: deck_ids.map(value => value["_id"])})
+    })
+    .then(response => response.json())
+    .then(data => {
+            if (data.hasOwnProperty("pokemon")) {
+                for (let pokemon of data["pokemon"]) {
+                    if (pokemon.hasOwnProperty("pokemon_id")) deck_pokemon[pokemon["pokemon_id"]] = pokemon;
+                }
+            }
+        }
+    )
+}
+
 function create_dropdown_element_for_user(selection_id, deck_ids) {
     let html_str = "";
     for(let value of deck_ids) {
@@ -276,15 +334,21 @@ function add_click_event_to_selection(selection_id) {
       const selectedValue = item.getAttribute('data-value');
       dropdownButton.textContent = selectedValue.split("-")[0];
       const selection_html_id = "#selection-" + selection_id;
-      fetch("/Pokemon_Id/" + selectedValue.split("-")[1], { 
-            method: "POST",
+      const show_pokemon = data => {
+          const html_str = `<img src="/static/${data["pokemon_sprite_path"]}">Points: <span id="poke-points-${selection_id}">${data["pokemon_points"]}</span>`
+          $(selection_html_id).html(html_str);
+      };
+      const poke_id = selectedValue.split("-")[1];
+      // pokemon of the deck are preloaded by create_deck_page
+      if (deck_pokemon.hasOwnProperty(poke_id)) {
+          show_pokemon(deck_pokemon[poke_id]);
+          return;
+      }
+      fetch("/Pokemon_Id/" + poke_id, { 
+            method: "GET",
         })
         .then(response => response.json())
-        .then(data => {
-                const html_str = `<img src="/static/${data["pokemon_sprite_path"]}">Points: <span id="poke-points-${selection_id}">${data["pokemon_points"]}</span>`
-                $(selection_html_id).html(html_str);
-            }
-        )
+        .then(show_pokemon)
     });
   });
 }
@@ -351,6 +415,7 @@ function create_deck_page() {
         .then(data => {
                 if (data.hasOwnProperty("user_name")) {
                     console.log(data["deck_ids"]);
+                    load_deck_pokemon(data["deck_ids"]);
                     for(let i = 1; i < 7; i++) {
                         create_dropdown_element_for_user(`${i}`, data["deck_ids"]);
                         add_click_event_to_selection(`${i}`);
@@ -362,21 +427,37 @@ function create_deck_page() {
 }
 
 function get_random_pokemon_by_gen_id(generation_id) {
+    let token = window.sessionStorage.token
+    if (typeof token == "undefined" || token == "null") location.href = "/unauth";
+    let current_token = JSON.parse(token);
+    if (typeof current_token == "undefined" || current_token == "null") {
+        location.href = "/unauth";
+        return;
+    }
+    const headers = { 'Authorization': current_token["token_type"] + " " + current_token["access_token"] }; // auth header with bearer token
     const gen_btns = $(".gen_selection");
     gen_btns.each(function () {
       $(this).prop('disabled', true);
     });
     $("#loading_pack").text("Loading Pokemon")
-    fetch("/Pokemon_Rand/" + generation_id, {
-        method: "POST"
+    // draws the pokemon and adds it to the deck of the user in one request
+    fetch("/open_pack/" + generation_id + "?size=1", {
+        method: "POST",
+        headers: headers
     })
     .then(response => response.json())
     .then(data => {
-            if (data.hasOwnProperty("pokemon_id")) {
-                // add pokemon to user (update_user)
+            if (data.hasOwnProperty("pokemon") && data["pokemon"].length > 0) {
                 let result_field = $("#poke_result")
-                result_field.html(`<span>${data["pokemon_name"]}: ${data["pokemon_points"]} Points</span><img src="/static/${data["pokemon_sprite_path"]}">`)
-                add_rand_poke_to_user({_id: data["pokemon_id"], _name: data["pokemon_name"]});
+                let html_str = "";
+                for (let pokemon of data["pokemon"]) {
+                    html_str += `<span>${pokemon["pokemon_name"]}: ${pokemon["pokemon_points"]} Points</span><img src="/static/${pokemon["pokemon_sprite_path"]}">`;
+                }
+                result_field.html(html_str)
+            }
+            if (data.hasOwnProperty("details")) {
+                $("#modalMessage").text(data["details"])
+                $("#popupModal").modal()
             }
             gen_btns.each(function () {
             $(this).prop('disabled', false);
@@ -386,49 +467,9 @@ function get_random_pokemon_by_gen_id(generation_id) {
     
 }
 
-function add_rand_poke_to_user(new_elem) {
-    let token = window.sessionStorage.token
-    if (typeof token == "undefined" || token == "null") location.href = "/unauth";
-    let current_token = JSON.parse(token);
-    if (typeof current_token != "undefined" && current_token != "null") {
-        const headers = { 'Authorization': current_token["token_type"] + " " + current_token["access_token"] }; // auth header with bearer token
-        fetch("/get_user", { 
-            method: "POST",
-            headers: headers 
-        })
-        .then(response => response.json())
-        .then(data => {
-                if (data.hasOwnProperty("user_name")) {
-                    const user_name = data["user_name"]
-                    update_user(user_name, new_elem);
-                }else {
-                    $("#modalMessage").text("Could not get user. Adding Pokemon to deck failed!")
-                    $("#popupModal").modal()
-                }
-            }
-        )
-    }
-}
-
-function update_user(user_name, new_elem) {
-    fetch("/add_to_deck", { 
-        method: "POST",
-        headers: {
-            'Content-Type': 'application/json'
-        },
-        body: JSON.stringify({username: user_name, new_elem: new_elem})
-    })
-    .then(response => response.json())
-    .then(data => {
-            $("#modalMessage").text(data["details"])
-            $("#popupModal").modal()
-        }
-    )
-}
-
 function update_leaderboard() {
     $("#update_lb_btn").prop("disabled", true);
-    fetch("/get_users", { 
+    fetch("/get_leaderboard?limit=10", { 
         method: "POST"
     })
     .then(response => response.json())
@@ -436,7 +477,6 @@ function update_leaderboard() {
             console.log(data);
             if (data.hasOwnProperty("users")) {
                 let l = data["users"].length;
-                if (l > 10) l = 10;
                 let html_str = ""
                 for (let i = 0; i < l; i++) {
                     html_str += `<li>${data["users"][i]["user_name"]} : ${data["users"][i]["points"]}</li> \n`;
@@ -448,4 +488,24 @@ function update_leaderboard() {
             $("#update_lb_btn").prop("disabled", false);
         }
     )
-}
\ No newline at end of file
+}
+
+function update_user_rank() {
+    let token = window.sessionStorage.token
+    if (typeof token == "undefined" || token == "null") return;
+    let current_token = JSON.parse(token);
+    if (typeof current_token != "undefined" && current_token != "null") {
+        const headers = { 'Authorization': current_token["token_type"] + " " + current_token["access_token"] }; // auth header with bearer token
+        fetch("/get_rank", { 
+            method: "POST",
+            headers: headers 
+        })
+        .then(response => response.json())
+        .then(data => {
+                if (data.hasOwnProperty("rank") && data["rank"] > 0) {
+                    $("#user_rank").text(`Your rank: ${data["rank"]} (${data["points"]} points)`);
+                }
+            }
+        )
+    }
+}
@@ -1,5 +1,6 @@
 from locust import HttpUser, between, task
 import os
+import time
 
 from api.modules.module_postgresql import *
 
@@ -9,8 +10,22 @@ os.environ['TEST'] = '2'
 class WebsiteUser(HttpUser):
     wait_time = between(5, 15)
     
+    # logins retried after a 429 before the user runs without token
+    login_retries = 3
+
     def on_start(self):
-        self.client.post("/token", data={"username":"testuser", "password":"Asdf1234"})
+        self.auth_header = None
+        for _ in range(self.login_retries + 1):
+            with self.client.post("/token", data={"username":"testuser", "password":"Asdf1234"}, catch_response=True) as response:
+                if response.ok:
+                    token = response.json()
+                    self.auth_header = {"Authorization": f"{token['token_type']} {token['access_token']}"}
+                    return
+                response.failure(f"login failed with status {response.status_code}")
+                if response.status_code != 429:
+                    return
+                retry_after = response.headers.get("Retry-After", "1")
+            time.sleep(float(retry_after) if retry_after.isdigit() else 1)
     
     # ===== PAGES =====
 
@@ -38,26 +53,41 @@ class WebsiteUser(HttpUser):
 
     @task
     def get_pokemon(self):
-        self.client.post("/Pokemon_Id/1")
+        self.client.get("/Pokemon_Id/1")
 
     @task
     def get_pokemon_by_name(self):
-        self.client.post("/Pokemon_Name/ditto")
+        self.client.get("/Pokemon_Name/ditto")
 
     @task
     def get_pokemon_rand(self):
         self.client.post("/Pokemon_Rand/2")    
 
+    @task
+    def get_pokemon_batch(self):
+        self.client.post("/Pokemon_Batch", json={"pokemon": [1, 4, 7, "ditto", 132]})
+
     # ===== USER =====
 
     @task
     def users(self):
         self.client.post("/get_users")
+
+    @task
+    def get_leaderboard(self):
+        self.client.post("/get_leaderboard?limit=10")
     
     @task
     def add_to_deck(self):
         self.client.post("/add_to_deck", json={"username":"testuser", "new_elem":{"_id": 132, "_name": "ditto"}})
 
+    @task
+    def open_pack(self):
+        # needs a token, skipped if the login failed
+        if self.auth_header is None:
+            return
+        self.client.post("/open_pack/1?size=5&weighted=true", headers=self.auth_header)
+
     @task
     def update_points(self):
         self.client.post("/update_points", json={"username":"testuser", "points_elem":244})
@@ -0,0 +1,107 @@
+from api.modules import module_bundle
+from api.modules.module_bundle import *
+from api.modules.module_pokeapi import CACHE_DIR, NameIdIndex, load_cached_name_id_list
+
+import io
+import pytest
+import requests
+import tarfile
+
+GENERATION = {"id": 1, "name": "generation-i", "pokemon_species": [
+    {"name": "bulbasaur", "url": "https://pokeapi.co/api/v2/pokemon-species/1/"},
+    {"name": "ditto", "url": "https://pokeapi.co/api/v2/pokemon-species/132/"}
+]}
+
+class ResponseMock():
+    def __init__(self, url: str, status_code: int = 200):
+        self.url = url
+        self.status_code = status_code
+        self.content = b"\x89PNG" + url.encode()
+
+    def raise_for_status(self):
+        if self.status_code != 200:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+    def json(self):
+        if "/generation/" in self.url:
+            return GENERATION
+        return {"id": int(self.url.split("/")[-2]), "url": self.url}
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    # own pokebase cache and name id index for every test
+    pb.cache.set_cache(str(tmp_path / "static" / ".cache"))
+    monkeypatch.setattr(module_bundle, "FILE_CACHE_NAME", str(tmp_path / "cache_ids.json"))
+    monkeypatch.setattr(module_bundle, "name_id_index", NameIdIndex(str(tmp_path / "cache_ids.json")))
+    yield tmp_path
+    pb.cache.set_cache(CACHE_DIR)
+
+def test_warm_cache(cache_dir, monkeypatch):
+    urls = []
+    def get(url, timeout):
+        urls.append(url)
+        # the first request for ditto fails with a server error and is retried
+        if url.endswith("/pokemon/132/") and urls.count(url) == 1:
+            return ResponseMock(url, 503)
+        # sprites of bulbasaur do not exist
+        if url.endswith("/1.png"):
+            return ResponseMock(url, 404)
+        return ResponseMock(url)
+
+    monkeypatch.setattr(requests, "get", get)
+    assert warm_cache((1,), workers=2, retries=2, backoff=0) == {"fetched": 6, "cached": 0, "failed": 1}
+    assert pb.cache.load("pokemon", 132)["id"] == 132
+    assert pb.cache.load("pokemon-species", 1)["id"] == 1
+    assert os.path.exists(pb.cache.get_sprite_path("pokemon", 132))
+    # 404 is not retried
+    assert len([url for url in urls if url.endswith("/1.png")]) == 1
+    assert load_cached_name_id_list(module_bundle.FILE_CACHE_NAME) == {"bulbasaur": 1, "ditto": 132}
+    # only missing resources are fetched again
+    urls.clear()
+    assert warm_cache((1,), workers=2, retries=0, backoff=0) == {"fetched": 0, "cached": 6, "failed": 1}
+    assert len(urls) == 1
+
+def test_cache_bundle(cache_dir, monkeypatch):
+    monkeypatch.setattr(requests, "get", lambda url, timeout: ResponseMock(url))
+    warm_cache((1,), workers=2, retries=0, backoff=0)
+    bundle_path = str(cache_dir / "bundle.tar.gz")
+    manifest = create_cache_bundle(bundle_path, "test")
+    assert manifest["version"] == "test"
+    assert manifest["entries"] == 5
+    assert manifest["sprites"] == 2
+
+    # load into an empty cache
+    pb.cache.set_cache(str(cache_dir / "other" / ".cache"))
+    monkeypatch.setattr(module_bundle, "name_id_index", NameIdIndex(str(cache_dir / "other_ids.json")))
+    assert load_cache_bundle(bundle_path) == 0
+    assert pb.cache.load("generation", 1) == GENERATION
+    assert pb.cache.load_sprite("pokemon", 132)["img_data"].startswith(b"\x89PNG")
+    assert load_cached_name_id_list(str(cache_dir / "other_ids.json")) == {"bulbasaur": 1, "ditto": 132}
+    # already loaded
+    assert load_cache_bundle(bundle_path) == 1
+    # missing bundle
+    assert load_cache_bundle(str(cache_dir / "missing.tar.gz")) == 2
+
+def test_cache_bundle_invalid(cache_dir, monkeypatch):
+    monkeypatch.setattr(requests, "get", lambda url, timeout: ResponseMock(url))
+    warm_cache((1,), workers=2, retries=0, backoff=0)
+    bundle_path = str(cache_dir / "bundle.tar.gz")
+    create_cache_bundle(bundle_path)
+    # replace a sprite without updating the manifest
+    tampered_path = str(cache_dir / "tampered.tar.gz")
+    with tarfile.open(bundle_path, "r:gz") as tar, tarfile.open(tampered_path, "w:gz") as tampered:
+        for member in tar.getmembers():
+            data = tar.extractfile(member).read()
+            if member.name.startswith("sprite/"):
+                data = b"tampered"
+                member.size = len(data)
+            tampered.addfile(member, io.BytesIO(data))
+    pb.cache.set_cache(str(cache_dir / "other" / ".cache"))
+    assert load_cache_bundle(tampered_path) == 3
+    # nothing was written
+    with pytest.raises(KeyError) as e_info:
+        pb.cache.load("generation", 1)
+    # not a bundle at all
+    with open(tampered_path, "wb") as file:
+        file.write(b"not a bundle")
+    assert load_cache_bundle(tampered_path) == 3
@@ -0,0 +1,69 @@
+from api.modules.module_cache import *
+
+import pytest
+import time
+
+def test_ttl_cache():
+    with pytest.raises(ValueError) as e_info:
+        TTLCache(max_size=0)
+    cache = TTLCache(max_size=2, ttl=60)
+    assert cache.get("a") is None
+    assert cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert "a" in cache
+    # ttl is capped at the ttl of the cache and must be positive
+    assert not cache.set("b", 2, ttl=0)
+    assert cache.set("b", 2, ttl=1000)
+    # least recently used entry gets evicted
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.delete("a")
+    assert not cache.delete("a")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get_stats() == {"size": 0, "hits": 3, "misses": 1}
+
+def test_ttl_cache_expire():
+    cache = TTLCache(ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a", "expired") == "expired"
+    assert len(cache) == 0
+
+def test_token_cache():
+    cache = TokenCache(max_size=2, ttl=60)
+    # expired tokens are not cached
+    assert not cache.set_user("token0", "ash", {}, expires=time.time() - 1)
+    assert cache.set_user("token1", "ash", {"user_name": "ash"}, expires=time.time() + 10)
+    assert cache.set_user("token2", "ash", {"user_name": "ash"})
+    assert cache.get("token1") == {"user_name": "ash"}
+    # invalidation removes all tokens of the user
+    generation = cache.get_generation()
+    assert cache.invalidate_user("ash") == 2
+    assert cache.get("token1") is None
+    # users loaded before the invalidation are not cached
+    assert not cache.set_user("token1", "ash", {"user_name": "ash"}, generation=generation)
+    cache.set_user("token1", "ash", {"user_name": "ash"})
+    cache.set_user("token2", "misty", {"user_name": "misty"})
+    cache.set_user("token3", "brock", {"user_name": "brock"})
+    assert cache.invalidate_user("ash") == 0
+    assert cache.invalidate_user(None) == 2
+    assert len(cache) == 0
+
+def test_response_cache():
+    cache = ResponseCache(max_size=2, ttl=60)
+    entry = cache.put(132, b'{"pokemon_id":132}', ("ditto",))
+    assert entry.etag == ResponseCache.make_etag(b'{"pokemon_id":132}')
+    assert entry.etag.startswith('"') and entry.etag.endswith('"')
+    assert cache.get(132) == entry
+    assert cache.get_by_name("ditto") == entry
+    assert cache.get_by_name("mew") is None
+    # names leave the cache together with their response
+    cache.put(1, b"1", ("bulbasaur",))
+    cache.put(2, b"2")
+    assert cache.get_by_name("ditto") is None
+    assert cache.get_by_name("bulbasaur").body == b"1"
+    cache.clear()
+    assert cache.get_by_name("bulbasaur") is None
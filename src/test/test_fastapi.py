@@ -26,6 +26,8 @@ db_settings = {
 os.environ["TEST"] = "1"
 
 import api
+from api.modules.module_postgresql import PoolTimeoutError, DatabaseConnectionError
+import psycopg2
 
 client = TestClient(api.app)
 
@@ -83,10 +85,89 @@ def test_token():
     print(response.content)
     assert response.content == b'{"detail":"Not authenticated"}'
 
+def test_token_login_limit():
+    # a login while the limit of the user is reached is rejected before the password is hashed
+    limiter = api.main.login_limiter
+    while limiter.acquire("testuser"):
+        pass
+    response = client.post("/token", data={'username': "testuser", 'password': "Asdf1234"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    while limiter.get_stats()["running"] > 0:
+        limiter.release("testuser")
+    response = client.post("/token", data={'username': "testuser", 'password': "Asdf1234"})
+    assert response.status_code == 200
+    # wrong passwords are still unauthorized
+    response = client.post("/token", data={'username': "testuser", 'password': "Asdf4321"})
+    assert response.status_code == 401
+
 def test_get_users():
     response = client.post("/get_users")
     assert len(json.loads(response.content)["users"]) == 1
 
+def test_export_users():
+    response = client.post("/token", data={'username': "testuser", 'password': "Asdf1234"})
+    current_token = json.loads(response.content)
+    headers = {'Authorization': current_token["token_type"] + " " + current_token["access_token"] }
+    # only admins may export
+    response = client.get("/admin/export_users")
+    assert response.status_code == 401
+    response = client.get("/admin/export_users", headers=headers)
+    assert response.status_code == 403
+    api.main.ADMIN_USERS.add("testuser")
+    try:
+        response = client.get("/admin/export_users?itersize=1", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        users = [json.loads(line) for line in response.text.splitlines()]
+        assert users == sorted(json.loads(client.post("/get_users").content)["users"], key=lambda user: user["user_id"])
+        response = client.get("/admin/export_users?itersize=0", headers=headers)
+        assert response.status_code == 422
+    finally:
+        api.main.ADMIN_USERS.discard("testuser")
+
+def test_database_unavailable():
+    # a saturated pool or an unreachable database answers with 503 instead of 500
+    async def pool_timeout():
+        raise PoolTimeoutError("No free database connection after 5 seconds")
+    async def connection_error():
+        raise DatabaseConnectionError("Could not connect do Database")
+    async def connection_lost():
+        raise psycopg2.OperationalError("server closed the connection unexpectedly")
+    for failure in (pool_timeout, connection_error, connection_lost):
+        api.main.db.get_users = failure
+        try:
+            response = client.post("/get_users")
+        finally:
+            del api.main.db.get_users
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == str(api.main.DB_RETRY_AFTER)
+    # other connection errors, e.g. of the PokeAPI, are no database failures
+    async def reset_error():
+        raise ConnectionResetError("Connection reset by peer")
+    api.main.db.get_users = reset_error
+    try:
+        with pytest.raises(ConnectionResetError) as e_info:
+            client.post("/get_users")
+    finally:
+        del api.main.db.get_users
+    assert client.post("/get_users").status_code == 200
+
+def test_get_leaderboard():
+    response = client.post("/get_leaderboard?limit=5")
+    assert json.loads(response.content)["users"][0]["user_name"] == "testuser"
+    # limit out of range and incomplete keyset
+    response = client.post("/get_leaderboard?limit=0")
+    assert response.status_code == 422
+    response = client.post("/get_leaderboard?after_points=1")
+    assert response.status_code == 422
+    # rank of the user of the token
+    response = client.post("/token", data={'username': "testuser", 'password': "Asdf1234"})
+    current_token = json.loads(response.content)
+    headers = {'Authorization': current_token["token_type"] + " " + current_token["access_token"] }
+    response = client.post("/get_rank", headers=headers)
+    assert json.loads(response.content)["rank"] == 1
+
 def test_pages():
     response = client.get("/leaderboard")
     assert response.status_code == 200
@@ -112,6 +193,61 @@ def test_get_pokemon():
     print(response.content)
     assert json.loads(response.content)["pokemon_name"] == "ditto"
 
+def test_pokemon_response_cache():
+    ditto = api.main.PokemonObj.from_dict({
+        'pokemon_id': 132, 
+        'pokemon_name': 'ditto', 
+        'pokemon_generation': 'generation-i', 
+        'pokemon_rarity': 'normal', 
+        'pokemon_points': 48, 
+        'pokemon_stats': [{'stat_name': 'hp', 'stat_value': 48}], 
+        'pokemon_sprite_path': '/static/.cache/sprite/pokemon/132.png'})
+    api.main.response_cache.clear()
+    entry = api.main.cache_pokemon_response(ditto)
+    response = client.post("/Pokemon_Id/132")
+    assert response.content == ditto.to_json()
+    assert response.headers["etag"] == entry.etag
+    assert "max-age" in response.headers["cache-control"]
+    # the client already has this version
+    response = client.post("/Pokemon_Id/132", headers={"If-None-Match": f'"other", W/{entry.etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    # names are aliases of the id
+    response = client.post("/Pokemon_Name/Ditto", headers={"If-None-Match": entry.etag})
+    assert response.status_code == 304
+    # get requests are cacheable and validated against the catalog
+    api.main.catalog._set_table([ditto], 1700000000)
+    response = client.get("/Pokemon_Id/132")
+    assert response.content == ditto.to_json()
+    assert response.headers["last-modified"] == "Tue, 14 Nov 2023 22:13:20 GMT"
+    response = client.get("/Pokemon_Name/ditto", headers={"If-Modified-Since": "Tue, 14 Nov 2023 22:13:20 GMT"})
+    assert response.status_code == 304
+    response = client.get("/Pokemon_Name/ditto", headers={"If-Modified-Since": "Tue, 14 Nov 2023 22:13:19 GMT"})
+    assert response.status_code == 200
+    # if-none-match takes precedence
+    response = client.get("/Pokemon_Id/132", headers={"If-None-Match": '"other"', "If-Modified-Since": "Tue, 14 Nov 2023 22:13:20 GMT"})
+    assert response.status_code == 200
+    api.main.catalog._set_table([])
+    api.main.response_cache.clear()
+
+def test_pokemon_batch():
+    response = client.post("/Pokemon_Batch", json={"pokemon": [132, "ditto", 132, 0]})
+    pokemon = json.loads(response.content)["pokemon"]
+    assert [elem.get("pokemon_name") for elem in pokemon] == ["ditto", "ditto", None]
+    # too many pokemon in one batch
+    response = client.post("/Pokemon_Batch", json={"pokemon": list(range(1, 502))})
+    assert response.status_code == 422
+
+def test_search_pokemon():
+    api.main.search_index.build([{"pokemon_id": 132, "pokemon_name": "ditto"}, {"pokemon_id": 25, "pokemon_name": "pikachu"}])
+    response = client.get("/Pokemon_Search/Dit")
+    assert json.loads(response.content) == {"pokemon": [{"pokemon_id": 132, "pokemon_name": "ditto"}]}
+    # typos are matched as well
+    response = client.get("/Pokemon_Search/pikahcu")
+    assert json.loads(response.content)["pokemon"][0]["pokemon_name"] == "pikachu"
+    response = client.get("/Pokemon_Search/dit?limit=0")
+    assert response.status_code == 422
+
 def test_rand_pokemon():
     # wrong generation
     response = client.post("/Pokemon_Rand/7")
@@ -146,6 +282,30 @@ def test_update_user():
     response = client.post("/update_points", headers=json_header, json={"username": "testuser", "points_elem": 10})
     assert response.content == b'{"details":"Added points to user successfully"}'
 
+def test_open_pack():
+    # only for authenticated users
+    response = client.post("/open_pack/1")
+    assert response.status_code == 401
+    response = client.post("/token", data={'username': "testuser", 'password': "Asdf1234"})
+    current_token = json.loads(response.content)
+    headers = {'Authorization': current_token["token_type"] + " " + current_token["access_token"] }
+    # wrong generation and pack size
+    response = client.post("/open_pack/7", headers=headers)
+    assert response.status_code == 404
+    response = client.post("/open_pack/1?size=11", headers=headers)
+    assert response.status_code == 422
+
+def test_token_cache():
+    response = client.post("/token", data={'username': "testuser", 'password': "Asdf1234"})
+    current_token = json.loads(response.content)
+    headers = {'Authorization': current_token["token_type"] + " " + current_token["access_token"] }
+    response = client.post("/get_user", headers=headers)
+    assert json.loads(response.content)["points"] == 10
+    # changing the user invalidates the cached token
+    client.post("/update_points", json={"username": "testuser", "points_elem": 20})
+    response = client.post("/get_user", headers=headers)
+    assert json.loads(response.content)["points"] == 20
+
     
 def test_stop_db():
     api.close_db()
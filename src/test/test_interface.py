@@ -1,6 +1,10 @@
 from api.modules.interface import *
+from api.modules.module_password import PasswordHasher
 
 import pytest
+import json
+import asyncio
+import random
 import os
 import testcontainers.compose
 
@@ -108,6 +112,255 @@ def test_generationobj():
     with pytest.raises(IndexError) as e_info:
         test_obj.get_random_pokemon()
 
+def test_generationobj_random_ids():
+    test_obj = GenerationObj.__new__(GenerationObj)
+    test_obj._gen_id = 1
+    test_obj._rng = random.Random(42)
+    test_obj._set_pokemon_list([{'pokemon_id': 150, 'pokemon_name': 'mewtwo'}, {'pokemon_id': 151, 'pokemon_name': 'mew'}])
+    mew = PokemonObj.from_dict({
+        'pokemon_id': 151, 
+        'pokemon_name': 'mew', 
+        'pokemon_generation': 'generation-i', 
+        'pokemon_rarity': 'mythical', 
+        'pokemon_points': 500, 
+        'pokemon_stats': [{'stat_name': 'hp', 'stat_value': 100}], 
+        'pokemon_sprite_path': ''})
+    catalog = PokemonCatalog(snapshot_path="")
+    catalog._set_table([mew])
+    # pokemon that are not part of the catalog count as normal
+    assert test_obj.get_rarity_weights(catalog) == [1.0, 0.02]
+    assert test_obj.get_rarity_weights(catalog, {PokemonRarity.NORMAL: 0, PokemonRarity.MYTHIC: 1}) == [0, 1]
+    # without rarity weights weighted draws are uniform
+    assert len(test_obj.get_random_pokemon_ids(3, weighted=True)) == 3
+    test_obj.set_rarity_weights(catalog, {PokemonRarity.NORMAL: 0, PokemonRarity.MYTHIC: 1})
+    assert test_obj.get_random_pokemon_ids(5, weighted=True) == [151] * 5
+    assert set(test_obj.get_random_pokemon_ids(100)) == {150, 151}
+    assert test_obj.get_sampler(weighted=True).draw() == 151
+    # drawn ids resolve into the catalog
+    test_obj._set_pokemon_list([{'pokemon_id': 151, 'pokemon_name': 'mew'}])
+    assert test_obj.get_random_pokemon(catalog) is mew
+    
+    test_obj._pokemon_list = []
+    with pytest.raises(IndexError) as e_info:
+        test_obj.get_random_pokemon_ids(1)
+
+
+def test_pokemon_catalog(tmp_path):
+    snapshot_path = str(tmp_path / "catalog.json")
+    
+    # empty catalog
+    catalog = PokemonCatalog(snapshot_path=snapshot_path)
+    assert catalog.is_loaded() == False
+    assert catalog.get_by_id(1) is None
+    
+    # build catalog for first generation and write snapshot
+    catalog = PokemonCatalog(generations=(1,), snapshot_path=snapshot_path)
+    assert catalog.load() == 151
+    assert os.path.exists(snapshot_path)
+    assert catalog.get_by_id(1) == PokemonObj(1)
+    assert catalog.get_by_name("Bulbasaur") == PokemonObj(1)
+    assert catalog.get_by_name(123) is None
+    assert catalog.get_by_id(152) is None
+    
+    # warm restart from snapshot
+    warm_catalog = PokemonCatalog(generations=(1,), snapshot_path=snapshot_path)
+    assert warm_catalog.load() == 151
+    assert warm_catalog.get_by_id(144) == catalog.get_by_id(144)
+    assert warm_catalog.get_by_id(144).get_rarity() == PokemonRarity.LEGENDARY
+    
+    # snapshot of other generations is not used
+    other_catalog = PokemonCatalog(generations=(2,), snapshot_path=snapshot_path)
+    assert other_catalog._load_snapshot() is None
+
+def test_pokemonobj_from_dict():
+    test_dict = {
+        'pokemon_id': 132, 
+        'pokemon_name': 'ditto', 
+        'pokemon_generation': 'generation-i', 
+        'pokemon_rarity': 'normal', 
+        'pokemon_points': 48, 
+        'pokemon_stats': [{'stat_name': 'hp', 'stat_value': 48}], 
+        'pokemon_sprite_path': ''}
+    test_obj = PokemonObj.from_dict(test_dict)
+    assert test_obj.get_rarity() == PokemonRarity.NORMAL
+    assert test_obj == test_dict
+
+def test_pokemonobj_immutable():
+    test_dict = {
+        'pokemon_id': 132, 
+        'pokemon_name': 'ditto', 
+        'pokemon_generation': 'generation-i', 
+        'pokemon_rarity': 'normal', 
+        'pokemon_points': 48, 
+        'pokemon_stats': [{'stat_name': 'hp', 'stat_value': 48}], 
+        'pokemon_sprite_path': ''}
+    test_obj = PokemonObj.from_dict(test_dict)
+    with pytest.raises(AttributeError):
+        test_obj._name = "mew"
+    with pytest.raises(AttributeError):
+        del test_obj._name
+    with pytest.raises(AttributeError):
+        test_obj.other = 1
+    assert test_obj.get_name() == "ditto"
+
+    # serialized once
+    assert json.loads(test_obj.to_json()) == test_dict
+    assert test_obj.to_json() is test_obj.to_json()
+
+    # compared and hashed by id
+    other_obj = PokemonObj.from_dict({**test_dict, 'pokemon_points': 0})
+    assert test_obj == other_obj
+    assert len({test_obj, other_obj}) == 1
+    assert test_obj != PokemonObj.from_dict({**test_dict, 'pokemon_id': 1})
+    assert test_obj.get_stats()[0]["stat_name"] is other_obj.get_stats()[0]["stat_name"]
+
+def test_pokemon_batch():
+    ditto = PokemonObj.from_dict({
+        'pokemon_id': 132, 
+        'pokemon_name': 'ditto', 
+        'pokemon_generation': 'generation-i', 
+        'pokemon_rarity': 'normal', 
+        'pokemon_points': 48, 
+        'pokemon_stats': [{'stat_name': 'hp', 'stat_value': 48}], 
+        'pokemon_sprite_path': ''})
+    catalog = PokemonCatalog(snapshot_path="")
+    catalog._set_table([ditto])
+    # the version only depends on the pokemon
+    other_catalog = PokemonCatalog(snapshot_path="")
+    assert other_catalog.get_version() == ""
+    other_catalog._set_table([ditto], 1700000000)
+    assert other_catalog.get_version() == catalog.get_version() != ""
+    assert other_catalog.get_last_modified() == 1700000000
+    # duplicates are resolved once, names and digit strings are normalized
+    assert PokemonObj.from_batch([132, "Ditto", "132", 132], catalog) == [ditto, ditto]
+    # keys that can not be resolved return details
+    assert PokemonObj.from_batch([0, "", 132], catalog) == [
+        {"details": "Pokemon Id must be greater than 1"}, 
+        {"details": "Pokemon must be given by id or name"}, 
+        ditto]
+    assert PokemonObj.from_batch([]) == []
+
+def test_async_database():
+    db_settings = {
+        'database'        : 'test_database',
+        'user'            : 'postgres',
+        'host'            : host,
+        'password'        : 'test_passwd',
+        'port'            : 5432
+    }
+
+    async def run_queries(db_obj):
+        assert await db_obj.add_user("test_user", "1234ABCD", []) == 0
+        assert (await db_obj.authenticate_user("test_user", "1234ABCD"))["user_name"] == "test_user"
+        assert (await db_obj.authenticate_user("test_user", "4321ABCD"))["user_id"] == -1
+        assert (await db_obj.authenticate_user("idontexist", "1234ABCD"))["user_id"] == -1
+        # invalid input is rejected before hashing
+        assert await db_obj.add_user("other_user", "1234", []) == 11
+        # outdated hashes are replaced on login, the update runs on a writable connection
+        assert await db_obj.add_user_with_hash("old_user", PasswordHasher(iterations=1000, workers=1).hash("1234ABCD"), []) == 0
+        assert (await db_obj.authenticate_user("old_user", "1234ABCD"))["user_name"] == "old_user"
+        assert not password_hasher.needs_rehash(db_obj.get_database().get_user_password("old_user", "1234ABCD")[1])
+        assert await db_obj.delete_user("old_user") == 0
+        # no connection of the pool is held while a password is hashed
+        pool = db_obj.get_database().get_pool()
+        in_use = []
+        derive = password_hasher._derive
+        def recording_derive(*args):
+            in_use.append(pool.get_size() - pool.get_idle_size())
+            return derive(*args)
+        password_hasher._derive = recording_derive
+        try:
+            assert (await db_obj.authenticate_user("test_user", "1234ABCD"))["user_name"] == "test_user"
+            assert await db_obj.add_user("other_user", "1234ABCD", []) == 0
+        finally:
+            del password_hasher._derive
+        assert in_use == [0, 0]
+        assert await db_obj.delete_user("other_user") == 0
+        # concurrent calls are spread over the connection pool
+        users = await asyncio.gather(*[db_obj.get_user("test_user") for _ in range(10)])
+        assert all(user["user_name"] == "test_user" for user in users)
+        assert await db_obj.update_user("test_user", [{"_id": 1, "_name": 1}]) == 0
+        assert await db_obj.update_user_points("test_user", 20) == 0
+        assert len((await db_obj.get_users())["users"]) == 1
+        # the stream holds no connection while the consumer is waiting
+        streamed = []
+        async for user in db_obj.iter_users(1):
+            assert pool.get_size() == pool.get_idle_size()
+            streamed.append(user)
+        assert streamed == (await db_obj.get_users())["users"]
+        assert (await db_obj.get_leaderboard())["users"][0]["points"] == 20
+        assert await db_obj.get_user_rank("test_user") == 1
+        assert await db_obj.delete_user("test_user") == 0
+        assert (await db_obj.get_user("test_user"))["user_id"] == -1
+
+    db_obj = AsyncDatabase(db_settings, {"min_size": 1, "max_size": 4, "timeout": 5.0, "check_interval": 30.0})
+    assert db_obj.delete_table() == 0
+    assert db_obj.create_table() == 0
+    asyncio.run(run_queries(db_obj))
+    assert db_obj.close() == 0
+
+
+def test_database_transaction():
+    db_settings = {
+        'database'        : 'test_database',
+        'user'            : 'postgres',
+        'host'            : host,
+        'password'        : 'test_passwd',
+        'port'            : 5432
+    }
+    db_obj = Database(db_settings, {"min_size": 1, "max_size": 1, "timeout": 5.0, "check_interval": 30.0})
+    assert db_obj.delete_table() == 0
+    assert db_obj.create_table() == 0
+    changed = []
+    db_obj.add_user_listener(changed.append)
+
+    # the password is hashed before the connection of the unit is taken
+    pool = db_obj.get_pool()
+    in_use = []
+    derive = password_hasher._derive
+    def recording_derive(*args):
+        in_use.append(pool.get_size() - pool.get_idle_size())
+        return derive(*args)
+    password_hasher._derive = recording_derive
+    try:
+        password_hash = password_hasher.hash("1234ABCD")
+        # register and seed the deck with one commit, listeners are called afterwards
+        with db_obj.transaction() as transaction:
+            assert not hasattr(transaction, "add_user")
+            assert transaction.add_user_with_hash("test_user", password_hash, []) == 0
+            assert transaction.add_elems_to_user_deck("test_user", [{"_id": 1, "_name": 1}, {"_id": 2, "_name": 2}]) == 0
+            assert transaction.update_user_points("test_user", 10) == 0
+            assert transaction.get_user("test_user")["points"] == 10
+            assert changed == []
+    finally:
+        del password_hasher._derive
+    assert in_use == [0]
+    assert changed == ["test_user"]
+    assert db_obj.authenticate_user("test_user", "1234ABCD")["user_name"] == "test_user"
+    assert db_obj.get_user("test_user")["deck_ids"] == [{"_id": 1, "_name": 1}, {"_id": 2, "_name": 2}]
+
+    # a failed write rolls back the whole unit
+    with pytest.raises(DatabaseError) as e_info:
+        with db_obj.transaction() as transaction:
+            assert transaction.add_user_with_hash("other_user", password_hash, []) == 0
+            assert transaction.add_user_with_hash("test_user", password_hash, []) == 3
+    assert db_obj.get_user("other_user")["user_id"] == -1
+    with pytest.raises(ValueError) as e_info:
+        with db_obj.transaction() as transaction:
+            transaction.update_user_points("test_user", 50)
+            raise ValueError("abort")
+    assert db_obj.get_user("test_user")["points"] == 10
+    assert db_obj.run_transaction(lambda transaction, user_name: transaction.delete_user(user_name), "test_user") == 0
+
+    # lookups run in autocommit mode and leave no transaction behind
+    with db_obj.get_pool().connection(read_only=True) as conn:
+        assert conn.autocommit
+        assert get_user_from_db(conn, "test_user").user_id == -1
+        assert conn.info.transaction_status == 0
+    with db_obj.get_pool().connection() as conn:
+        assert not conn.autocommit
+    assert db_obj.close() == 0
+
 
 def test_database():
     db_settings = {
@@ -135,9 +388,17 @@ def test_database():
     assert db_obj.authenticate_user("test_user", "1234ABCD").__str__() == {"user_id": 1, "user_name": "test_user", "deck_ids": [], "points": 0}.__str__() 
     assert db_obj.get_user("test_user").__str__() == {"user_id": 1, "user_name": "test_user", "deck_ids": [], "points": 0}.__str__()
     assert db_obj.update_user("test_user", [{"_id": 1, "_name": 1}]) == 0
+    assert db_obj.add_elem_to_user_deck("test_user", {"_id": 2, "_name": 2}) == 0
+    assert db_obj.add_elem_to_user_deck("test_user", {"_id": 2, "_name": 2}) == 14
+    assert db_obj.add_elem_to_user_deck("nonexistinguser", {"_id": 2, "_name": 2}) == 15
+    assert db_obj.add_elems_to_user_deck("test_user", [{"_id": 2, "_name": 2}, {"_id": 3, "_name": 3}]) == 0
+    assert db_obj.add_elems_to_user_deck("test_user", [{"_id": 3, "_name": 3}]) == 14
+    assert db_obj.get_user("test_user")["deck_ids"] == [{"_id": 1, "_name": 1}, {"_id": 2, "_name": 2}, {"_id": 3, "_name": 3}]
     assert db_obj.update_user_points("test_user", 20) == 0
+    assert db_obj.get_leaderboard() == {"users": [{"user_id": 1, "user_name": "test_user", "points": 20}]}
+    assert db_obj.get_user_rank("test_user") == 1
+    assert db_obj.get_user_rank("nonexistinguser") == -1
     assert db_obj.delete_user("test_user") == 0
     assert db_obj.clean_table() == 0
     assert db_obj.get_users() == {"users": []}
     assert db_obj.close() == 0
-
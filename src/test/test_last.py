@@ -35,5 +35,7 @@ def test_last_test(mocker):
         self._sprite = ""
 
     mocker.patch.object(api.modules.interface.PokemonObj, '__init__', __init__)
+    # responses of earlier tests would be served without building the pokemon
+    api.main.response_cache.clear()
     response = client.post("/Pokemon_Id/132")
     assert json.loads(response.content)["pokemon_name"] == "test_ditto"
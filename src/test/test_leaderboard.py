@@ -0,0 +1,94 @@
+from api.modules.module_leaderboard import *
+
+import time
+
+def create_leaderboard():
+    leaderboard = LeaderboardCache(ttl=60)
+    assert leaderboard.load([
+        {"user_id": 1, "user_name": "ash", "points": 10},
+        {"user_id": 2, "user_name": "misty", "points": 30},
+        {"user_id": 3, "user_name": "brock", "points": 30},
+        {"user_id": 4, "user_name": "gary", "points": None}
+    ]) == 0
+    return leaderboard
+
+def test_load():
+    leaderboard = LeaderboardCache(ttl=60)
+    assert leaderboard.is_stale()
+    leaderboard = create_leaderboard()
+    assert not leaderboard.is_stale()
+    # users without points are not part of the leaderboard
+    assert len(leaderboard) == 3
+    # loading a snapshot that was fetched before a change keeps the cache stale
+    version = leaderboard.get_version()
+    leaderboard.update("ash", 50)
+    assert leaderboard.load([], version) == 1
+    assert leaderboard.is_stale()
+
+def test_ttl():
+    leaderboard = LeaderboardCache(ttl=0.01)
+    leaderboard.load([])
+    time.sleep(0.02)
+    assert leaderboard.is_stale()
+    leaderboard.load([])
+    leaderboard.invalidate()
+    assert leaderboard.is_stale()
+
+def test_get_top():
+    leaderboard = create_leaderboard()
+    # ordered by points, ties by newest id
+    assert [user["user_name"] for user in leaderboard.get_top()["users"]] == ["brock", "misty", "ash"]
+    assert leaderboard.get_top(limit=1) == {"users": [{"user_id": 3, "user_name": "brock", "points": 30}]}
+    assert leaderboard.get_top(limit=1, offset=1) == leaderboard.get_top(limit=1, after_points=30, after_id=3)
+    assert leaderboard.get_top(limit=None, after_points=10, after_id=1) == {"users": []}
+
+def test_update_and_remove():
+    leaderboard = create_leaderboard()
+    assert leaderboard.update("ash", 40)
+    assert leaderboard.get_top(limit=1)["users"][0]["user_name"] == "ash"
+    assert not leaderboard.update("idontexist", 40)
+    assert leaderboard.remove("ash")
+    assert not leaderboard.remove("ash")
+    assert len(leaderboard) == 2
+
+def test_get_rank():
+    leaderboard = create_leaderboard()
+    # users with the same points share a rank
+    assert leaderboard.get_rank("brock") == 1
+    assert leaderboard.get_rank("misty") == 1
+    assert leaderboard.get_rank("ash") == 3
+    assert leaderboard.get_rank("gary") == -1
+    leaderboard.update("ash", 30)
+    assert leaderboard.get_rank("ash") == 1
+
+def test_top_k():
+    leaderboard = LeaderboardCache(ttl=60, size=3)
+    # a full top means that users with less points exist
+    assert leaderboard.load([
+        {"user_id": 1, "user_name": "ash", "points": 50},
+        {"user_id": 2, "user_name": "misty", "points": 40},
+        {"user_id": 3, "user_name": "brock", "points": 30}
+    ]) == 0
+    assert leaderboard.get_top(limit=3)["users"][2]["user_name"] == "brock"
+    assert leaderboard.get_top(limit=2, after_points=50, after_id=1) == {"users": [{"user_id": 2, "user_name": "misty", "points": 40}, {"user_id": 3, "user_name": "brock", "points": 30}]}
+    # pages below the top are not answered
+    assert leaderboard.get_top(limit=4) is None
+    assert leaderboard.get_top(limit=1, offset=3) is None
+    assert leaderboard.get_top(limit=None) is None
+    assert leaderboard.get_rank("gary") == -1
+    # users below the top that stay below it do not change the top
+    assert leaderboard.update("gary", 20)
+    assert not leaderboard.update("gary", 30)
+    # a user that falls below the top is removed, the others are still the top
+    assert leaderboard.update("misty", 10)
+    assert leaderboard.get_rank("misty") == -1
+    assert leaderboard.get_top(limit=2)["users"] == [{"user_id": 1, "user_name": "ash", "points": 50}, {"user_id": 3, "user_name": "brock", "points": 30}]
+    assert leaderboard.get_top(limit=3) is None
+    assert leaderboard.update("brock", 60)
+    assert leaderboard.get_rank("brock") == 1
+    assert leaderboard.get_rank("ash") == 2
+    # less users than the size are the whole leaderboard
+    leaderboard.load([{"user_id": 1, "user_name": "ash", "points": 50}])
+    assert leaderboard.get_top(limit=None) == {"users": [{"user_id": 1, "user_name": "ash", "points": 50}]}
+    assert leaderboard.update("ash", 0)
+    assert not leaderboard.update("gary", 0)
@@ -0,0 +1,80 @@
+from api.modules.module_password import *
+
+import asyncio
+import pytest
+import threading
+
+def test_password_hasher():
+    with pytest.raises(ValueError) as e_info:
+        PasswordHasher(iterations=0)
+    hasher = PasswordHasher(iterations=1000, workers=2)
+    password_hash = hasher.hash("123456AB")
+    assert password_hash.startswith("pbkdf2_sha256$1000$")
+    # every hash gets its own salt
+    assert hasher.hash("123456AB") != password_hash
+    assert hasher.verify("123456AB", password_hash)
+    assert not hasher.verify("654321AB", password_hash)
+    # malformed and legacy hashes never verify
+    assert not hasher.verify("123456AB", "pbkdf2_sha256$1000$broken")
+    assert not hasher.verify("123456AB", "$1$abcdefgh$abcdefghijklmnopqrstuv")
+    hasher.close()
+    # the pool is started again after close
+    assert hasher.verify("123456AB", password_hash)
+    hasher.close()
+
+def test_password_hasher_async():
+    hasher = PasswordHasher(iterations=1000, workers=1)
+    async def run():
+        password_hash = await hasher.hash_async("123456AB")
+        assert hasher.verify("123456AB", password_hash)
+        assert await hasher.verify_async("123456AB", password_hash)
+        assert not await hasher.verify_async("654321AB", password_hash)
+        assert not await hasher.verify_async(123, password_hash)
+        # the dummy hash never matches
+        assert not await hasher.verify_async("123456AB", hasher.get_dummy_hash())
+    asyncio.run(run())
+    hasher.close()
+
+def test_password_needs_rehash():
+    hasher = PasswordHasher(iterations=1000, workers=1)
+    assert is_legacy_hash("$1$abcdefgh$abcdefghijklmnopqrstuv")
+    assert not is_legacy_hash(hasher.hash("123456AB"))
+    assert hasher.needs_rehash("$1$abcdefgh$abcdefghijklmnopqrstuv")
+    assert not hasher.needs_rehash(hasher.hash("123456AB"))
+    # hashes with less iterations than configured are replaced
+    assert hasher.needs_rehash(PasswordHasher(iterations=500, workers=1).hash("123456AB"))
+    assert hasher.needs_rehash("pbkdf2_sha256$abc$broken")
+    hasher.close()
+
+def test_login_limiter():
+    limiter = LoginLimiter(max_per_user=2, max_per_ip=3)
+    assert limiter.acquire("test_user", "1.2.3.4")
+    assert limiter.acquire("Test_User", "1.2.3.4")
+    # user limit reached, user names are compared case insensitive
+    assert not limiter.acquire("test_user", "5.6.7.8")
+    assert limiter.acquire("other_user", "1.2.3.4")
+    # ip limit reached
+    assert not limiter.acquire("third_user", "1.2.3.4")
+    assert limiter.get_stats() == {"running": 3, "rejected": 2}
+    limiter.release("test_user", "1.2.3.4")
+    with limiter.limit("test_user", "5.6.7.8") as allowed:
+        assert allowed
+        with limiter.limit("test_user", "5.6.7.8") as allowed:
+            assert not allowed
+    limiter.release("test_user", "1.2.3.4")
+    limiter.release("other_user", "1.2.3.4")
+    assert limiter.get_stats() == {"running": 0, "rejected": 3}
+
+def test_login_limiter_threads():
+    limiter = LoginLimiter(max_per_user=1, max_per_ip=10)
+    barrier = threading.Barrier(8)
+    results = []
+    def login():
+        barrier.wait()
+        results.append(limiter.acquire("test_user"))
+    threads = [threading.Thread(target=login) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
@@ -1,8 +1,11 @@
 from api.modules.module_pokeapi import *
 from api.modules.module_pokeapi import _check_generation_and_depth, _check_poke_rarity
+from api.modules import module_pokeapi
 import tempfile
+import time
 import shutil
 import pytest
+import requests
 
 
 # setup temporary cache for testing environment (has to include static for the function to work)
@@ -30,6 +33,174 @@ def test_cached_name_id_list():
     # remove test file
     os.remove("./test_cache.json")
 
+def test_name_id_index(tmp_path):
+    file_path = str(tmp_path / "cache_ids.json")
+    index = NameIdIndex(file_path)
+    assert index.get("ditto") == -1
+    assert len(index) == 0
+    index.add("ditto", 132)
+    assert index.get("ditto") == 132
+    assert load_cached_name_id_list(file_path) == {"ditto": 132}
+    # entries written by another worker are picked up on a miss
+    other_index = NameIdIndex(file_path)
+    other_index.add("mew", 151)
+    assert index.get("mew") == 151
+    # the file is merged, not overwritten
+    index.add("pikachu", 25)
+    assert load_cached_name_id_list(file_path) == {"ditto": 132, "mew": 151, "pikachu": 25}
+    assert os.listdir(tmp_path) == ["cache_ids.json"]
+
+def test_negative_cache(monkeypatch):
+    not_found = requests.Response()
+    not_found.status_code = 404
+
+    calls = []
+    def pokemon_not_found(poke_id):
+        calls.append(poke_id)
+        raise requests.HTTPError("404 Client Error: Not Found", response=not_found)
+
+    def pokemon_bad_response(poke_id):
+        calls.append(poke_id)
+        raise requests.exceptions.JSONDecodeError("Expecting value", "", 0)
+
+    def pokemon_unreachable(poke_id):
+        calls.append(poke_id)
+        raise ConnectionError("api not reachable")
+
+    negative_cache.clear()
+    stats = get_negative_cache_stats()
+    # connection errors are not remembered
+    monkeypatch.setattr(pb, "pokemon", pokemon_unreachable)
+    assert get_pokemon_by_id(99999) == {}
+    assert get_pokemon_by_id(99999) == {}
+    assert len(calls) == 2
+    # bad or truncated responses are not remembered either
+    monkeypatch.setattr(pb, "pokemon", pokemon_bad_response)
+    assert get_pokemon_by_id(99999) == {}
+    assert not is_known_missing("pokemon", 99999)
+    calls.clear()
+    # not found is remembered, the second lookup does not call the api
+    monkeypatch.setattr(pb, "pokemon", pokemon_not_found)
+    assert get_pokemon_by_id(99999) == {}
+    assert get_pokemon_by_id(99999) == {}
+    assert len(calls) == 1
+    assert is_known_missing("pokemon", 99999)
+    assert not is_known_missing("pokemon-species", 99999)
+    assert get_negative_cache_stats()["hits"] == stats["hits"] + 2
+    # evicted entries are fetched again
+    assert forget_missing("pokemon", 99999)
+    assert get_pokemon_by_id(99999) == {}
+    assert len(calls) == 2
+    negative_cache.clear()
+
+def test_negative_cache_names(monkeypatch):
+    class UnknownSpecies():
+        id_ = None
+
+    calls = []
+    def species_not_found(pokemon_name):
+        calls.append(pokemon_name)
+        return UnknownSpecies()
+
+    negative_cache.clear()
+    monkeypatch.setattr(pb, "pokemon_species", species_not_found)
+    # names pokebase can not find are remembered, in any case
+    assert get_pokemon_id_from_name("Missingno") == -1
+    assert get_pokemon_id_from_name("missingno") == -1
+    assert get_pokemon_id_from_name("MISSINGNO") == -1
+    assert calls == ["missingno"]
+    assert is_known_missing("pokemon-species", "missingno")
+    negative_cache.clear()
+
+def test_fetch_single_flight(monkeypatch):
+    calls = []
+    release = threading.Event()
+    def pokemon_slow(poke_id):
+        calls.append(poke_id)
+        release.wait(5)
+        raise ConnectionError("api not reachable")
+
+    monkeypatch.setattr(pb, "pokemon", pokemon_slow)
+    shared = pokeapi_flight.get_stats()["shared"]
+    threads = [threading.Thread(target=get_pokemon_by_id, args=(99998, 1)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while pokeapi_flight.get_stats()["shared"] < shared + 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    # concurrent lookups of the same pokemon share one api request
+    assert calls == [99998]
+
+def save_ditto_to_cache():
+    # offline copy of ditto inside of the temporary pokebase cache
+    stats = [{"base_stat": 48, "stat": {"name": stat_name}} for stat_name in STAT_NAMES]
+    pb.cache.save({"id": 132, "name": "ditto", "stats": stats}, "pokemon", 132)
+    pb.cache.save({"id": 132, "name": "ditto", "is_legendary": False, "is_mythical": False,
+                   "generation": {"name": "generation-i", "url": "https://pokeapi.co/api/v2/generation/1/"}}, "pokemon-species", 132)
+    sprite_path = pb.cache.get_sprite_path("pokemon", 132)
+    os.makedirs(os.path.dirname(sprite_path))
+    with open(sprite_path, "wb") as file:
+        file.write(b"\x89PNG")
+    return stats
+
+def test_pokemon_store(tmp_path, monkeypatch):
+    stats = save_ditto_to_cache()
+    # pokemon without species are left out
+    pb.cache.save({"id": 25, "name": "pikachu", "stats": stats}, "pokemon", 25)
+
+    store_path = str(tmp_path / "pokemon.store")
+    assert build_pokemon_store(store_path) == 1
+    monkeypatch.setattr(module_pokeapi, "pokemon_store", PokemonStore(store_path))
+    # lookups are answered by the store without opening the pokebase cache
+    def load(*args):
+        raise AssertionError("pokebase cache was opened")
+    monkeypatch.setattr(pb.cache, "load", load)
+    monkeypatch.setattr(pb.cache, "load_sprite", load)
+    assert get_pokemon_by_id(132) == {"pokemon_id": 132, "pokemon_name": "ditto", "pokemon_stats": [{"stat_name": stat_name, "stat_value": 48} for stat_name in STAT_NAMES]}
+    assert get_pokemon_rarity_and_generation_by_id(132) == {"pokemon_rarity": PokemonRarity.NORMAL, "pokemon_gen_id": "1", "pokemon_gen_name": "generation-i"}
+    assert get_pokesprite_url_by_id(132) == "/.cache/sprite/pokemon/132.png"
+
+def test_pokemon_store_skip_and_stale(tmp_path):
+    stats = save_ditto_to_cache()
+    store_path = str(tmp_path / "pokemon.store")
+    assert is_store_stale(store_path)
+    # a record that does not fit into the store is skipped, the others are still written
+    pb.cache.save({"id": 10001, "name": "a" * 26, "stats": stats}, "pokemon", 10001)
+    pb.cache.save({"id": 10001, "name": "a" * 26, "is_legendary": False, "is_mythical": False,
+                   "generation": {"name": "generation-i", "url": "https://pokeapi.co/api/v2/generation/1/"}}, "pokemon-species", 10001)
+    assert build_pokemon_store(store_path) >= 1
+    assert PokemonStore(store_path).get(132).name == "ditto"
+    assert PokemonStore(store_path).get(10001) is None
+    assert not is_store_stale(store_path)
+    # changes of the cache after the build make the store stale
+    time.sleep(0.01)
+    pb.cache.save({"id": 25, "name": "pikachu", "stats": stats}, "pokemon", 25)
+    assert is_store_stale(store_path)
+
+def test_resolve_pokemon(tmp_path, monkeypatch):
+    save_ditto_to_cache()
+    resolved_cache.clear()
+    expected_result = {"pokemon_id": 132, "pokemon_name": "ditto", "pokemon_stats": [{"stat_name": stat_name, "stat_value": 48} for stat_name in STAT_NAMES],
+                       "pokemon_rarity": PokemonRarity.NORMAL, "pokemon_gen_id": "1", "pokemon_gen_name": "generation-i", "pokemon_points": 48,
+                       "pokemon_sprite_path": "/.cache/sprite/pokemon/132.png"}
+    # without store from the pokebase cache
+    monkeypatch.setattr(module_pokeapi, "pokemon_store", PokemonStore(str(tmp_path / "missing.store")))
+    assert resolve_pokemon(132) == expected_result
+    assert resolve_pokemon(132, False) == {**expected_result, "pokemon_sprite_path": ""}
+    # from the store
+    resolved_cache.clear()
+    build_pokemon_store(str(tmp_path / "pokemon.store"))
+    monkeypatch.setattr(module_pokeapi, "pokemon_store", PokemonStore(str(tmp_path / "pokemon.store")))
+    assert resolve_pokemon("132") == expected_result
+    # memoized, neither the store nor the cache are read again
+    monkeypatch.setattr(module_pokeapi, "pokemon_store", None)
+    assert resolve_pokemon(132) is resolve_pokemon(132)
+    assert resolve_pokemon(0) == {}
+    assert resolve_pokemon("ditto") == {}
+    resolved_cache.clear()
+
 def test_check_pokemon_name():
     # pokename not str
     assert check_pokemon_name("test_func", 123) == -1
@@ -1,6 +1,7 @@
 from api.modules.module_postgresql import *
 
 import pytest
+import io
 import os
 import pytest
 import testcontainers.compose
@@ -125,18 +126,53 @@ def test_get_user_from_db():
     print(get_user_from_db(db_connection, "test_user"))
     assert get_user_from_db(db_connection, "test_user").__eq__(UserObj(2, "test_user", [{"_id": 1, "_name": "name"}, {"_id": 2, "_name": "name2"}], 17))
 
-def test_authenticate_user_from_db():
+def authenticate(user_name, user_password, table_name="users"):
+    # login like Database.authenticate_user, hashing happens between the queries
+    user, password_hash = get_user_password_from_db(db_connection, user_name, user_password, table_name)
+    if not verify_user_password(user_password, password_hash):
+        return UserObj.create_empty()
+    if password_hasher.needs_rehash(password_hash):
+        rehash_password_from_db(db_connection, user_name, password_hasher.hash(user_password), password_hash, table_name)
+    return user
+
+def test_get_user_password_from_db():
     # authenticate user with none type connection
-    assert authenticate_user_from_db(None, "", "").__eq__(UserObj.create_empty())
+    assert get_user_password_from_db(None, "", "") == (UserObj.create_empty(), None)
+    assert rehash_password_from_db(None, "test_user", "", "") == 1
     # authenticate user with wrong name type
-    assert authenticate_user_from_db(db_connection, 123, "123456AB")
+    assert authenticate(123, "123456AB").__empty__()
     # authenticate user with wrong password type
-    assert authenticate_user_from_db(db_connection, "test_user", 123)
+    assert authenticate("test_user", 123).__empty__()
     # test non existing user
-    assert authenticate_user_from_db(db_connection, "nonexistinguser", "1234AbCd").__empty__()
+    assert authenticate("nonexistinguser", "1234AbCd").__empty__()
+    # the hash is returned for verification inside of the api
+    user, password_hash = get_user_password_from_db(db_connection, "test_user", "123456AB")
+    assert password_hash.startswith("pbkdf2_sha256$")
+    assert verify_user_password("123456AB", password_hash)
+    assert not verify_user_password("654321AB", password_hash)
+    assert not verify_user_password("123456AB", None)
     # authenticate user successfully
-    print(authenticate_user_from_db(db_connection, "test_user", "123456AB"))
-    assert authenticate_user_from_db(db_connection, "test_user", "123456AB").__eq__(UserObj(2, "test_user", [{"_id": 1, "_name": "name"}, {"_id": 2, "_name": "name2"}], 17))
+    assert authenticate("test_user", "123456AB").__eq__(UserObj(2, "test_user", [{"_id": 1, "_name": "name"}, {"_id": 2, "_name": "name2"}], 17))
+
+def test_legacy_user_password_from_db():
+    # users created before the api hashed passwords still have a md5-crypt hash of pgcrypto
+    cur = db_connection.cursor()
+    cur.execute("INSERT INTO users (user_name, password, deck_ids, points) VALUES (%s, crypt(%s, gen_salt('md5')), %s, %s)", ["legacy_user", "123456AB", "[]", 3])
+    assert authenticate("legacy_user", "654321AB").__empty__()
+    cur.execute("SELECT password FROM users WHERE user_name = %s", ["legacy_user"])
+    assert cur.fetchone()[0].startswith("$1$")
+    # the legacy hash is replaced after the first successful login
+    assert authenticate("legacy_user", "123456AB").user_name == "legacy_user"
+    cur.execute("SELECT password FROM users WHERE user_name = %s", ["legacy_user"])
+    password_hash = cur.fetchone()[0]
+    assert password_hash.startswith("pbkdf2_sha256$")
+    assert not password_hasher.needs_rehash(password_hash)
+    assert authenticate("legacy_user", "123456AB").user_name == "legacy_user"
+    assert authenticate("legacy_user", "654321AB").__empty__()
+    # new users are hashed by the api
+    cur.execute("SELECT password FROM users WHERE user_name = %s", ["test_user"])
+    assert cur.fetchone()[0].startswith("pbkdf2_sha256$")
+    assert delete_user_from_db(db_connection, "legacy_user") == 0
 
 def test_delete_user():
     # delete user with none type connection
@@ -160,12 +196,229 @@ def test_get_all_users_from_db():
     add_user_with_crypt_pass(db_connection, "test_user_second", "1234ABcd", [{"_id": 1, "_name": "name"}, {"_id": 2, "_name": "name2"}])
     assert len(get_all_users_from_db(db_connection)["users"]) == 1
 
+def test_append_elem_to_user_deck_from_db():
+    # append with none type connection
+    assert append_elem_to_user_deck_from_db(None, "", {}) == 1
+    # append with wrong name input
+    assert append_elem_to_user_deck_from_db(db_connection, 123, {}) == 4
+    # append with wrong element type
+    assert append_elem_to_user_deck_from_db(db_connection, "test_user_second", [1]) == 8
+    # append to non existing user
+    assert append_elem_to_user_deck_from_db(db_connection, "idontexist", {"_id": 3, "_name": "name3"}) == 15
+    # append element that is already in deck
+    assert append_elem_to_user_deck_from_db(db_connection, "test_user_second", {"_id": 2, "_name": "name2"}) == 14
+    # append new element successfully (only once)
+    assert append_elem_to_user_deck_from_db(db_connection, "test_user_second", {"_id": 3, "_name": "name3"}) == 0
+    assert append_elem_to_user_deck_from_db(db_connection, "test_user_second", {"_id": 3, "_name": "name3"}) == 14
+    assert get_user_from_db(db_connection, "test_user_second").deck_ids == [{"_id": 1, "_name": "name"}, {"_id": 2, "_name": "name2"}, {"_id": 3, "_name": "name3"}]
+    # elements are compared exactly, a subset of an element in the deck is a new element
+    assert append_elem_to_user_deck_from_db(db_connection, "test_user_second", {"_id": 3}) == 0
+    assert append_elem_to_user_deck_from_db(db_connection, "test_user_second", {}) == 0
+    assert append_elem_to_user_deck_from_db(db_connection, "test_user_second", {}) == 14
+    assert get_user_from_db(db_connection, "test_user_second").deck_ids[-2:] == [{"_id": 3}, {}]
+    assert update_user_from_db(db_connection, "test_user_second", [{"_id": 1, "_name": "name"}, {"_id": 2, "_name": "name2"}, {"_id": 3, "_name": "name3"}]) == 0
+
+def test_append_elems_to_user_deck_from_db():
+    # append with none type connection
+    assert append_elems_to_user_deck_from_db(None, "", []) == 1
+    # append with wrong name input
+    assert append_elems_to_user_deck_from_db(db_connection, 123, []) == 4
+    # append with empty list or wrong element types
+    assert append_elems_to_user_deck_from_db(db_connection, "test_user_second", []) == 8
+    assert append_elems_to_user_deck_from_db(db_connection, "test_user_second", [{"_id": 4, "_name": "name4"}, 4]) == 8
+    # append to non existing user
+    assert append_elems_to_user_deck_from_db(db_connection, "idontexist", [{"_id": 4, "_name": "name4"}]) == 15
+    # append elements that are already in deck
+    assert append_elems_to_user_deck_from_db(db_connection, "test_user_second", [{"_id": 1, "_name": "name"}, {"_id": 3, "_name": "name3"}]) == 14
+    # only new elements are appended once, in order of first occurrence
+    assert append_elems_to_user_deck_from_db(db_connection, "test_user_second", [{"_id": 5, "_name": "name5"}, {"_id": 1, "_name": "name"}, {"_id": 4, "_name": "name4"}, {"_id": 5, "_name": "name5"}]) == 0
+    assert get_user_from_db(db_connection, "test_user_second").deck_ids == [{"_id": 1, "_name": "name"}, {"_id": 2, "_name": "name2"}, {"_id": 3, "_name": "name3"}, {"_id": 5, "_name": "name5"}, {"_id": 4, "_name": "name4"}]
+    # a subset of an element in the deck is a new element
+    assert append_elems_to_user_deck_from_db(db_connection, "test_user_second", [{"_id": 5}, {"_id": 5, "_name": "name5"}]) == 0
+    assert get_user_from_db(db_connection, "test_user_second").deck_ids[-1] == {"_id": 5}
+    assert update_user_from_db(db_connection, "test_user_second", [{"_id": 1, "_name": "name"}, {"_id": 2, "_name": "name2"}, {"_id": 3, "_name": "name3"}, {"_id": 5, "_name": "name5"}, {"_id": 4, "_name": "name4"}]) == 0
+
+def test_get_leaderboard_from_db():
+    # get leaderboard with none type connection
+    assert get_leaderboard_from_db(None) == {}
+    # get leaderboard with bad limit, offset or keyset
+    assert get_leaderboard_from_db(db_connection, limit=0) == {}
+    assert get_leaderboard_from_db(db_connection, offset=-1) == {}
+    assert get_leaderboard_from_db(db_connection, after_points=1) == {}
+    add_user_with_crypt_pass(db_connection, "test_user_lb1", "1234ABcd", [])
+    add_user_with_crypt_pass(db_connection, "test_user_lb2", "1234ABcd", [])
+    update_user_from_db_points(db_connection, "test_user_lb1", 30)
+    update_user_from_db_points(db_connection, "test_user_lb2", 30)
+    update_user_from_db_points(db_connection, "test_user_second", 5)
+    # users ordered by points, ties by newest id
+    users = get_leaderboard_from_db(db_connection)["users"]
+    assert [user["user_name"] for user in users] == ["test_user_lb2", "test_user_lb1", "test_user_second"]
+    assert [user["points"] for user in users] == [30, 30, 5]
+    # offset and keyset pages match
+    first = get_leaderboard_from_db(db_connection, limit=1)["users"]
+    assert [user["user_name"] for user in first] == ["test_user_lb2"]
+    assert get_leaderboard_from_db(db_connection, limit=2, offset=1) == get_leaderboard_from_db(db_connection, limit=2, after_points=first[0]["points"], after_id=first[0]["user_id"])
+    assert len(get_leaderboard_from_db(db_connection, limit=None)["users"]) == 3
+
+def test_get_user_rank_from_db():
+    assert get_user_rank_from_db(None, "test_user_lb1") == -1
+    assert get_user_rank_from_db(db_connection, 123) == -1
+    assert get_user_rank_from_db(db_connection, "idontexist") == -1
+    # users with the same points share a rank
+    assert get_user_rank_from_db(db_connection, "test_user_lb1") == 1
+    assert get_user_rank_from_db(db_connection, "test_user_lb2") == 1
+    assert get_user_rank_from_db(db_connection, "test_user_second") == 3
+
+def test_statement_registry():
+    registry = StatementRegistry()
+    @registry.register("count_users")
+    def compose(table_name):
+        return sql.SQL("SELECT count(*) FROM {table_name} WHERE points >= %s").format(table_name=sql.Identifier(table_name))
+    cursor = db_connection.cursor()
+    registry.execute(cursor, "count_users", "users", [0])
+    assert cursor.fetchone()[0] == 3
+    # prepared once per connection
+    registry.execute(cursor, "count_users", "users", [10])
+    assert cursor.fetchone()[0] == 2
+    assert registry.get_stats() == {"executions": {"count_users": 2}, "prepared": 1}
+    cursor.execute("SELECT count(*) FROM pg_prepared_statements WHERE name LIKE %s", ["%count_users"])
+    assert cursor.fetchone()[0] == 1
+    # a statement that was prepared before it was tracked is replaced, a transaction stays usable
+    def compose_all(table_name):
+        return sql.SQL("SELECT count(*) FROM {table_name}").format(table_name=sql.Identifier(table_name))
+    with unit_of_work(db_connection):
+        cursor.execute("SELECT 1")
+        registry = StatementRegistry()
+        registry.register("count_users")(compose_all)
+        registry.execute(cursor, "count_users", "users")
+        assert cursor.fetchone()[0] == 3
+    registry = StatementRegistry()
+    registry.register("count_users")(compose)
+    registry.execute(cursor, "count_users", "users", [10])
+    assert cursor.fetchone()[0] == 2
+    # without preparing only the composed query is reused
+    registry = StatementRegistry(prepare=False)
+    registry.register("count_users")(compose)
+    registry.execute(cursor, "count_users", "users", [10])
+    assert cursor.fetchone()[0] == 2
+    assert registry.get_stats() == {"executions": {"count_users": 1}, "prepared": 0}
+    # the queries of the module are counted as well
+    assert statements.get_stats()["executions"]["get_user"] > 0
+
+def test_iter_users_from_db():
+    # stream with none type connection
+    assert list(iter_users_from_db(None)) == []
+    users = sorted(get_all_users_from_db(db_connection)["users"], key=lambda user: user["user_id"])
+    assert len(users) > 0
+    # every itersize streams the same users ordered by id
+    assert list(iter_users_from_db(db_connection, itersize=1)) == users
+    assert list(iter_users_from_db(db_connection, itersize=len(users))) == users
+    assert list(iter_users_from_db(db_connection, itersize=1000)) == users
+    # no transaction stays open between pages
+    stream = iter_users_from_db(db_connection, itersize=1)
+    assert next(stream) == users[0]
+    assert db_connection.info.transaction_status == ps.extensions.TRANSACTION_STATUS_IDLE
+    stream.close()
+    # pages continue after the id of the last user
+    assert get_users_page_from_db(db_connection, users[0]["user_id"], 1) == users[1:2]
+    assert get_users_page_from_db(db_connection, users[-1]["user_id"]) == []
+    with pytest.raises(ConnectionError) as e_info:
+        get_users_page_from_db(None)
+    # failures are raised, the connection stays usable
+    with pytest.raises(DatabaseError) as e_info:
+        list(iter_users_from_db(db_connection, table_name="not_existing"))
+    assert sorted(get_all_users_from_db(db_connection)["users"], key=lambda user: user["user_id"]) == users
+
+def test_import_export_users():
+    bulk_table = "bulk_users"
+    assert delete_table(db_connection, bulk_table) == 0
+    assert create_table(db_connection, bulk_table) == 0
+    # import with none type connection or unknown format
+    assert import_users_to_db(None, []) == {}
+    assert import_users_to_db(db_connection, [], copy_format="xml", table_name=bulk_table) == {}
+    password_hash = password_hasher.hash("123456AB")
+    rows = ["user_name,password,deck_ids,points\n"]
+    rows += [f"bulk_user_{i},{password_hash},\"[{{\"\"_id\"\": {i}}}]\",{i}\n" for i in range(1000)]
+    # invalid rows are skipped
+    rows += [f"1_invalid,{password_hash},[],0\n", f"bulk_invalid,{password_hash},{{}},0\n", f"bulk_negative,{password_hash},[],-1\n"]
+    reported = []
+    assert import_users_to_db(db_connection, rows, progress=reported.append, table_name=bulk_table) == {"read": 1003, "imported": 1000}
+    assert reported[-1] == len("".join(rows).encode())
+    assert get_user_from_db(db_connection, "bulk_user_7", bulk_table).__eq__(UserObj(8, "bulk_user_7", [{"_id": 7}], 7))
+    assert authenticate("bulk_user_7", "123456AB", bulk_table).user_name == "bulk_user_7"
+    # existing users are skipped or updated
+    update = ["user_name,password,deck_ids,points\n", f"bulk_user_7,{password_hash},[],70\n", f"bulk_user_new,{password_hash},,\n"]
+    assert import_users_to_db(db_connection, update, table_name=bulk_table) == {"read": 2, "imported": 1}
+    assert get_user_from_db(db_connection, "bulk_user_7", bulk_table).points == 7
+    new_user = get_user_from_db(db_connection, "bulk_user_new", bulk_table)
+    assert (new_user.deck_ids, new_user.points) == ([], 0)
+    assert import_users_to_db(db_connection, update, on_conflict="update", table_name=bulk_table) == {"read": 2, "imported": 2}
+    assert get_user_from_db(db_connection, "bulk_user_7", bulk_table).points == 70
+    # malformed input imports nothing
+    assert import_users_to_db(db_connection, ["user_name,password,deck_ids,points\n", "bulk_broken,hash,[],abc\n"], table_name=bulk_table) == {}
+    assert get_user_from_db(db_connection, "bulk_broken", bulk_table).__empty__()
+    # export and import again, csv and binary
+    assert export_users_from_db(None, io.StringIO()) == {}
+    for copy_format, file in (("csv", io.StringIO()), ("binary", io.BytesIO())):
+        assert export_users_from_db(db_connection, file, copy_format=copy_format, table_name=bulk_table) == {"exported": 1001}
+        assert clean_table(db_connection, bulk_table) == 0
+        file.seek(0)
+        if copy_format == "csv":
+            file = io.BytesIO(file.getvalue().encode())
+        assert import_users_to_db(db_connection, file, copy_format=copy_format, table_name=bulk_table) == {"read": 1001, "imported": 1001}
+        assert get_user_from_db(db_connection, "bulk_user_7", bulk_table).points == 70
+    assert len(get_all_users_from_db(db_connection, bulk_table)["users"]) == 1001
+    assert delete_table(db_connection, bulk_table) == 0
+
 def test_delete_table():
     assert delete_table(None) == 1
     assert delete_table(db_connection, table_name="not_existing") == 0
     assert delete_table(db_connection) == 0
 
 
+def test_check_connection():
+    assert check_connection(None) == False
+    assert check_connection(db_connection) == True
+
+def test_connection_pool():
+    db_settings = {
+        'database'        : 'test_database',
+        'user'            : 'postgres',
+        'host'            : host,
+        'password'        : 'test_passwd',
+        'port'            : 5432
+    }
+    # wrong sizes
+    with pytest.raises(ValueError) as e_info:
+        ConnectionPool(db_settings, min_size=2, max_size=1)
+    # wrong port should not work
+    with pytest.raises(ConnectionError) as e_info:
+        ConnectionPool(dict(db_settings, port=1234))
+
+    pool = ConnectionPool(db_settings, min_size=1, max_size=1, timeout=0.1)
+    assert pool.get_size() == 1
+    conn = pool.getconn()
+    # pool is exhausted -> checkout times out
+    with pytest.raises(PoolTimeoutError) as e_info:
+        pool.getconn()
+    # returned connections are reused
+    pool.putconn(conn)
+    with pool.connection() as conn_two:
+        assert conn_two is conn
+        # open transaction is rolled back on return
+        conn_two.cursor().execute("SELECT 1")
+    assert conn.info.transaction_status == ps.extensions.TRANSACTION_STATUS_IDLE
+    # broken idle connection is replaced on checkout
+    conn.close()
+    with pool.connection() as conn_three:
+        assert conn_three is not conn
+        assert check_connection(conn_three) == True
+    assert pool.get_size() == 1
+    assert pool.close() == 0
+    assert pool.close() == 1
+    with pytest.raises(ConnectionError) as e_info:
+        pool.getconn()
+
 def test_close_connection():
     assert close_connection(None) == 1
     assert close_connection(db_connection) == 0
\ No newline at end of file
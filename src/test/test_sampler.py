@@ -0,0 +1,43 @@
+from api.modules.module_sampler import *
+
+import pytest
+import random
+
+def test_sampler_input():
+    with pytest.raises(ValueError) as e_info:
+        AliasSampler([])
+    with pytest.raises(ValueError) as e_info:
+        AliasSampler([1, 2], [1])
+    with pytest.raises(ValueError) as e_info:
+        AliasSampler([1, 2], [1, -1])
+    with pytest.raises(ValueError) as e_info:
+        AliasSampler([1, 2], [0, 0])
+    with pytest.raises(ValueError) as e_info:
+        AliasSampler([1, 2]).draw_many(-1)
+
+def test_sampler_table():
+    # the alias table reproduces the weights
+    sampler = AliasSampler(["a", "b", "c", "d"], [1, 2, 3, 4])
+    assert len(sampler) == 4
+    for item, probability in zip(["a", "b", "c", "d"], [0.1, 0.2, 0.3, 0.4]):
+        assert sampler.get_probability(item) == pytest.approx(probability)
+    assert sampler.get_probability("e") == 0
+    # uniform without weights
+    assert AliasSampler([1, 2, 3, 4]).get_probability(3) == pytest.approx(0.25)
+
+def test_sampler_draw():
+    # items without weight are never drawn
+    sampler = AliasSampler([1, 2, 3], [0, 1, 0])
+    assert sampler.draw() == 2
+    assert sampler.draw_many(100) == [2] * 100
+    assert sampler.draw_many(0) == []
+    # same seed, same draws
+    assert AliasSampler([1, 2, 3], seed=7).draw_many(50) == AliasSampler([1, 2, 3], seed=7).draw_many(50)
+    assert AliasSampler([1, 2, 3], rng=random.Random(7)).draw_many(50) == AliasSampler([1, 2, 3], seed=7).draw_many(50)
+
+def test_sampler_distribution():
+    sampler = AliasSampler(["normal", "legendary", "mythical"], [1.0, 0.1, 0.02], seed=1)
+    drawn = sampler.draw_many(100000)
+    assert drawn.count("normal") / len(drawn) == pytest.approx(1.0 / 1.12, abs=0.01)
+    assert drawn.count("legendary") / len(drawn) == pytest.approx(0.1 / 1.12, abs=0.01)
+    assert drawn.count("mythical") / len(drawn) == pytest.approx(0.02 / 1.12, abs=0.005)
@@ -0,0 +1,54 @@
+from api.modules.module_search import *
+
+pokemon_list = [
+    {"pokemon_id": 1, "pokemon_name": "bulbasaur"},
+    {"pokemon_id": 4, "pokemon_name": "charmander"},
+    {"pokemon_id": 5, "pokemon_name": "charmeleon"},
+    {"pokemon_id": 6, "pokemon_name": "charizard"},
+    {"pokemon_id": 122, "pokemon_name": "mr-mime"},
+    {"pokemon_id": 132, "pokemon_name": "ditto"},
+    {"pokemon_id": 250, "pokemon_name": "ho-oh"}
+]
+
+def test_edit_distance():
+    assert edit_distance("ditto", "ditto") == 0
+    assert edit_distance("ditto", "dito") == 1
+    assert edit_distance("pikachu", "pikahcu") == 2
+    assert edit_distance("", "abc") == 3
+    # stops early once the distance is too large
+    assert edit_distance("bulbasaur", "ditto", max_distance=2) == 3
+
+def test_build():
+    index = PokemonSearchIndex()
+    assert len(index) == 0
+    assert index.search("char") == []
+    assert index.build(pokemon_list + [{"pokemon_id": 0, "pokemon_name": ""}]) == 7
+    assert len(index) == 7
+
+def test_prefix():
+    index = PokemonSearchIndex()
+    index.build(pokemon_list)
+    assert [pokemon["pokemon_name"] for pokemon in index.prefix("Char")] == ["charizard", "charmander", "charmeleon"]
+    assert index.prefix("charm", limit=1) == [{"pokemon_id": 4, "pokemon_name": "charmander"}]
+    assert index.prefix("mr-") == [{"pokemon_id": 122, "pokemon_name": "mr-mime"}]
+    assert index.prefix("") == []
+    assert index.prefix(123) == []
+    assert index.prefix("xyz") == []
+
+def test_fuzzy():
+    index = PokemonSearchIndex()
+    index.build(pokemon_list)
+    assert index.fuzzy("dito") == [{"pokemon_id": 132, "pokemon_name": "ditto"}]
+    assert index.fuzzy("bulbsaur")[0]["pokemon_name"] == "bulbasaur"
+    assert index.fuzzy("charmandr")[0]["pokemon_name"] == "charmander"
+    assert index.fuzzy("hooh") == [{"pokemon_id": 250, "pokemon_name": "ho-oh"}]
+    assert index.fuzzy("pikachu") == []
+
+def test_search():
+    index = PokemonSearchIndex()
+    index.build(pokemon_list)
+    # prefix matches first, then similar names without duplicates
+    assert index.search("ditt") == [{"pokemon_id": 132, "pokemon_name": "ditto"}]
+    assert [pokemon["pokemon_name"] for pokemon in index.search("charizad")] == ["charizard"]
+    assert [pokemon["pokemon_name"] for pokemon in index.search("char", limit=2)] == ["charizard", "charmander"]
+    assert index.search("ditoo") == [{"pokemon_id": 132, "pokemon_name": "ditto"}]
@@ -0,0 +1,81 @@
+from api.modules.module_singleflight import *
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import pytest
+import threading
+import time
+
+def test_do():
+    flight = SingleFlight()
+    assert flight.do("key", lambda value: value * 2, 21) == 42
+    # finished calls are not cached
+    assert flight.do("key", lambda: 1) == 1
+    assert len(flight) == 0
+    assert flight.get_stats() == {"running": 0, "started": 2, "shared": 0}
+
+def test_do_concurrent():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+    def fetch(key):
+        calls.append(key)
+        release.wait(5)
+        return {"pokemon_id": key}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(flight.do, 25, fetch, 25) for _ in range(8)]
+        # wait until all callers joined the running call
+        while flight.get_stats()["shared"] < 7:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+    assert calls == [25]
+    # every caller gets the same object
+    assert all(result is results[0] for result in results)
+    assert flight.get_stats() == {"running": 0, "started": 1, "shared": 7}
+
+def test_do_error_and_timeout():
+    flight = SingleFlight()
+    release = threading.Event()
+    def fail():
+        release.wait(5)
+        raise KeyError("not found")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "key", fail)
+        while len(flight) == 0:
+            time.sleep(0.01)
+        # waiting callers give up after the timeout
+        with pytest.raises(TimeoutError) as e_info:
+            flight.do("key", fail, timeout=0.01)
+        follower = executor.submit(flight.do, "key", fail)
+        while flight.get_stats()["shared"] < 2:
+            time.sleep(0.01)
+        release.set()
+        # the exception is raised to every caller
+        with pytest.raises(KeyError) as e_info:
+            leader.result()
+        with pytest.raises(KeyError) as e_info:
+            follower.result()
+    assert len(flight) == 0
+
+def test_do_async():
+    flight = SingleFlight()
+    calls = []
+    def fetch(key):
+        calls.append(key)
+        time.sleep(0.05)
+        return key
+
+    async def run_fetches():
+        results = await asyncio.gather(*[flight.do_async("key", fetch, 1) for _ in range(10)])
+        assert results == [1] * 10
+        # a timeout does not cancel the call of the other callers
+        slow = asyncio.ensure_future(flight.do_async("slow", fetch, 2))
+        with pytest.raises(TimeoutError) as e_info:
+            await flight.do_async("slow", fetch, 2, timeout=0.01)
+        assert await slow == 2
+
+    asyncio.run(run_fetches())
+    assert calls == [1, 2]
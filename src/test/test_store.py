@@ -0,0 +1,45 @@
+from api.modules.module_store import *
+
+import pytest
+
+def create_record(poke_id: int, name: str = "ditto") -> StoreRecord:
+    return StoreRecord(poke_id, name, (48, 48, 48, 48, 48, 48), False, poke_id == 151, 1, "generation-i", f"/.cache/sprite/pokemon/{poke_id}.png")
+
+def test_write_and_get(tmp_path):
+    file_path = str(tmp_path / "pokemon.store")
+    store = PokemonStore(file_path)
+    # missing file
+    assert store.get(132) is None
+    assert len(store) == 0
+    assert write_store(file_path, [create_record(151, "mew"), create_record(132)]) == 2
+    assert store.get(132) == create_record(132)
+    assert store.get(151).is_mythical
+    assert store.get(151).name == "mew"
+    assert len(store) == 2
+    # ids without record and out of range
+    for poke_id in (0, 1, 150, 152, -1):
+        assert store.get(poke_id) is None
+
+def test_rebuild(tmp_path):
+    file_path = str(tmp_path / "pokemon.store")
+    store = PokemonStore(file_path)
+    write_store(file_path, [create_record(132)])
+    assert store.get(25) is None
+    # a rebuilt store is picked up on a miss
+    write_store(file_path, [create_record(132), create_record(25, "pikachu")])
+    assert store.get(25).name == "pikachu"
+    assert len(store) == 2
+    assert os.listdir(tmp_path) == ["pokemon.store"]
+
+def test_invalid(tmp_path):
+    file_path = str(tmp_path / "pokemon.store")
+    with pytest.raises(ValueError) as e_info:
+        write_store(file_path, [create_record(132, "a" * 25)])
+    with pytest.raises(ValueError) as e_info:
+        write_store(file_path, [StoreRecord(132, "ditto", (1, 2), False, False, 1, "generation-i", "")])
+    assert check_record(create_record(132, "a" * 25)) is not None
+    assert check_record(create_record(132, "a" * 24)) is None
+    with open(file_path, "wb") as file:
+        file.write(b"\0" * 64)
+    with pytest.raises(ValueError) as e_info:
+        PokemonStore(file_path).get(1)